@@ -15,10 +15,38 @@ class Settings(BaseSettings):
     MONGODB_DB: str = "karatplus"
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-2.5-flash"
+    GEMINI_API_BASE: str = "https://generativelanguage.googleapis.com"  # point at a stand-in for load tests
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     FRONTEND_URL: str = "http://localhost:3000"
     UPLOAD_DIR: str = "uploads"
+    THUMBNAIL_DIR: str = "thumbnails"
+    THUMBNAIL_CACHE_MB: int = 512  # least recently used previews are evicted past this size
+    EXPORT_DIR: str = "exports"
+    EXPORT_TTL_HOURS: float = 24.0  # export job results older than this are deleted; 0 keeps them
+    WRITE_BEHIND_MAX_BATCH: int = 100
+    WRITE_BEHIND_FLUSH_MS: int = 250
+    EXTRACTION_WORKERS: int = 8  # threads running background extraction
+    EXTRACTION_MAX_QUEUED: int = 200  # queued + running jobs before uploads are refused
+    UPLOAD_BULK_QUEUE_SHARE: float = 0.7  # bulk uploads stop at this fraction of EXTRACTION_MAX_QUEUED
+    UPLOAD_MAX_IN_FLIGHT: int = 32  # upload requests being received/handled at once
+    UPLOAD_MAX_BUFFERED_MB: int = 256  # request bytes all in-flight uploads may hold
+    PHASH_MAX_DISTANCE: int = 6  # Hamming bits (of 64) to treat an image as a near-duplicate
+    # process | reuse | reject. Sheets printed from one template hash alike, so reuse is opt-in
+    # and reused records always go to review.
+    PHASH_DUPLICATE_ACTION: str = "process"
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped rather than blocking requests
+    TRACE_SAMPLE_RATE: float = 1.0  # fraction of traces whose spans are logged; failures always are
+    WARMUP_ON_STARTUP: bool = True  # ping Mongo, check Tesseract, open Gemini connections before serving
+    WARMUP_TIMEOUT_S: float = 10.0
+    GEMINI_WARM_CONNECTIONS: int = 2
+    SIMILARITY_ENABLED: bool = True  # in-memory index behind /api/jewelry/{id}/similar
+    SIMILARITY_REFRESH_S: float = 2.0  # how often the index pulls new changes from the delta feed
+    VALUATION_ENABLED: bool = True  # in-memory catalog pricing behind /api/jewelry/valuation
+    VALUATION_REFRESH_S: float = 2.0  # how often record changes and new rate tables are picked up
+    ADMIN_TOKEN: str = ""  # enables /api/admin (X-Admin-Token header); empty = disabled
 
     class Config:
         env_file = str(_ENV_FILE) if _ENV_FILE.exists() else ".env"
@@ -15,6 +15,24 @@ async def get_db():
     return db
 
 
+async def ensure_indexes():
+    """Create indexes used by the API and background subsystems (idempotent)."""
+    from app.services.blob_store import ensure_blob_indexes
+    from app.services.delta_sync import ensure_tombstone_indexes
+    from app.services.rollups import ensure_rollup_indexes
+    from app.services.valuation import ensure_valuation_indexes
+
+    database = await get_db()
+    coll = database["jewelry"]
+    await coll.create_index([("updated_at", -1)])
+    await coll.create_index([("created_at", -1)])
+    await coll.create_index([("file_hash", 1)], sparse=True)
+    await ensure_rollup_indexes(database)
+    await ensure_tombstone_indexes(database)
+    await ensure_blob_indexes(database)
+    await ensure_valuation_indexes(database)
+
+
 def get_db_sync():
     """For use in sync contexts (e.g. seed script)."""
     from motor.motor_asyncio import AsyncIOMotorClient
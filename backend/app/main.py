@@ -1,14 +1,31 @@
-"""KaratPlus AI - FastAPI entry point. CORS for http://localhost:3000, static uploads."""
+"""KaratPlus AI - FastAPI entry point. CORS for http://localhost:3000, uploads served from the blob store."""
 
+import asyncio
+import logging
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
 
 from app.config import settings
-from app.db import get_db
-from app.routers import jewelry
+from app.db import ensure_indexes, get_db
+from app.routers import admin, jewelry, uploads
+from app.services import backfill
+from app.services.admission import AdmissionMiddleware, extraction_queue
+from app.services.events import broker
+from app.services.log_pipeline import configure_logging, shutdown_logging
+from app.services.profiler import mark_api_thread
+from app.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from app.services.phash import phash_index
+from app.services.tracing import TraceMiddleware
+from app.services.similarity import similarity_index
+from app.services.valuation import valuation_engine
+from app.services.warmup import run_warmup
+from app.services.write_behind import write_behind
+
+configure_logging()
+logger = logging.getLogger("karatplus")
 
 app = FastAPI(
     title="KaratPlus AI",
@@ -16,6 +33,8 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Upload admission control runs inside CORS so shed responses still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
 # CORS - allow frontend
 app.add_middleware(
     CORSMiddleware,
@@ -23,23 +42,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Retry-After"],
 )
+# Outermost, so the trace id covers CORS handling and is echoed on every response.
+app.add_middleware(TraceMiddleware)
 
-# Uploads folder and static serve
+# Uploads folder (content-addressed blobs, see services/blob_store.py)
 UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
 app.include_router(jewelry.router)
+app.include_router(uploads.router)
+app.include_router(admin.router)
 
 
 @app.on_event("startup")
 async def startup():
+    broker.bind_loop(asyncio.get_running_loop())
+    mark_api_thread()
     await get_db()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.warning("Failed to ensure indexes: %s", e)
+    write_behind.start()
+    extraction_queue.start()
+    try:
+        loaded = await phash_index.load(await get_db())
+        logger.info("Loaded %d perceptual hashes for near-duplicate detection", loaded)
+    except Exception as e:
+        logger.warning("Failed to load perceptual hashes: %s", e)
+    if settings.SIMILARITY_ENABLED:
+        # Loads in the background; /similar answers 503 until it is ready.
+        similarity_index.start(await get_db())
+    if settings.VALUATION_ENABLED:
+        valuation_engine.start(await get_db())
+    if settings.WARMUP_ON_STARTUP:
+        await run_warmup(await get_db())
     has_key = bool((getattr(settings, "GEMINI_API_KEY", "") or "").strip())
-    print(f"KaratPlus AI: GEMINI_API_KEY set={'yes' if has_key else 'no'} (restart backend after changing .env)")
+    logger.info("KaratPlus AI: GEMINI_API_KEY set=%s (restart backend after changing .env)", "yes" if has_key else "no")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Checkpoint running backfills, let queued extractions finish, then drain their buffered results.
+    await backfill.stop_all()
+    await similarity_index.stop()
+    await valuation_engine.stop()
+    await asyncio.to_thread(extraction_queue.close)
+    await write_behind.close()
+    shutdown_logging()
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of pipeline timings, counters and gauges."""
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
@@ -1,6 +1,18 @@
-from .jewelry import JewelryData, JewelryRecord, JewelryRecordCreate, ProcessingStatus, ExtractionSource
+from .export import ExportJobRequest
+from .jewelry import (
+    JewelryBatchPatch,
+    JewelryData,
+    JewelryPatchItem,
+    JewelryRecord,
+    JewelryRecordCreate,
+    ProcessingStatus,
+    ExtractionSource,
+)
 
 __all__ = [
+    "ExportJobRequest",
+    "JewelryBatchPatch",
+    "JewelryPatchItem",
     "JewelryData",
     "JewelryRecord",
     "JewelryRecordCreate",
@@ -0,0 +1,29 @@
+"""Pydantic schemas for re-extraction backfill jobs."""
+
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BackfillFilter(BaseModel):
+    """Which records to re-extract. Processing records and records reviewed by a person are always skipped."""
+
+    status: list[Literal["Completed", "Review Required"]] = Field(default_factory=lambda: ["Review Required"])
+    source: list[Literal["AI", "OCR"]] = Field(default_factory=list)
+    max_confidence: Optional[float] = Field(None, ge=0, le=1)
+    created_from: Optional[datetime] = None  # inclusive
+    created_to: Optional[datetime] = None  # exclusive
+    ids: list[str] = Field(default_factory=list, max_length=10000)
+
+
+class BackfillJobRequest(BaseModel):
+    """Body for POST /api/admin/backfill."""
+
+    filter: BackfillFilter = Field(default_factory=BackfillFilter)
+    concurrency: int = Field(2, ge=1, le=32)  # extractions running at once
+    rate_per_s: float = Field(1.0, ge=0)  # extraction starts per second, 0 = unlimited
+    limit: Optional[int] = Field(None, ge=1)
+    dry_run: bool = False  # count what would improve without writing
+    rebuild_rollups: bool = True
+    start: bool = True
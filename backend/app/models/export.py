@@ -0,0 +1,16 @@
+"""Pydantic schemas for export requests."""
+
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class ExportJobRequest(BaseModel):
+    """Filter + format for an asynchronous export job (same semantics as GET /export)."""
+
+    date: Optional[str] = None  # YYYY-MM-DD, single day
+    start: Optional[str] = None  # YYYY-MM-DD, inclusive
+    end: Optional[str] = None  # YYYY-MM-DD, inclusive
+    status: Optional[str] = None
+    fields: Optional[str] = None  # comma-separated column keys
+    format: Literal["xlsx", "csv", "parquet", "arrow", "ndjson"] = "xlsx"
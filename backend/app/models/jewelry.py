@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 
@@ -73,9 +73,29 @@ class JewelryRecord(BaseModel):
     review_required: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None  # when the extraction result was written (rollup bucket)
     raw_text: Optional[str] = None  # OCR raw text when fallback used
     file_hash: Optional[str] = None  # SHA256 hash for duplicate check
+    phash: Optional[str] = None  # 64-bit dHash (hex) for near-duplicate images
+    duplicate_of: Optional[str] = None  # record whose extraction was reused
+    reviewed_at: Optional[datetime] = None  # set when a person saves the record; backfills leave it alone
 
     class Config:
         populate_by_name = True
         use_enum_values = True
+
+
+class JewelryPatchItem(BaseModel):
+    """Partial update for one record: only the JewelryData fields present in `fields` change."""
+
+    id: str
+    fields: dict[str, Any]
+    expected_updated_at: Optional[datetime] = None  # optimistic concurrency check
+    mark_reviewed: bool = True  # set status Completed / review_required False like PATCH /{id}
+
+
+class JewelryBatchPatch(BaseModel):
+    """Body for PATCH /api/jewelry/batch."""
+
+    items: list[JewelryPatchItem] = Field(..., max_length=1000)
+    ordered: bool = False
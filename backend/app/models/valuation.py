@@ -0,0 +1,24 @@
+"""Pydantic schemas for catalog valuation rate tables."""
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class RateTable(BaseModel):
+    """
+    Body for PUT /api/admin/valuation/rates. Metal rates are per gram, stone rates per carat.
+    Gold karats without their own rate are priced from gold_24kt by purity (k/24).
+    """
+
+    currency: str = "USD"
+    metals: dict[str, float] = Field(
+        default_factory=dict,
+        description="gold_24kt, gold_22kt, gold_18kt, gold_14kt, gold_10kt, silver, platinum",
+    )
+    diamond_per_ct: float = Field(0.0, ge=0)
+    diamond_shapes: dict[str, float] = Field(default_factory=dict)  # per-carat overrides, e.g. {"princess": 900}
+    stone_per_ct: float = Field(0.0, ge=0)
+    stone_types: dict[str, float] = Field(default_factory=dict)  # per-carat overrides, e.g. {"ruby": 400}
+    effective_at: Optional[datetime] = None  # default now; later tables can be posted ahead of time
@@ -0,0 +1,142 @@
+"""Admin-only operational endpoints. Disabled (404) unless ADMIN_TOKEN is set."""
+
+import asyncio
+
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.db import get_db
+from app.models.backfill import BackfillJobRequest
+from app.models.valuation import RateTable
+from app.services import backfill, valuation
+from app.services.admin_auth import require_admin
+from app.services.profiler import TARGETS, ProfilerBusy, profile_process, request_profiles
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+@router.post("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    target: str = Query("all", description=f"One of {TARGETS}"),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+):
+    """
+    Sample the API event loop thread, the extraction worker threads, or both for `seconds`.
+    Returns collapsed stacks (flamegraph.pl / speedscope input).
+    """
+    if target not in TARGETS:
+        raise HTTPException(status_code=400, detail=f"target must be one of {TARGETS}")
+    try:
+        return await asyncio.to_thread(profile_process, seconds, target, interval_ms / 1000.0)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_request_profiles():
+    """Record ids of recent uploads profiled via the X-Profile header (newest first)."""
+    return {"items": request_profiles.keys()}
+
+
+@router.get("/profiles/{record_id}", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def get_request_profile(record_id: str):
+    """Collapsed stacks of one profiled extraction job (process_upload and the write hand-off)."""
+    prof = request_profiles.get(record_id)
+    if prof is None:
+        raise HTTPException(status_code=404, detail="No profile for this record")
+    header = f"# duration_s={prof['duration_s']} samples={prof['samples']} interval_ms={prof['interval_ms']}\n"
+    return header + prof["collapsed"]
+
+
+def _backfill_filter(req: BackfillJobRequest) -> dict:
+    filt = req.filter.model_dump(exclude_none=True)
+    for k in ("created_from", "created_to"):
+        if k in filt:
+            filt[k] = filt[k].isoformat()
+    return filt
+
+
+@router.post("/backfill", status_code=202, dependencies=[Depends(require_admin)])
+async def create_backfill(req: BackfillJobRequest):
+    """
+    Re-run extraction on the stored files of matching records. Only results that rank higher
+    (status, then confidence, then filled fields) are written back. Progress is checkpointed;
+    resume a paused or interrupted job with POST /backfill/{id}/resume.
+    """
+    db = await get_db()
+    try:
+        job = await backfill.create_job(
+            db,
+            _backfill_filter(req),
+            concurrency=req.concurrency,
+            rate_per_s=req.rate_per_s,
+            limit=req.limit,
+            dry_run=req.dry_run,
+            rebuild_rollups=req.rebuild_rollups,
+        )
+        if req.start:
+            job = await backfill.start_job(db, job["_id"])
+    except backfill.BackfillError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except InvalidId as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return backfill.job_payload(job)
+
+
+@router.get("/backfill", dependencies=[Depends(require_admin)])
+async def list_backfills(limit: int = Query(50, ge=1, le=500)):
+    db = await get_db()
+    return {"items": [backfill.job_payload(j) for j in await backfill.list_jobs(db, limit)]}
+
+
+@router.get("/backfill/{job_id}", dependencies=[Depends(require_admin)])
+async def get_backfill(job_id: str):
+    job = await backfill.get_job(await get_db(), job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return backfill.job_payload(job)
+
+
+@router.post("/backfill/{job_id}/resume", status_code=202, dependencies=[Depends(require_admin)])
+async def resume_backfill(job_id: str):
+    """Start a queued job or continue a paused / failed / abandoned one from its checkpoint."""
+    try:
+        job = await backfill.start_job(await get_db(), job_id)
+    except backfill.BackfillError as e:
+        status = 404 if "not found" in str(e) else 409
+        raise HTTPException(status_code=status, detail=str(e))
+    return backfill.job_payload(job)
+
+
+@router.post("/backfill/{job_id}/pause", dependencies=[Depends(require_admin)])
+async def pause_backfill(job_id: str):
+    """Stop a job at its next checkpoint; it can be resumed later."""
+    try:
+        job = await backfill.pause_job(await get_db(), job_id)
+    except backfill.BackfillError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return backfill.job_payload(job)
+
+
+@router.put("/valuation/rates", dependencies=[Depends(require_admin)])
+async def put_valuation_rates(table: RateTable):
+    """
+    Store a rate table. Once effective_at is reached (immediately by default) the catalog is
+    re-priced incrementally: only metals / shapes / stone types whose rate changed are recomputed.
+    """
+    db = await get_db()
+    try:
+        doc = await valuation.save_rates(db, table.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await valuation.valuation_engine.refresh_rates(db)
+    return valuation.rates_payload(doc)
+
+
+@router.get("/valuation/rates", dependencies=[Depends(require_admin)])
+async def list_valuation_rates(limit: int = Query(30, ge=1, le=365)):
+    """Stored rate tables, newest effective_at first (including ones not yet in effect)."""
+    db = await get_db()
+    return {"items": [valuation.rates_payload(t) for t in await valuation.list_rates(db, limit)]}
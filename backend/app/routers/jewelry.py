@@ -1,29 +1,66 @@
 """Jewelry upload, list, get, update endpoints."""
 
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
+import logging
 from pathlib import Path
 
-import aiofiles
 import asyncio
 from bson import ObjectId
-from fastapi import APIRouter, File, HTTPException, Request, UploadFile, BackgroundTasks
-from fastapi.responses import JSONResponse, StreamingResponse
-import io
-from openpyxl import Workbook
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from app.config import settings
 from app.db import get_db
+from app.models.export import ExportJobRequest
 from app.models.jewelry import (
+    JewelryBatchPatch,
     JewelryData,
     JewelryRecord,
     ProcessingStatus,
     ExtractionSource,
 )
-from app.services.processor import process_upload
+from app.services.export_jobs import export_job_download, get_export_job, submit_export_job
+from app.services import metrics
+from app.services.admin_auth import is_admin_token
+from app.services.admission import PRIORITY_HEADER, Overloaded, Ticket, extraction_queue, request_lane
+from app.services.batch_update import apply_batch_patch
+from app.services.blob_store import release_upload, store_upload
+from app.services.columnar_export import COLUMNAR_FORMATS, columnar_available
+from app.services.export_service import EXPORT_FORMATS, build_export_query, export_media_type, stream_export
+from app.services.file_serving import ranged_file_response
+from app.services.json_encoding import RecordJSONResponse, doc_payload, dumps, encode_docs
+from app.services.profiler import profile_current_thread
+from app.services.phash import compute_dhash, phash_index
+from app.services.processor import IMAGE_EXTS, process_upload
+from app.services.delta_sync import changes_since, write_tombstone
+from app.services.events import broker, sse_stream
+from app.services.record_store import (
+    HOT_PROJECTION,
+    delete_cold,
+    insert_record,
+    load_full_record,
+    search_pipeline,
+    update_record_fields,
+)
+from app.services.record_hooks import record_changed, record_completed, record_progress
+from app.services.response_cache import (
+    cache as response_cache,
+    collection_version,
+    etag_matches,
+    list_etag,
+    record_etag,
+)
+from app.services.rollups import query_rollups
+from app.services.similarity import feature_row, similarity_index
+from app.services.tracing import bind_trace, current_trace_id, is_sampled, span
+from app.services.valuation import GROUP_BY, STATUSES, current_rates, rates_payload, valuation_engine
+from app.services.write_behind import stamp_written, write_behind
 
 router = APIRouter(prefix="/api/jewelry", tags=["jewelry"])
+logger = logging.getLogger(__name__)
+
 UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -34,22 +71,13 @@ def _record_to_dict(r: JewelryRecord) -> dict:
     d["extracted_data"] = r.extracted_data.model_dump()
     d["created_at"] = r.created_at.isoformat() if r.created_at else None
     d["updated_at"] = r.updated_at.isoformat() if r.updated_at else None
+    for k in ("completed_at", "reviewed_at"):
+        d[k] = d[k].isoformat() if d.get(k) else None
     return d
 
 
-def _doc_to_dict(doc: dict) -> dict:
-    """Normalize Mongo document for JSON response."""
-    item = dict(doc)
-    item["id"] = str(item.pop("_id", ""))
-    item["created_at"] = doc.get("created_at").isoformat() if doc.get("created_at") else None
-    item["updated_at"] = doc.get("updated_at").isoformat() if doc.get("updated_at") else None
-    item["extracted_data"] = doc.get("extracted_data") or {}
-    return item
-
-
 async def _save_record(record: JewelryRecord) -> str:
     db = await get_db()
-    coll = db["jewelry"]
     doc = record.model_dump(by_alias=False)
     doc["extracted_data"] = record.extracted_data.model_dump()
     doc["created_at"] = record.created_at
@@ -58,23 +86,26 @@ async def _save_record(record: JewelryRecord) -> str:
     doc["_id"] = ObjectId()
     if "id" in doc:
         del doc["id"]
-    await coll.insert_one(doc)
+    await insert_record(db, doc)
     return str(doc["_id"])
 
 
 async def _update_record(record_id: str, data: dict) -> bool:
     db = await get_db()
-    coll = db["jewelry"]
-    data["updated_at"] = datetime.utcnow()
-    from bson import ObjectId
+    stamp_written(data, datetime.utcnow())
     try:
         oid = ObjectId(record_id)
     except Exception:
         return False
-    r = await coll.update_one({"_id": oid}, {"$set": data})
+    r = await update_record_fields(db, oid, data)
     return r.modified_count > 0 or r.matched_count > 0
 
 
+def _enum_value(v) -> str:
+    """Status/source may be an Enum or (after model validation) already its value."""
+    return getattr(v, "value", v)
+
+
 def _minimal_review_record(image_url: str, image_filename: str) -> JewelryRecord:
     """Build a minimal Review Required record (zero crash)."""
     return JewelryRecord(
@@ -86,16 +117,87 @@ def _minimal_review_record(image_url: str, image_filename: str) -> JewelryRecord
         review_required=True,
     )
 
+async def _find_near_duplicate(phash: str | None) -> dict | None:
+    """Closest finished record within PHASH_MAX_DISTANCE of `phash`, or None."""
+    if not phash or settings.PHASH_DUPLICATE_ACTION not in ("reuse", "reject"):
+        return None
+    matches = phash_index.nearest(phash, settings.PHASH_MAX_DISTANCE)
+    if not matches:
+        return None
+    db = await get_db()
+    for distance, match_id in matches[:5]:
+        doc = await load_full_record(db, ObjectId(match_id))
+        if doc and doc.get("status") != ProcessingStatus.PROCESSING.value:
+            doc["distance"] = distance
+            return doc
+    return None
+
+
+async def _reuse_extraction(
+    match: dict, image_url: str, filename: str, file_hash: str, phash: str | None
+) -> JSONResponse:
+    """
+    Create a record that reuses a near-duplicate's extraction instead of re-running it. A small
+    dHash distance can't tell apart sheets printed from the same template, so the copy is
+    always Review Required and keeps `duplicate_of` pointing at its source.
+    """
+    now = datetime.utcnow()
+    record = JewelryRecord(
+        image_url=image_url,
+        image_filename=filename,
+        extracted_data=JewelryData(**(match.get("extracted_data") or {})),
+        status=ProcessingStatus.REVIEW,
+        source=match.get("source") or ExtractionSource.AI.value,
+        confidence_score=match.get("confidence_score", 0.5),
+        review_required=True,
+        created_at=now,
+        updated_at=now,
+        completed_at=now,
+        raw_text=match.get("raw_text"),
+        file_hash=file_hash,
+        phash=phash,
+        duplicate_of=str(match["_id"]),
+    )
+    record_id = await _save_record(record)
+    await record_changed(
+        record_id, "record.created", status=_enum_value(record.status), duplicate_of=record.duplicate_of
+    )
+    phash_index.add(record_id, phash)
+    logger.info(
+        "Near-duplicate of %s (distance %d); reused extraction for %s",
+        record.duplicate_of, match["distance"], record_id,
+    )
+    out = _record_to_dict(record)
+    out["id"] = record_id
+    out["distance"] = match["distance"]
+    return JSONResponse(content=out, status_code=201)
+
+
 @router.post("/upload", response_class=JSONResponse)
-async def upload_spec_sheet(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None,
-):
+async def upload_spec_sheet(request: Request, file: UploadFile = File(...)):
     """
     Upload image. Save to /uploads and create a Processing record immediately. 
     Enqueue background task for AI/OCR extraction. Returns 202 Accepted.
+    `X-Upload-Priority: bulk` puts the extraction behind interactive uploads; when the
+    extraction queue is full the upload is refused with 429/503 and Retry-After.
+    With `X-Profile: 1` and a valid X-Admin-Token, the extraction job is profiled
+    (see GET /api/admin/profiles/{id}).
     """
-    print(f"Upload endpoint called: filename={file.filename}, content_type={file.content_type}")
+    lane = request_lane(request.headers.get(PRIORITY_HEADER))
+    try:
+        ticket = extraction_queue.reserve(lane)
+    except Overloaded as e:
+        metrics.UPLOADS_TOTAL.inc(result=f"shed_{lane}")
+        return JSONResponse(content=e.body(), status_code=e.status_code, headers={"Retry-After": str(e.retry_after)})
+    try:
+        return await _accept_upload(request, file, ticket)
+    finally:
+        # No-op when the job was queued; frees the slot for duplicates and failures.
+        extraction_queue.release(ticket)
+
+
+async def _accept_upload(request: Request, file: UploadFile, ticket: Ticket):
+    logger.debug("Upload endpoint called: filename=%s, content_type=%s", file.filename, file.content_type)
 
     allowed_types = {
         "image/jpeg",
@@ -113,35 +215,60 @@ async def upload_spec_sheet(
         record = _minimal_review_record("", file.filename or "image")
         out = _record_to_dict(record)
         out["id"] = str(uuid.uuid4())
+        metrics.UPLOADS_TOTAL.inc(result="unsupported")
         return JSONResponse(content=out, status_code=201)
 
     filename = f"{uuid.uuid4().hex}{ext}"
     filepath = UPLOAD_DIR / filename
     base_url = "http://localhost:8000/uploads"
-    image_url = f"{base_url}/{filename}"
 
     content = b""
+    phash = None
     try:
-        content = await file.read()
-        print(f"Read {len(content)} bytes from uploaded file")
+        with metrics.stage("upload_read"):
+            content = await file.read()
+        logger.debug("Read %d bytes from uploaded file", len(content))
         
-        file_hash = hashlib.sha256(content).hexdigest()
+        with metrics.stage("hash"):
+            file_hash = hashlib.sha256(content).hexdigest()
         db = await get_db()
         coll = db["jewelry"]
-        existing = await coll.find_one({"file_hash": file_hash})
+        with metrics.stage("dedupe_query"):
+            existing = await coll.find_one({"file_hash": file_hash}, {"_id": 1})
         if existing:
-            print(f"Duplicate file detected: {file.filename} -> {existing.get('_id')}")
+            logger.info("Duplicate file detected: %s -> %s", file.filename, existing.get("_id"))
+            metrics.UPLOADS_TOTAL.inc(result="duplicate")
             return JSONResponse(
                 content={"detail": "Duplicate file detected"}, 
                 status_code=409
             )
-            
-        async with aiofiles.open(filepath, "wb") as f:
-            await f.write(content)
-    except Exception as e:
-        print(f"ERROR: Failed to save file: {e}")
-        import traceback
-        traceback.print_exc()
+
+        near = None
+        if ext in IMAGE_EXTS:
+            with metrics.stage("phash"):
+                phash = await asyncio.to_thread(compute_dhash, content)
+                near = await _find_near_duplicate(phash)
+        if near is not None and settings.PHASH_DUPLICATE_ACTION == "reject":
+            logger.info("Near-duplicate image detected: %s -> %s", file.filename, near["_id"])
+            metrics.UPLOADS_TOTAL.inc(result="near_duplicate_rejected")
+            return JSONResponse(
+                content={
+                    "detail": "Near-duplicate file detected",
+                    "duplicate_of": str(near["_id"]),
+                    "distance": near["distance"],
+                },
+                status_code=409,
+            )
+
+        with metrics.stage("disk_write"):
+            filename, filepath = await store_upload(db, content, file_hash, ext)
+
+        if near is not None and settings.PHASH_DUPLICATE_ACTION == "reuse":
+            metrics.UPLOADS_TOTAL.inc(result="near_duplicate_reused")
+            return await _reuse_extraction(near, f"{base_url}/{filename}", filename, file_hash, phash)
+    except Exception:
+        logger.exception("Failed to save file")
+    image_url = f"{base_url}/{filename}"
 
     # Create initial "Processing" record
     record = JewelryRecord(
@@ -150,66 +277,90 @@ async def upload_spec_sheet(
         status=ProcessingStatus.PROCESSING,
         source=ExtractionSource.AI,
         confidence_score=1.0,
-        file_hash=file_hash
+        file_hash=file_hash,
+        phash=phash,
     )
     
     try:
         record_id = await _save_record(record)
-        print(f"Saved initial processing record to DB: {record_id}")
-    except Exception as e:
-        print(f"WARNING: Failed to save to DB: {e}")
-        import traceback
-        traceback.print_exc()
+        await record_changed(record_id, "record.created", status=record.status)
+        phash_index.add(record_id, phash)
+        logger.info("Saved initial processing record to DB: %s", record_id)
+    except Exception:
+        logger.exception("Failed to save to DB")
         record_id = str(uuid.uuid4())
 
+    trace_id, sampled = current_trace_id(), is_sampled()
+    profiled = request.headers.get("x-profile") == "1" and is_admin_token(request.headers.get("x-admin-token"))
+
     def background_process(filepath: Path, record_id: str, image_url: str, filename: str, file_hash: str):
+        # Worker thread: continue the upload's trace so the job's spans share its id.
+        with bind_trace(trace_id, sampled), metrics.EXTRACTIONS_IN_FLIGHT.track():
+            with span("extraction", record_id=record_id):
+                if profiled:
+                    with profile_current_thread(record_id):
+                        _background_process(filepath, record_id, image_url, filename, file_hash)
+                else:
+                    _background_process(filepath, record_id, image_url, filename, file_hash)
+
+    def _background_process(filepath: Path, record_id: str, image_url: str, filename: str, file_hash: str):
         # Run synchronous processing
         try:
-            print(f"Background processing image: {filepath}")
-            processed_record = process_upload(filepath, image_url=image_url, image_filename=filename)
+            logger.debug("Background processing image: %s", filepath)
+            processed_record = process_upload(
+                filepath,
+                image_url=image_url,
+                image_filename=filename,
+                on_progress=lambda stage: record_progress(record_id, stage),
+            )
             processed_record.file_hash = file_hash
-            print(f"Background processing complete: status={processed_record.status}, source={processed_record.source}")
-        except Exception as e:
-            print(f"ERROR: Background processing failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.info(
+                "Background processing complete: status=%s, source=%s",
+                _enum_value(processed_record.status), _enum_value(processed_record.source),
+            )
+        except Exception:
+            logger.exception("Background processing failed")
             processed_record = _minimal_review_record(image_url, filename)
             processed_record.file_hash = file_hash
+            metrics.FALLBACKS_TOTAL.inc(path="minimal_review")
             
-        # Update the DB record symmetrically to how the FastAPI loop runs it
-        # Since this is synchronous context, we need an event loop
+        dict_data = {
+            "extracted_data": processed_record.extracted_data.model_dump(),
+            "status": _enum_value(processed_record.status),
+            "source": _enum_value(processed_record.source),
+            "confidence_score": processed_record.confidence_score,
+            "review_required": processed_record.review_required,
+            "raw_text": processed_record.raw_text,
+        }
+        metrics.EXTRACTIONS_TOTAL.inc(source=dict_data["source"], status=dict_data["status"])
+        # Hand the result to the write-behind buffer on the API loop; it is flushed
+        # with other results in one bulk_write. Fall back to a direct write if it is not running.
+        if write_behind.submit(record_id, dict_data, trace_id=trace_id, sampled=sampled):
+            return
+
         async def update_db():
-            dict_data = {
-                "extracted_data": processed_record.extracted_data.model_dump(),
-                "status": processed_record.status.value,
-                "source": processed_record.source.value,
-                "confidence_score": processed_record.confidence_score,
-                "review_required": processed_record.review_required,
-                "raw_text": processed_record.raw_text,
-                "updated_at": datetime.utcnow()
-            }
-            await _update_record(record_id, dict_data)
-            
+            with metrics.stage("db_update"), span("db_update", record_id=record_id):
+                await _update_record(record_id, dict_data)
+            await record_completed(await get_db(), record_id, dict_data)
+
         try:
             # We are in a worker thread. Run the async update.
             asyncio.run(update_db())
-            print(f"Successfully updated record {record_id} via background task")
+            logger.info("Successfully updated record %s via background task", record_id)
         except RuntimeError: # Loop already running
             pass
-            
-            
-    if background_tasks:
-        background_tasks.add_task(background_process, filepath, record_id, image_url, filename, file_hash)
+
+
+    extraction_queue.submit(ticket, background_process, filepath, record_id, image_url, filename, file_hash)
+    metrics.UPLOADS_TOTAL.inc(result="accepted")
 
     try:
         out = _record_to_dict(record)
         out["id"] = record_id
-        print(f"Returning processing record: id={out['id']}, status={out['status']}")
+        logger.debug("Returning processing record: id=%s, status=%s", out["id"], out["status"])
         return JSONResponse(content=out, status_code=202)
-    except Exception as e:
-        print(f"ERROR: Failed to serialize response: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Failed to serialize response")
         # Fallback response
         fallback = {
             "id": record_id,
@@ -226,29 +377,49 @@ async def upload_spec_sheet(
         return JSONResponse(content=fallback, status_code=202)
 
 
-@router.get("")
-async def list_jewelry(search: str | None = None, status: str | None = None):
-    """List all records, optional search and status filter."""
+@router.get("", response_class=RecordJSONResponse)
+async def list_jewelry(request: Request, search: str | None = None, status: str | None = None):
+    """List all records, optional search and status filter. Supports If-None-Match."""
     db = await get_db()
     coll = db["jewelry"]
-    q = {}
-    if status:
-        q["status"] = status
-    if search:
-        q["$or"] = [
-            {"image_filename": {"$regex": search, "$options": "i"}},
-            {"raw_text": {"$regex": search, "$options": "i"}},
-        ]
-    cursor = coll.find(q).sort("created_at", -1)
-    items = []
-    async for doc in cursor:
-        item = dict(doc)
-        item["id"] = str(item.pop("_id", ""))
-        item["created_at"] = doc.get("created_at").isoformat() if doc.get("created_at") else None
-        item["updated_at"] = doc.get("updated_at").isoformat() if doc.get("updated_at") else None
-        item["extracted_data"] = doc.get("extracted_data") or {}
-        items.append(item)
-    return {"items": items, "total": len(items)}
+    params = {"search": search, "status": status}
+    etag = list_etag(params, await collection_version(coll))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    cache_key = f"list:{search}|{status}"
+    body = response_cache.get(cache_key, etag)
+    if body is None:
+        q = {}
+        if status:
+            q["status"] = status
+        if search:
+            cursor = coll.aggregate(search_pipeline(q, search), allowDiskUse=True)
+        else:
+            cursor = coll.find(q, HOT_PROJECTION).sort("created_at", -1)
+        docs = await cursor.to_list(length=None)
+        body = encode_docs(docs)
+        response_cache.put(cache_key, etag, body)
+    return RecordJSONResponse(body, headers=headers)
+
+
+@router.get("/changes", response_class=RecordJSONResponse)
+async def list_changes(since: str | None = None, limit: int = 500):
+    """
+    Records inserted/updated after the `since` watermark (ordered by updated_at, _id) and
+    ids deleted since then. Omit `since` for a full initial sync; pass back `next` afterwards.
+    """
+    db = await get_db()
+    try:
+        page = await changes_since(db, since, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid watermark")
+    return RecordJSONResponse({
+        "items": [doc_payload(d) for d in page["docs"]],
+        "deleted": page["deleted"],
+        "next": page["next"],
+        "has_more": page["has_more"],
+    })
 
 
 @router.get("/stats")
@@ -271,9 +442,28 @@ async def get_stats():
 
 
 @router.get("/confidence-trend")
-async def confidence_trend(limit: int = 10):
-    """Last N records for confidence trend chart."""
+async def confidence_trend(
+    limit: int = 10,
+    granularity: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+):
+    """
+    Last N records for confidence trend chart.
+    With ?granularity=hour|day, returns rollup buckets for [start, end) instead (ISO dates).
+    """
     db = await get_db()
+    if granularity:
+        try:
+            start_dt = datetime.fromisoformat(start) if start else None
+            end_dt = datetime.fromisoformat(end) if end else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid start/end date")
+        try:
+            return await query_rollups(db, granularity, start_dt, end_dt)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     coll = db["jewelry"]
     cursor = coll.find({}).sort("created_at", -1).limit(limit)
     points = []
@@ -287,112 +477,293 @@ async def confidence_trend(limit: int = 10):
     return {"points": points}
 
 
+@router.get("/events")
+async def record_events(request: Request, record_id: str | None = None):
+    """
+    Server-Sent Events stream of record transitions (record.created, record.progress,
+    record.status, record.updated). Optional ?record_id= filter; honours Last-Event-ID.
+    """
+    last_id = request.headers.get("last-event-id")
+    sub = broker.subscribe(
+        record_id=record_id,
+        last_event_id=int(last_id) if last_id and last_id.isdigit() else None,
+    )
+    return StreamingResponse(
+        sse_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/export")
-async def export_jewelry(date: str | None = None):
-    """Export all completed records to a single Excel file."""
+async def export_jewelry(
+    date: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    status: str | None = None,
+    fields: str | None = None,
+    format: str = "xlsx",
+):
+    """
+    Stream records as Excel (default), CSV, NDJSON, or a zip of Parquet / Arrow IPC tables
+    (records + metal_weights + gem_details). Filters: single `date`, or `start`/`end`
+    (YYYY-MM-DD, inclusive) and `status`; `fields` is a comma-separated column list.
+    """
+    fmt = (format or "xlsx").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+    if fmt in COLUMNAR_FORMATS and not columnar_available():
+        raise HTTPException(status_code=400, detail="Columnar export requires pyarrow")
     db = await get_db()
     coll = db["jewelry"]
-    query = {}
-    
-    if date:
-        try:
-            start_date = datetime.strptime(date, "%Y-%m-%d")
-            end_date = start_date + timedelta(days=1)
-            query["created_at"] = {"$gte": start_date, "$lt": end_date}
-        except ValueError:
-            pass
-            
-    cursor = coll.find(query).sort("created_at", -1)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Jewelry Specs"
-    
-    # Define headers
-    headers = [
-        "Product ID", "Status", "Source", "Confidence", "Image Filename", 
-        "Ring Size", "Gold Wt 14k (g)", "Gold Wt 18k (g)", "Gold Wt 22k (g)",
-        "Silver Wt (g)", "Platinum Wt (g)", "Diamond Wt (ct)", "Diamond Count", "Diamond Shape",
-        "Stone Wt (ct)", "Stone Count", "Stone Type", "Dimensions", "Length (mm)", "Width (mm)", "Height (mm)",
-        "Created At", "Updated At"
-    ]
-    ws.append(headers)
-    
-    async for doc in cursor:
-        ext = doc.get("extracted_data") or {}
-        row = [
-            str(doc.get("_id", "")),
-            doc.get("status", ""),
-            doc.get("source", ""),
-            doc.get("confidence_score", ""),
-            doc.get("image_filename", ""),
-            ext.get("ring_size", ""),
-            ext.get("gold_weight_14kt_gm", ""),
-            ext.get("gold_weight_18kt_gm", ""),
-            ext.get("gold_weight_22kt_gm", ""),
-            ext.get("silver_weight_gm", ""),
-            ext.get("platinum_weight_gm", ""),
-            ext.get("diamond_weight_ct", ""),
-            ext.get("diamond_count", ""),
-            ext.get("diamond_shape", ""),
-            ext.get("stone_weight_ct", ""),
-            ext.get("stone_count", ""),
-            ext.get("stone_type", ""),
-            ext.get("dimensions_mm", ""),
-            ext.get("length_mm", ""),
-            ext.get("width_mm", ""),
-            ext.get("height_mm", ""),
-            doc.get("created_at").isoformat() if doc.get("created_at") else "",
-            doc.get("updated_at").isoformat() if doc.get("updated_at") else ""
-        ]
-        ws.append(row)
-        
-    stream = io.BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-    
+    try:
+        query = build_export_query(date=date, start=start, end=end, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, download_name = export_media_type(fmt)
     headers_dict = {
-        'Content-Disposition': 'attachment; filename="jewelry_export.xlsx"'
+        'Content-Disposition': f'attachment; filename="{download_name}"'
     }
     return StreamingResponse(
-        iter([stream.getvalue()]), 
-        headers=headers_dict, 
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        stream_export(coll, query, fmt=fmt, fields=fields),
+        headers=headers_dict,
+        media_type=media_type,
     )
 
 
-@router.get("/{record_id}")
-async def get_jewelry(record_id: str):
-    """Get one record by ID."""
+@router.post("/export/jobs", status_code=202)
+async def create_export_job(req: ExportJobRequest):
+    """Start (or reuse) a background export. Unchanged data is served from the on-disk cache."""
+    if req.format in COLUMNAR_FORMATS and not columnar_available():
+        raise HTTPException(status_code=400, detail="Columnar export requires pyarrow")
+    params = req.model_dump()
+    try:
+        build_export_query(date=params.get("date"), start=params.get("start"), end=params.get("end"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db = await get_db()
+    job = await submit_export_job(db["jewelry"], params)
+    return job.to_dict()
+
+
+@router.get("/export/jobs/{job_id}")
+async def export_job_status(job_id: str):
+    """Poll an export job's progress."""
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Not found")
+    return job.to_dict()
+
+
+@router.get("/export/jobs/{job_id}/download")
+async def export_job_result(job_id: str, request: Request):
+    """Download a finished export (supports Range for resumed downloads)."""
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    path, media_type, name = export_job_download(job)
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Export file expired")
+    return ranged_file_response(
+        path,
+        request.headers.get("range"),
+        media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
+
+def _valuation_ready() -> None:
+    if not valuation_engine.ready:
+        raise HTTPException(status_code=503, detail="Valuation engine is loading", headers={"Retry-After": "5"})
+
+
+@router.get("/valuation/summary")
+async def valuation_summary(status: str | None = None, group_by: str | None = None, top: int = 0):
+    """
+    Catalog value at the current rates: totals per component (metal, diamond, stone), optionally
+    for one status, grouped by status|metal|diamond_shape|stone_type, with the `top` most valuable records.
+    """
+    _valuation_ready()
+    if status is not None and status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {STATUSES}")
+    if group_by is not None and group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {GROUP_BY}")
+    top = max(0, min(top, 100))
+    with metrics.stage("valuation_summary"):
+        return await asyncio.to_thread(valuation_engine.summary, status, group_by, top)
+
+
+@router.get("/valuation/rates")
+async def valuation_rates():
+    """Rate table currently in effect (null until one is set via PUT /api/admin/valuation/rates)."""
+    return {"rates": rates_payload(await current_rates(await get_db()))}
+
+
+MAX_SIMILAR = 100
+
+
+async def _similar_response(db, vec, k: int, exclude: str | None = None) -> RecordJSONResponse:
+    if not similarity_index.ready:
+        raise HTTPException(status_code=503, detail="Similarity index is loading", headers={"Retry-After": "5"})
+    k = max(1, min(k, MAX_SIMILAR))
+    with metrics.stage("similar_search"):
+        hits = await asyncio.to_thread(similarity_index.query, vec, k, exclude)
+    docs = await db["jewelry"].find({"_id": {"$in": [ObjectId(rid) for rid, _ in hits]}}, HOT_PROJECTION).to_list(
+        length=len(hits)
+    )
+    by_id = {str(d["_id"]): d for d in docs}
+    items = []
+    for rid, distance in hits:
+        doc = by_id.get(rid)
+        if doc is not None:  # deleted since the index last caught up
+            item = doc_payload(doc)
+            item["distance"] = round(distance, 4)
+            items.append(item)
+    return RecordJSONResponse({"items": items, "total": len(items), "index_size": len(similarity_index)})
+
+
+@router.post("/similar", response_class=RecordJSONResponse)
+async def similar_to_spec(data: JewelryData, k: int = 10):
+    """Records closest to an ad-hoc specification (same features as GET /{id}/similar)."""
+    row = feature_row(data.model_dump())
+    if row is None:
+        raise HTTPException(status_code=400, detail="Specification has no comparable fields")
+    return await _similar_response(await get_db(), row, k)
+
+
+@router.patch("/batch", response_class=RecordJSONResponse)
+async def batch_update_jewelry(batch: JewelryBatchPatch):
+    """
+    Apply partial extracted_data patches to many records, with a result per item.
+    Items with `expected_updated_at` only apply if the record is unchanged (else "conflict").
+    Each id may appear once (400 otherwise).
+    """
+    db = await get_db()
+    try:
+        results = await apply_batch_patch(db["jewelry"], batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # "partial" items had their hot fields written, so they changed too.
+    updated = [r for r in results if r["status"] in ("updated", "partial")]
+    for r in updated:
+        await record_changed(r["id"], "record.updated", status=None)
+    return RecordJSONResponse({"results": results, "updated": len(updated)})
+
+
+@router.get("/{record_id}", response_class=RecordJSONResponse)
+async def get_jewelry(record_id: str, request: Request):
+    """Get one record by ID. Strong ETag from _id + updated_at; 304 on If-None-Match."""
     try:
         oid = ObjectId(record_id)
     except Exception:
         raise HTTPException(status_code=404, detail="Not found")
     db = await get_db()
     coll = db["jewelry"]
-    doc = await coll.find_one({"_id": oid})
-    if not doc:
+    meta = await coll.find_one({"_id": oid}, {"updated_at": 1})
+    if not meta:
         raise HTTPException(status_code=404, detail="Not found")
-    return _doc_to_dict(doc)
-
-
-@router.patch("/{record_id}")
+    etag = record_etag(record_id, meta.get("updated_at"))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    cache_key = f"record:{record_id}"
+    body = response_cache.get(cache_key, etag)
+    if body is None:
+        doc = await load_full_record(db, oid)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Not found")
+        etag = record_etag(record_id, doc.get("updated_at"))
+        headers["ETag"] = etag
+        body = dumps(doc_payload(doc))
+        response_cache.put(cache_key, etag, body)
+    return RecordJSONResponse(body, headers=headers)
+
+
+@router.get("/{record_id}/valuation")
+async def jewelry_valuation(record_id: str):
+    """Value of one record at the current rates, per metal and for diamonds and stones."""
+    _valuation_ready()
+    try:
+        oid = ObjectId(record_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Not found")
+    value = valuation_engine.valuation(record_id)
+    if value is None:
+        # Not picked up by the engine yet, or nothing priceable: price the stored spec directly.
+        doc = await load_full_record(await get_db(), oid)
+        if not doc:
+            raise HTTPException(status_code=404, detail="Not found")
+        value = valuation_engine.value_of(doc.get("extracted_data"))
+    return {"id": record_id, "valuation": value}
+
+
+@router.get("/{record_id}/similar", response_class=RecordJSONResponse)
+async def similar_jewelry(record_id: str, k: int = 10):
+    """
+    The k designs nearest to this record by metal weights, diamond and stone counts and carats,
+    stone type, diamond shape and dimensions (items carry `distance`, smaller is closer).
+    """
+    try:
+        oid = ObjectId(record_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Not found")
+    db = await get_db()
+    vec = similarity_index.vector_for(record_id)
+    if vec is None:
+        # Not indexed yet (just written) or nothing comparable: fall back to the stored spec.
+        doc = await db["jewelry"].find_one({"_id": oid}, {"extracted_data": 1})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Not found")
+        vec = feature_row(doc.get("extracted_data"))
+        if vec is None:
+            return RecordJSONResponse({"items": [], "total": 0, "index_size": len(similarity_index)})
+    return await _similar_response(db, vec, k, exclude=record_id)
+
+
+@router.patch("/{record_id}", response_class=RecordJSONResponse)
 async def update_jewelry(record_id: str, data: JewelryData):
     """Update extracted data for a record (e.g. after review)."""
     db = await get_db()
-    coll = db["jewelry"]
     try:
         oid = ObjectId(record_id)
     except Exception:
         raise HTTPException(status_code=404, detail="Not found")
+    now = datetime.utcnow()
     update = {
         "extracted_data": data.model_dump(),
-        "updated_at": datetime.utcnow(),
+        "updated_at": now,
+        "reviewed_at": now,
         "status": "Completed",
         "review_required": False,
     }
-    r = await coll.update_one({"_id": oid}, {"$set": update})
+    r = await update_record_fields(db, oid, update)
     if r.matched_count == 0:
         raise HTTPException(status_code=404, detail="Not found")
-    doc = await coll.find_one({"_id": oid})
-    return _doc_to_dict(doc)
+    await record_changed(record_id, "record.updated", status=update["status"])
+    doc = await load_full_record(db, oid)
+    return RecordJSONResponse(
+        doc_payload(doc),
+        headers={"ETag": record_etag(record_id, doc.get("updated_at"))},
+    )
+
+
+@router.delete("/{record_id}", status_code=204)
+async def delete_jewelry(record_id: str):
+    """Delete a record; leaves a tombstone so delta-sync clients drop it too."""
+    try:
+        oid = ObjectId(record_id)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Not found")
+    db = await get_db()
+    coll = db["jewelry"]
+    doc = await coll.find_one_and_delete({"_id": oid}, {"image_filename": 1})
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    await delete_cold(db, oid)
+    await release_upload(db, doc.get("image_filename"))
+    await write_tombstone(db, oid)
+    phash_index.remove(record_id)
+    await record_changed(record_id, "record.deleted")
+    return Response(status_code=204)
@@ -0,0 +1,52 @@
+"""Serve uploaded files by their public name (content-addressed blobs or legacy flat files)."""
+
+import mimetypes
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.db import get_db
+from app.services.blob_store import resolve_upload
+from app.services.file_serving import ranged_file_response
+from app.services.thumbnails import SIZE_BUCKETS, thumbnails
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+# A public name always maps to the same bytes.
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@router.api_route("/{name}/thumb", methods=["GET", "HEAD"])
+async def get_upload_thumbnail(
+    name: str,
+    request: Request,
+    w: int = Query(160, ge=1, le=4096, description=f"Width in px; rounded up to one of {SIZE_BUCKETS}"),
+):
+    """WebP preview of an image or the first page of a PDF, generated once and cached."""
+    db = await get_db()
+    source = await resolve_upload(db, name)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    path = await thumbnails.get(source, w)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No preview for this file")
+    return ranged_file_response(
+        path,
+        request.headers.get("range"),
+        "image/webp",
+        headers={"Cache-Control": IMMUTABLE_CACHE},
+    )
+
+
+@router.api_route("/{name}", methods=["GET", "HEAD"])
+async def get_upload(name: str, request: Request):
+    db = await get_db()
+    path = await resolve_upload(db, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return ranged_file_response(
+        path,
+        request.headers.get("range"),
+        media_type,
+        headers={"Cache-Control": IMMUTABLE_CACHE},
+    )
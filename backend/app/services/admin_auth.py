@@ -0,0 +1,21 @@
+"""X-Admin-Token checks shared by the admin router and admin-only options on other routes."""
+
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import settings
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    expected = settings.ADMIN_TOKEN
+    return bool(expected) and bool(token) and hmac.compare_digest(token, expected)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dependency: 404 while ADMIN_TOKEN is unset, 403 for a missing or wrong token."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
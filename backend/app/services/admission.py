@@ -0,0 +1,314 @@
+"""
+Admission control for uploads.
+
+Extraction jobs run on a fixed pool of worker threads fed by a bounded priority queue with two
+lanes: "interactive" (single uploads from the UI, the default) is always served before "bulk"
+(batch imports, X-Upload-Priority: bulk). Bulk uploads are only admitted while the queue is
+below UPLOAD_BULK_QUEUE_SHARE of EXTRACTION_MAX_QUEUED, so a large import can't fill the
+queue ahead of people waiting on one sheet.
+
+AdmissionMiddleware sheds upload requests before their body is read when too many are in
+flight, too many bytes are buffered, or the extraction queue has no room for the lane.
+Shed requests get 429 (bulk lane, slow down) or 503 (server saturated) with Retry-After.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import math
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.services.metrics import UPLOADS_TOTAL, registry
+
+logger = logging.getLogger(__name__)
+
+LANES = ("interactive", "bulk")  # in priority order
+PRIORITY_HEADER = "x-upload-priority"
+UPLOAD_PATH = "/api/jewelry/upload"
+
+QUEUE_DEPTH = registry.gauge(
+    "karatplus_extraction_queue_depth",
+    "Extraction jobs waiting for a worker (including slots reserved by uploads in progress), by lane.",
+    ("lane",),
+)
+
+
+def request_lane(value: Optional[str]) -> str:
+    value = (value or "").strip().lower()
+    return value if value in LANES else "interactive"
+
+
+class Overloaded(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def body(self) -> dict:
+        return {"detail": self.reason, "retry_after": self.retry_after}
+
+
+class Ticket:
+    """A reserved slot in the extraction queue; released unless a job is submitted with it."""
+
+    __slots__ = ("lane", "used")
+
+    def __init__(self, lane: str) -> None:
+        self.lane = lane
+        self.used = False
+
+
+class ExtractionQueue:
+    def __init__(self, workers: int, max_queued: int, bulk_share: float) -> None:
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.bulk_limit = max(1, int(self.max_queued * bulk_share))
+        self._q: "queue.PriorityQueue[tuple[int, int, Any]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._reserved = dict.fromkeys(LANES, 0)
+        self._pending = dict.fromkeys(LANES, 0)
+        self._running = 0
+        self._avg_job_s = 10.0  # EWMA of job duration, seeds the Retry-After estimate
+        self._threads: list[threading.Thread] = []
+
+    def _publish(self, lane: str) -> None:
+        QUEUE_DEPTH.set(self._reserved[lane] + self._pending[lane], lane=lane)
+
+    def _depth(self) -> int:
+        return sum(self._reserved.values()) + sum(self._pending.values()) + self._running
+
+    @property
+    def depth(self) -> int:
+        with self._lock:
+            return self._depth()
+
+    def _limit(self, lane: str) -> int:
+        return self.max_queued if lane == "interactive" else self.bulk_limit
+
+    def has_room(self, lane: str) -> bool:
+        with self._lock:
+            return self._depth() < self._limit(lane)
+
+    def reserve(self, lane: str) -> Ticket:
+        """Take a queue slot for an upload about to be accepted; raises Overloaded when full."""
+        with self._lock:
+            if self._depth() < self._limit(lane):
+                self._reserved[lane] += 1
+                self._publish(lane)
+                return Ticket(lane)
+        raise self.overloaded(lane)
+
+    def release(self, ticket: Ticket) -> None:
+        """Give back an unused slot (duplicate, reused extraction, error). No-op after submit."""
+        with self._lock:
+            if not ticket.used:
+                ticket.used = True
+                self._reserved[ticket.lane] -= 1
+                self._publish(ticket.lane)
+
+    def submit(self, ticket: Ticket, fn: Callable[..., Any], *args: Any) -> None:
+        self.start()
+        with self._lock:
+            if not ticket.used:
+                ticket.used = True
+                self._reserved[ticket.lane] -= 1
+            self._pending[ticket.lane] += 1
+            self._publish(ticket.lane)
+        self._q.put((LANES.index(ticket.lane), next(self._seq), (ticket.lane, fn, args)))
+
+    def retry_after(self, lane: str) -> int:
+        """Rough seconds until the lane has room again at the current job rate."""
+        with self._lock:
+            excess = self._depth() - self._limit(lane) + 1
+            per_slot = self._avg_job_s / self.workers
+        return int(min(300, max(1, math.ceil(max(1, excess) * per_slot))))
+
+    def overloaded(self, lane: str) -> Overloaded:
+        # Bulk is refused first, while interactive still has room: tell that client to back off.
+        status = 429 if lane == "bulk" and self.has_room("interactive") else 503
+        return Overloaded(status, "extraction queue full", self.retry_after(lane))
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"extraction_worker_{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self) -> None:
+        while True:
+            _, _, item = self._q.get()
+            if item is None:
+                return
+            lane, fn, args = item
+            with self._lock:
+                self._pending[lane] -= 1
+                self._running += 1
+                self._publish(lane)
+            started = time.perf_counter()
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Extraction job failed")
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._running -= 1
+                    self._avg_job_s = 0.9 * self._avg_job_s + 0.1 * elapsed
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Finish queued jobs (bulk last), then stop the workers."""
+        if not self._threads:
+            return
+        for _ in self._threads:
+            # Sorts after every real job.
+            self._q.put((len(LANES), next(self._seq), None))
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+
+class UploadGate:
+    """Counts upload requests in flight and the request bytes they hold."""
+
+    def __init__(self, max_in_flight: int, max_bytes: int) -> None:
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_bytes = max(1, max_bytes)
+        self.in_flight = 0
+        self.buffered = 0
+        self._lock = threading.Lock()
+
+    def enter(self, declared_bytes: int) -> None:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                raise Overloaded(503, "too many uploads in flight", 1)
+            if declared_bytes > self.max_bytes:
+                raise Overloaded(413, "upload larger than the buffer limit", 0)
+            if self.buffered + declared_bytes > self.max_bytes:
+                raise Overloaded(503, "upload buffer full", 2)
+            self.in_flight += 1
+            self.buffered += declared_bytes
+
+    def grow(self, held: int, extra: int) -> None:
+        """
+        Bytes received beyond the declared Content-Length (or without one). Raises Overloaded
+        instead of counting them if the request or the buffer would go over the limit.
+        """
+        with self._lock:
+            if held + extra > self.max_bytes:
+                raise Overloaded(413, "upload larger than the buffer limit", 0)
+            if self.buffered + extra > self.max_bytes:
+                raise Overloaded(503, "upload buffer full", 2)
+            self.buffered += extra
+
+    def leave(self, held_bytes: int) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.buffered -= held_bytes
+
+
+extraction_queue = ExtractionQueue(
+    settings.EXTRACTION_WORKERS,
+    settings.EXTRACTION_MAX_QUEUED,
+    settings.UPLOAD_BULK_QUEUE_SHARE,
+)
+upload_gate = UploadGate(settings.UPLOAD_MAX_IN_FLIGHT, settings.UPLOAD_MAX_BUFFERED_MB * 1024 * 1024)
+
+registry.gauge(
+    "karatplus_upload_in_flight", "Upload requests being received or handled.", callback=lambda: upload_gate.in_flight
+)
+registry.gauge(
+    "karatplus_upload_buffered_bytes", "Request bytes held by in-flight uploads.", callback=lambda: upload_gate.buffered
+)
+
+
+async def _send_overloaded(send, exc: Overloaded) -> None:
+    body = json.dumps(exc.body()).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))]
+    if exc.retry_after:
+        headers.append((b"retry-after", str(exc.retry_after).encode("ascii")))
+    await send({"type": "http.response.start", "status": exc.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI: gate POST /api/jewelry/upload before the multipart body is read."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        lane = request_lane(headers.get(PRIORITY_HEADER.encode("latin-1"), b"").decode("latin-1"))
+        try:
+            declared = int(headers.get(b"content-length", b"0") or 0)
+        except ValueError:
+            declared = 0
+        try:
+            if not extraction_queue.has_room(lane):
+                raise extraction_queue.overloaded(lane)
+            upload_gate.enter(declared)
+        except Overloaded as e:
+            UPLOADS_TOTAL.inc(result=f"shed_{lane}")
+            logger.info("Shedding %s upload (%s): %d, Retry-After %ss", lane, e.reason, e.status_code, e.retry_after)
+            await _send_overloaded(send, e)
+            return
+
+        held = declared
+        received = 0
+        rejected: Optional[Overloaded] = None
+        started = False
+
+        async def counting_receive():
+            # Chunked bodies declare nothing up front, so the limit is enforced as bytes arrive.
+            nonlocal held, received, rejected
+            if rejected is not None:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > held:
+                    try:
+                        upload_gate.grow(held, received - held)
+                    except Overloaded as e:
+                        # The app sees a disconnect; the rejection is sent once it unwinds.
+                        rejected = e
+                        return {"type": "http.disconnect"}
+                    held = received
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if rejected is not None and not started:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except Exception:
+            if rejected is None:
+                raise
+        finally:
+            upload_gate.leave(held)
+        if rejected is not None and not started:
+            UPLOADS_TOTAL.inc(result=f"shed_{lane}")
+            logger.info("Rejecting %s upload mid-body (%s): %d", lane, rejected.reason, rejected.status_code)
+            await _send_overloaded(send, rejected)
@@ -4,13 +4,17 @@ import base64
 import json
 import logging
 import mimetypes
+import threading
+import time
 import urllib.error
-import urllib.request
 from pathlib import Path
+from urllib.parse import urlsplit
 from typing import Optional
 
 from app.config import settings
 from app.models.jewelry import JewelryData
+from app.services.metrics import FALLBACKS_TOTAL, GEMINI_SECONDS
+from app.services.tracing import record_span
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +102,7 @@ MODEL_FALLBACKS = [
     "gemini-2.0-flash",
     "gemini-flash-latest",
 ]
+REQUEST_TIMEOUT_S = 45
 
 
 def _extract_text_from_response(resp_json: dict) -> Optional[str]:
@@ -131,6 +136,135 @@ def _parse_json_text(text: str) -> Optional[dict]:
         return None
 
 
+class _ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to GEMINI_API_BASE shared by extraction worker threads,
+    so each call skips the TCP and TLS handshakes. http.client is imported on first use.
+    Proxies come from the environment as with urllib (HTTPS_PROXY, HTTP_PROXY, NO_PROXY):
+    HTTPS is tunnelled with CONNECT, plain HTTP is sent to the proxy with an absolute URL.
+    """
+
+    def __init__(self, max_idle: int = 8) -> None:
+        self._idle: list[tuple[str, object]] = []
+        self._max_idle = max_idle
+        self._lock = threading.Lock()
+        self._ssl_context = None
+        self._proxies: dict[str, Optional[tuple]] = {}
+
+    def _proxy(self, origin: str) -> Optional[tuple]:
+        """(host, port, Proxy-Authorization headers) for `origin`, or None to connect directly."""
+        if origin not in self._proxies:
+            import urllib.request
+
+            parts = urlsplit(origin)
+            proxy = urllib.request.getproxies().get(parts.scheme)
+            if not proxy or urllib.request.proxy_bypass(parts.hostname or ""):
+                self._proxies[origin] = None
+            else:
+                p = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+                headers = {}
+                if p.username:
+                    from urllib.parse import unquote
+
+                    creds = f"{unquote(p.username)}:{unquote(p.password or '')}".encode("utf-8")
+                    headers["Proxy-Authorization"] = "Basic " + base64.b64encode(creds).decode("ascii")
+                self._proxies[origin] = (p.hostname, p.port or 8080, headers)
+        return self._proxies[origin]
+
+    def _connect(self, origin: str):
+        import http.client
+
+        parts = urlsplit(origin)
+        proxy = self._proxy(origin)
+        if parts.scheme == "http":
+            if proxy:
+                return http.client.HTTPConnection(proxy[0], proxy[1], timeout=REQUEST_TIMEOUT_S)
+            return http.client.HTTPConnection(parts.hostname, parts.port, timeout=REQUEST_TIMEOUT_S)
+        if self._ssl_context is None:
+            import ssl
+
+            # Loading the CA bundle is the slow part of the first HTTPS call; do it once.
+            self._ssl_context = ssl.create_default_context()
+        if proxy:
+            conn = http.client.HTTPSConnection(
+                proxy[0], proxy[1], timeout=REQUEST_TIMEOUT_S, context=self._ssl_context
+            )
+            conn.set_tunnel(parts.hostname, parts.port, headers=proxy[2])
+            return conn
+        return http.client.HTTPSConnection(
+            parts.hostname, parts.port, timeout=REQUEST_TIMEOUT_S, context=self._ssl_context
+        )
+
+    def _acquire(self, origin: str):
+        """(connection, reused)."""
+        with self._lock:
+            while self._idle:
+                key, conn = self._idle.pop()
+                if key == origin:
+                    return conn, True
+                conn.close()
+        return self._connect(origin), False
+
+    def _release(self, origin: str, conn) -> None:
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append((origin, conn))
+                return
+        conn.close()
+
+    def prewarm(self, n: int) -> int:
+        origin = settings.GEMINI_API_BASE
+        opened = []
+        for _ in range(n):
+            conn = self._connect(origin)
+            try:
+                conn.connect()
+            except OSError as e:
+                logger.warning("Gemini connection warmup failed: %s", e)
+                conn.close()
+                break
+            opened.append(conn)
+        for conn in opened:
+            self._release(origin, conn)
+        return len(opened)
+
+    def post(self, path: str, body: bytes):
+        """(status, reason, headers, body). Transport failures raise urllib.error.URLError."""
+        import http.client
+
+        origin = settings.GEMINI_API_BASE
+        headers = {"Content-Type": "application/json"}
+        proxy = self._proxy(origin)
+        if proxy and urlsplit(origin).scheme == "http":
+            # Forward proxy: absolute URL in the request line, credentials on every request.
+            parts = urlsplit(origin)
+            path = f"{parts.scheme}://{parts.netloc}{path}"
+            headers.update(proxy[2])
+        for attempt in range(2):
+            conn, reused = self._acquire(origin)
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except TimeoutError:
+                conn.close()
+                raise
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused and attempt == 0 and isinstance(e, (ConnectionError, http.client.BadStatusLine)):
+                    continue  # the server dropped an idle keep-alive connection; retry on a fresh one
+                raise urllib.error.URLError(e)
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(origin, conn)
+            return resp.status, resp.reason, resp.headers, data
+        raise urllib.error.URLError("connection retry exhausted")
+
+
+_pool = _ConnectionPool()
+
+
 def _generate_content(image_path: Path, model: str) -> Optional[dict]:
     mime_type = mimetypes.guess_type(image_path.name)[0] or "image/jpeg"
     with image_path.open("rb") as f:
@@ -152,19 +286,20 @@ def _generate_content(image_path: Path, model: str) -> Optional[dict]:
             }
         ],
     }
-    url = (
-        "https://generativelanguage.googleapis.com/v1beta/models/"
-        f"{model}:generateContent?key={settings.GEMINI_API_KEY}"
-    )
-    req = urllib.request.Request(
-        url=url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=45) as resp:
-        body = resp.read().decode("utf-8")
-    return json.loads(body)
+    base = urlsplit(settings.GEMINI_API_BASE)
+    path = f"{base.path.rstrip('/')}/v1beta/models/{model}:generateContent?key={settings.GEMINI_API_KEY}"
+    status, reason, headers, body = _pool.post(path, json.dumps(payload).encode("utf-8"))
+    if status >= 400:
+        url = f"{base.scheme}://{base.netloc}{path}"
+        raise urllib.error.HTTPError(url, status, reason, headers, None)
+    return json.loads(body.decode("utf-8"))
+
+
+def warm_connections(n: int = 2) -> int:
+    """Open up to `n` keep-alive connections to the Gemini endpoint ahead of the first extraction."""
+    if not settings.GEMINI_API_KEY:
+        return 0
+    return _pool.prewarm(n)
 
 
 def extract_with_gemini(image_path: str | Path) -> Optional[JewelryData]:
@@ -185,31 +320,45 @@ def extract_with_gemini(image_path: str | Path) -> Optional[JewelryData]:
         candidate_models.extend([m for m in MODEL_FALLBACKS if m not in candidate_models])
 
         for model in candidate_models:
+            started = time.perf_counter()
+            result = "error"
             try:
                 resp_json = _generate_content(path, model)
                 text = _extract_text_from_response(resp_json)
                 if not text:
+                    result = "empty"
                     logger.warning("Gemini returned no text for model '%s'", model)
                     continue
                 data = _parse_json_text(text)
                 if not isinstance(data, dict):
+                    result = "parse_error"
                     logger.warning("Gemini returned non-JSON text for model '%s'", model)
                     continue
                 parsed = JewelryData(**data)
+                result = "ok"
                 logger.info("Gemini extraction succeeded with model '%s'", model)
                 return parsed
             except urllib.error.HTTPError as e:
+                result = "http_error"
                 logger.warning("Gemini HTTPError for model '%s': %s", model, getattr(e, "code", "unknown"))
                 continue
             except (urllib.error.URLError, TimeoutError):
+                result = "transport_error"
                 logger.warning("Gemini transport error for model '%s'", model)
                 continue
             except (json.JSONDecodeError, ValueError, KeyError):
+                result = "parse_error"
                 logger.warning("Gemini response parse error for model '%s'", model)
                 continue
             except Exception:
                 logger.exception("Unexpected Gemini error for model '%s'", model)
                 continue
+            finally:
+                elapsed = time.perf_counter() - started
+                GEMINI_SECONDS.observe(elapsed, model=model, result=result)
+                record_span("gemini", elapsed, model=model, result=result)
+                if result != "ok":
+                    FALLBACKS_TOTAL.inc(path="gemini_model_failed")
         return None
     except Exception:
         logger.exception("Unexpected Gemini extraction setup error")
@@ -0,0 +1,426 @@
+"""
+Re-extraction backfill: run process_upload again on the stored files of records matching a
+filter (typically Review Required or OCR-sourced ones after a parser or prompt change) and
+write back only results that are better than what the record holds.
+
+Jobs live in `backfill_jobs`. Records are visited in _id order with bounded concurrency and
+a start-rate limit; the checkpoint is the highest _id below which every record is done, so
+an interrupted job resumes there. Re-visiting a few records after a crash is harmless: a
+result only replaces the stored one if it ranks higher, and only if the record was not
+edited in the meantime. Records saved by a person (reviewed_at) are never touched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from bson import ObjectId
+
+from app.services.blob_store import resolve_upload
+from app.services.metrics import registry
+from app.services.record_hooks import record_changed
+from app.services.record_store import hot_update, sparse_extracted, split_update, write_cold
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "backfill_jobs"
+PAGE_SIZE = 100
+CHECKPOINT_INTERVAL_S = 2.0
+LEASE_SECONDS = 120  # a "running" job without a heartbeat for this long may be taken over
+HEARTBEAT_INTERVAL_S = LEASE_SECONDS / 4
+RESULTS = ("improved", "unchanged", "missing", "skipped", "conflict", "failed")
+RESUMABLE = ("queued", "paused", "failed")
+
+# Completed outranks Review Required; then confidence; then how many fields were filled.
+_STATUS_RANK = {"Completed": 2, "Review Required": 1}
+# Lowest confidence the processor itself gives a Completed record; below that a person marked it.
+_MIN_AUTO_COMPLETED_CONFIDENCE = 0.8
+
+BACKFILL_RECORDS = registry.counter(
+    "karatplus_backfill_records_total",
+    "Records visited by re-extraction backfills, by result.",
+    ("result",),
+)
+
+_tasks: dict[str, asyncio.Task] = {}
+_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class BackfillError(Exception):
+    """Job not found or not in a state that allows the requested action."""
+
+
+def build_backfill_query(filt: dict) -> dict:
+    """
+    Mongo query for a job filter: {"status": [...], "source": [...], "max_confidence": float,
+    "created_from": iso, "created_to": iso, "ids": [...]}. Records still Processing and
+    records reviewed by a person are always excluded.
+    """
+    statuses = [s for s in (filt.get("status") or []) if s != "Processing"]
+    query: dict[str, Any] = {
+        "status": {"$in": statuses} if statuses else {"$ne": "Processing"},
+        "reviewed_at": None,
+    }
+    if filt.get("source"):
+        query["source"] = {"$in": list(filt["source"])}
+    if filt.get("max_confidence") is not None:
+        query["confidence_score"] = {"$lte": float(filt["max_confidence"])}
+    created: dict[str, datetime] = {}
+    if filt.get("created_from"):
+        created["$gte"] = datetime.fromisoformat(filt["created_from"])
+    if filt.get("created_to"):
+        created["$lt"] = datetime.fromisoformat(filt["created_to"])
+    if created:
+        query["created_at"] = created
+    if filt.get("ids"):
+        query["_id"] = {"$in": [ObjectId(i) for i in filt["ids"]]}
+    return query
+
+
+def quality(status: Optional[str], confidence: Optional[float], extracted: Optional[dict]) -> tuple:
+    """Sortable rank of an extraction result; a backfill writes only when this goes up."""
+    return (_STATUS_RANK.get(status or "", 0), float(confidence or 0.0), len(sparse_extracted(extracted)))
+
+
+def _reviewed_by_person(doc: dict) -> bool:
+    if doc.get("reviewed_at"):
+        return True
+    # Records reviewed before reviewed_at existed: Completed with a confidence extraction never assigns.
+    return doc.get("status") == "Completed" and float(doc.get("confidence_score") or 0.0) < _MIN_AUTO_COMPLETED_CONFIDENCE
+
+
+class _RateLimiter:
+    """Spaces out extraction starts to at most `rate` per second (0 = unlimited)."""
+
+    def __init__(self, rate: float) -> None:
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _extract(path: Path, doc: dict) -> dict:
+    """Worker thread: same pipeline as an upload, returned as the record's $set payload."""
+    from app.services.processor import process_upload
+
+    with span("backfill_extraction", record_id=str(doc["_id"])):
+        record = process_upload(path, image_url=doc.get("image_url") or "", image_filename=doc.get("image_filename"))
+    return {
+        "extracted_data": record.extracted_data.model_dump(),
+        "status": getattr(record.status, "value", record.status),
+        "source": getattr(record.source, "value", record.source),
+        "confidence_score": record.confidence_score,
+        "review_required": record.review_required,
+        "raw_text": record.raw_text,
+    }
+
+
+async def reprocess_record(db, doc: dict, dry_run: bool = False) -> str:
+    """Re-extract one record; returns one of RESULTS."""
+    if _reviewed_by_person(doc):
+        return "skipped"
+    path = await resolve_upload(db, doc.get("image_filename") or "")
+    if path is None:
+        return "missing"
+    try:
+        data = await asyncio.to_thread(_extract, path, doc)
+    except Exception:
+        logger.exception("Backfill extraction failed for %s", doc["_id"])
+        return "failed"
+    old = quality(doc.get("status"), doc.get("confidence_score"), doc.get("extracted_data"))
+    new = quality(data["status"], data["confidence_score"], data["extracted_data"])
+    if new <= old:
+        return "unchanged"
+    if dry_run:
+        return "improved"
+    data["updated_at"] = datetime.utcnow()
+    hot_set, hot_unset, cold = split_update(data)
+    # Conditional on updated_at: an edit made while we were extracting wins.
+    r = await db["jewelry"].update_one(
+        {"_id": doc["_id"], "updated_at": doc.get("updated_at"), "reviewed_at": None},
+        hot_update(hot_set, hot_unset),
+    )
+    if not r.matched_count:
+        return "conflict"
+    await write_cold(db, doc["_id"], cold)
+    await record_changed(
+        str(doc["_id"]),
+        "record.status",
+        status=data["status"],
+        source=data["source"],
+        confidence_score=data["confidence_score"],
+        review_required=data["review_required"],
+    )
+    logger.info("Backfill improved %s: %s -> %s", doc["_id"], old, new)
+    return "improved"
+
+
+_PROJECTION = {
+    "image_url": 1, "image_filename": 1, "status": 1, "source": 1, "confidence_score": 1,
+    "extracted_data": 1, "updated_at": 1, "reviewed_at": 1,
+}
+
+
+def job_payload(doc: dict) -> dict:
+    """API shape of a job document."""
+    out = {"id": doc["_id"]}
+    for k, v in doc.items():
+        if k in ("_id", "owner"):
+            continue
+        if isinstance(v, ObjectId):
+            v = str(v)
+        elif isinstance(v, datetime):
+            v = v.isoformat()
+        out[k] = v
+    total, processed = doc.get("total") or 0, doc.get("processed") or 0
+    out["progress"] = 1.0 if doc.get("status") == "completed" else (round(processed / total, 4) if total else 0.0)
+    return out
+
+
+async def create_job(
+    db,
+    filt: dict,
+    *,
+    concurrency: int = 2,
+    rate_per_s: float = 1.0,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    rebuild_rollups: bool = True,
+) -> dict:
+    """Record a queued job (filter is validated here) and return its document."""
+    query = build_backfill_query(filt)
+    total = await db["jewelry"].count_documents(query)
+    now = datetime.utcnow()
+    doc = {
+        "_id": uuid.uuid4().hex,
+        "filter": filt,
+        "options": {
+            "concurrency": max(1, int(concurrency)),
+            "rate_per_s": max(0.0, float(rate_per_s)),
+            "limit": limit,
+            "dry_run": dry_run,
+            "rebuild_rollups": rebuild_rollups,
+        },
+        "status": "queued",
+        "total": min(total, limit) if limit else total,
+        "processed": 0,
+        "counts": {k: 0 for k in RESULTS},
+        "last_id": None,
+        "error": None,
+        "pause_requested": False,
+        "created_at": now,
+        "started_at": None,
+        "heartbeat_at": None,
+        "finished_at": None,
+    }
+    await db[JOBS_COLLECTION].insert_one(doc)
+    return doc
+
+
+async def claim_job(db, job_id: str) -> dict:
+    """Mark a job running for this process. Raises BackfillError if it is finished or owned elsewhere."""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    doc = await db[JOBS_COLLECTION].find_one_and_update(
+        {
+            "_id": job_id,
+            "$or": [
+                {"status": {"$in": list(RESUMABLE)}},
+                {"status": "running", "heartbeat_at": {"$lt": stale}},
+            ],
+        },
+        {"$set": {
+            "status": "running", "owner": _OWNER, "pause_requested": False,
+            "heartbeat_at": now, "started_at": now, "error": None,
+        }},
+        return_document=True,
+    )
+    if doc is None:
+        existing = await db[JOBS_COLLECTION].find_one({"_id": job_id}, {"status": 1})
+        if existing is None:
+            raise BackfillError("Backfill job not found")
+        raise BackfillError(f"Backfill job is {existing['status']}")
+    return doc
+
+
+async def run_job(db, job: dict) -> dict:
+    """Process a claimed job until done, paused or cancelled. Returns the final job document."""
+    jobs = db[JOBS_COLLECTION]
+    opts = job["options"]
+    base_query = build_backfill_query(job["filter"])
+    limiter = _RateLimiter(opts["rate_per_s"])
+    sem = asyncio.Semaphore(opts["concurrency"])
+    counts: dict[str, int] = dict(job.get("counts") or {k: 0 for k in RESULTS})
+    processed = job.get("processed") or 0
+    last_id = job.get("last_id")
+    last_write = 0.0
+    limit = opts.get("limit")
+
+    stop = asyncio.Event()
+
+    async def heartbeat() -> None:
+        """Renew the lease on a timer: checkpoints only happen as records finish, which can be minutes apart."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_S)
+            try:
+                doc = await jobs.find_one_and_update(
+                    {"_id": job["_id"], "owner": _OWNER},
+                    {"$set": {"heartbeat_at": datetime.utcnow()}},
+                    {"pause_requested": 1},
+                    return_document=True,
+                )
+            except Exception:
+                logger.exception("Backfill job %s heartbeat failed", job["_id"])
+                continue
+            if doc is None or doc.get("pause_requested"):
+                stop.set()
+
+    async def checkpoint() -> bool:
+        """Persist progress; returns True if a pause was requested (possibly by another process)."""
+        nonlocal last_write
+        if stop.is_set():
+            return True
+        if time.monotonic() - last_write < CHECKPOINT_INTERVAL_S:
+            return False
+        last_write = time.monotonic()
+        doc = await jobs.find_one_and_update(
+            {"_id": job["_id"], "owner": _OWNER},
+            {"$set": {"last_id": last_id, "processed": processed, "counts": counts, "heartbeat_at": datetime.utcnow()}},
+            {"pause_requested": 1},
+            return_document=True,
+        )
+        # Lost the lease (another process took over): stop like a pause.
+        return doc is None or bool(doc.get("pause_requested"))
+
+    async def one(doc: dict) -> str:
+        async with sem:
+            await limiter.wait()
+            return await reprocess_record(db, doc, opts["dry_run"])
+
+    final_status, error = "completed", None
+    beat = asyncio.create_task(heartbeat())
+    try:
+        while not limit or processed < limit:
+            query = base_query if last_id is None else {"$and": [base_query, {"_id": {"$gt": last_id}}]}
+            page_size = PAGE_SIZE if not limit else min(PAGE_SIZE, limit - processed)
+            page = await db["jewelry"].find(query, _PROJECTION).sort("_id", 1).limit(page_size).to_list(page_size)
+            if not page:
+                break
+            pending = {asyncio.ensure_future(one(doc)): i for i, doc in enumerate(page)}
+            done_flags = [False] * len(page)
+            watermark = 0
+            paused = False
+            try:
+                for fut in asyncio.as_completed(list(pending)):
+                    result = await fut
+                    counts[result] = counts.get(result, 0) + 1
+                    processed += 1
+                    BACKFILL_RECORDS.inc(result=result)
+                    # Advance the checkpoint only over a contiguous prefix of finished records.
+                    for f, i in pending.items():
+                        if f.done() and not f.cancelled():
+                            done_flags[i] = True
+                    while watermark < len(page) and done_flags[watermark]:
+                        last_id = page[watermark]["_id"]
+                        watermark += 1
+                    if await checkpoint():
+                        paused = True
+                        break
+            finally:
+                for f in pending:
+                    f.cancel()
+            if paused:
+                final_status = "paused"
+                break
+    except asyncio.CancelledError:
+        final_status = "paused"
+    except Exception as e:
+        logger.exception("Backfill job %s failed", job["_id"])
+        final_status, error = "failed", str(e) or e.__class__.__name__
+    finally:
+        beat.cancel()
+
+    update: dict[str, Any] = {
+        "status": final_status, "last_id": last_id, "processed": processed, "counts": counts,
+        "error": error, "heartbeat_at": datetime.utcnow(),
+    }
+    if final_status == "completed":
+        update["finished_at"] = datetime.utcnow()
+    # Shielded so a cancelled task still records where it stopped.
+    await asyncio.shield(jobs.update_one({"_id": job["_id"], "owner": _OWNER}, {"$set": update}))
+    if final_status == "completed" and counts.get("improved") and opts.get("rebuild_rollups") and not opts["dry_run"]:
+        # Rollups count extraction events; rewritten records shift status and confidence buckets.
+        from app.services.rollups import rebuild_rollups
+
+        await rebuild_rollups(db)
+    logger.info("Backfill job %s %s: %s", job["_id"], final_status, counts)
+    return await jobs.find_one({"_id": job["_id"]})
+
+
+async def start_job(db, job_id: str) -> dict:
+    """Claim a job and run it in the background of this process."""
+    if job_id in _tasks:
+        raise BackfillError("Backfill job is running")
+    job = await claim_job(db, job_id)
+    task = asyncio.create_task(run_job(db, job))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+    return job
+
+
+async def pause_job(db, job_id: str) -> dict:
+    """Ask a running job to stop at its next checkpoint (any process), or stop it now if it runs here."""
+    doc = await db[JOBS_COLLECTION].find_one_and_update(
+        {"_id": job_id, "status": {"$in": ["running", "queued"]}},
+        {"$set": {"pause_requested": True}},
+        return_document=True,
+    )
+    if doc is None:
+        existing = await db[JOBS_COLLECTION].find_one({"_id": job_id}, {"status": 1})
+        if existing is None:
+            raise BackfillError("Backfill job not found")
+        return await db[JOBS_COLLECTION].find_one({"_id": job_id})
+    task = _tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    elif doc["status"] == "queued":
+        await db[JOBS_COLLECTION].update_one({"_id": job_id}, {"$set": {"status": "paused"}})
+    return await db[JOBS_COLLECTION].find_one({"_id": job_id})
+
+
+async def get_job(db, job_id: str) -> Optional[dict]:
+    return await db[JOBS_COLLECTION].find_one({"_id": job_id})
+
+
+async def list_jobs(db, limit: int = 50) -> list[dict]:
+    return await db[JOBS_COLLECTION].find({}).sort("created_at", -1).limit(limit).to_list(limit)
+
+
+async def stop_all() -> None:
+    """Shutdown: stop local jobs; their checkpoints stay resumable."""
+    tasks = list(_tasks.values())
+    for t in tasks:
+        t.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
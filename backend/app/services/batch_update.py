@@ -0,0 +1,161 @@
+"""Batch partial updates of extracted_data with per-item results decided by each item's own write."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.models.jewelry import JewelryBatchPatch, JewelryData, JewelryPatchItem, ProcessingStatus
+from app.services.record_store import BLOB_COLLECTION, cold_update_op, hot_update, split_update
+
+PATCH_CONCURRENCY = 16
+
+
+def _validated_fields(item: JewelryPatchItem) -> dict[str, Any]:
+    """Validate the partial patch against JewelryData; raises ValueError on bad input."""
+    unknown = set(item.fields) - set(JewelryData.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not item.fields:
+        raise ValueError("No fields to update")
+    try:
+        data = JewelryData.model_validate(item.fields)
+    except ValidationError as e:
+        raise ValueError(e.errors()[0].get("msg", "Invalid value")) from None
+    return data.model_dump(include=set(item.fields))
+
+
+async def _patch_one(coll, flt: dict, update: dict) -> Optional[datetime]:
+    """Apply one hot update; its updated_at if the filter matched (i.e. this write applied), else None."""
+    doc = await coll.find_one_and_update(
+        flt, update, projection={"updated_at": 1}, return_document=ReturnDocument.AFTER
+    )
+    return doc.get("updated_at") if doc else None
+
+
+async def apply_batch_patch(coll, batch: JewelryBatchPatch) -> list[dict]:
+    """
+    Returns one result per input item, in order. Status is one of:
+    updated, conflict (updated_at changed), not_found, invalid, error, skipped (ordered batch stopped),
+    partial (hot fields written but the gem/metal tables were not; detail says why).
+    Each outcome comes from that item's own find_one_and_update, filtered on `expected_updated_at`,
+    so concurrent writers cannot turn an applied patch into a conflict. Unordered batches run
+    up to PATCH_CONCURRENCY items at once; ordered ones one at a time, stopping at the first error.
+    Raises ValueError if an id appears more than once, since both patches would race on one record.
+    """
+    seen: set[str] = set()
+    for item in batch.items:
+        key = item.id.strip().lower()
+        if key in seen:
+            raise ValueError(f"Duplicate id in batch: {item.id}")
+        seen.add(key)
+    now = datetime.utcnow()
+    # Mongo stores milliseconds; truncate so the returned updated_at round-trips as an expected value.
+    stamp = now.replace(microsecond=(now.microsecond // 1000) * 1000)
+    results: list[dict] = [{"id": it.id, "status": "pending"} for it in batch.items]
+    pending: list[tuple[int, ObjectId, dict, dict, dict]] = []  # (item index, oid, filter, hot update, cold)
+
+    for i, item in enumerate(batch.items):
+        try:
+            oid = ObjectId(item.id)
+        except Exception:
+            results[i] = {"id": item.id, "status": "not_found"}
+            continue
+        try:
+            fields = _validated_fields(item)
+        except ValueError as e:
+            results[i] = {"id": item.id, "status": "invalid", "detail": str(e)}
+            continue
+        update = {f"extracted_data.{k}": v for k, v in fields.items()}
+        update["updated_at"] = stamp
+        if item.mark_reviewed:
+            update["status"] = ProcessingStatus.COMPLETED.value
+            update["review_required"] = False
+            update["reviewed_at"] = stamp
+        flt: dict = {"_id": oid}
+        if item.expected_updated_at is not None:
+            expected = item.expected_updated_at
+            if expected.tzinfo is not None:
+                # Stored times are naive UTC; convert rather than drop the offset.
+                expected = expected.astimezone(timezone.utc).replace(tzinfo=None)
+            flt["updated_at"] = expected
+        hot_set, hot_unset, cold = split_update(update)
+        pending.append((i, oid, flt, hot_update(hot_set, hot_unset), cold))
+
+    applied: dict[int, datetime] = {}  # index into pending -> updated_at after the write
+    unmatched: list[int] = []
+    failed: dict[int, str] = {}
+
+    async def run(n: int) -> None:
+        _, _, flt, update, _ = pending[n]
+        try:
+            ts = await _patch_one(coll, flt, update)
+        except PyMongoError as e:
+            failed[n] = str(e) or e.__class__.__name__
+            return
+        if ts is None:
+            unmatched.append(n)
+        else:
+            applied[n] = ts
+
+    if batch.ordered:
+        for n in range(len(pending)):
+            await run(n)
+            if n in failed:
+                for i, *_ in pending[n + 1:]:
+                    results[i] = {"id": batch.items[i].id, "status": "skipped"}
+                break
+    else:
+        sem = asyncio.Semaphore(PATCH_CONCURRENCY)
+
+        async def bounded(n: int) -> None:
+            async with sem:
+                await run(n)
+
+        await asyncio.gather(*(bounded(n) for n in range(len(pending))))
+
+    # No match: the record is gone (not_found) or was changed since expected_updated_at (conflict).
+    current: dict[ObjectId, Any] = {}
+    if unmatched:
+        current = {
+            d["_id"]: d.get("updated_at")
+            async for d in coll.find({"_id": {"$in": [pending[n][1] for n in unmatched]}}, {"updated_at": 1})
+        }
+    for n in unmatched:
+        i, oid = pending[n][0], pending[n][1]
+        if oid in current:
+            results[i] = {"id": batch.items[i].id, "status": "conflict", "updated_at": current[oid]}
+        else:
+            results[i] = {"id": batch.items[i].id, "status": "not_found"}
+    for n, detail in failed.items():
+        i = pending[n][0]
+        results[i] = {"id": batch.items[i].id, "status": "error", "detail": detail}
+
+    # Cold fields (gem/metal tables) go with every hot write that applied.
+    cold_ops: list[UpdateOne] = []
+    cold_of: list[int] = []
+    for n, ts in applied.items():
+        i, oid = pending[n][0], pending[n][1]
+        results[i] = {"id": batch.items[i].id, "status": "updated", "updated_at": ts}
+        op = cold_update_op(oid, pending[n][4])
+        if op is not None:
+            cold_ops.append(op)
+            cold_of.append(i)
+    if cold_ops:
+        cold_failed: dict[int, str] = {}
+        try:
+            await coll.database[BLOB_COLLECTION].bulk_write(cold_ops, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                cold_failed[cold_of[err["index"]]] = err.get("errmsg", "write error")
+        except PyMongoError as e:
+            cold_failed = {i: str(e) or e.__class__.__name__ for i in cold_of}
+        for i, detail in cold_failed.items():
+            results[i] = {**results[i], "status": "partial", "detail": f"gem/metal tables not saved: {detail}"}
+    return results
@@ -0,0 +1,218 @@
+"""
+Content-addressed upload storage. Files are stored once per SHA-256 under
+UPLOAD_DIR/blobs/ab/cd/<sha><ext>, written atomically (temp file + rename) and
+reference-counted in `upload_blobs`. Public names (`<uuid><ext>`, used in image_url)
+map to a blob through `upload_names`, so URLs never change. Files saved before this
+layout still live flat in UPLOAD_DIR and are served from there.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BLOBS_COLLECTION = "upload_blobs"
+NAMES_COLLECTION = "upload_names"
+BLOB_SUBDIR = "blobs"
+
+UPLOAD_ROOT = Path(settings.UPLOAD_DIR)
+
+
+def blob_path(sha256: str, ext: str) -> Path:
+    """Two levels of 256-way sharding keep every directory small."""
+    return UPLOAD_ROOT / BLOB_SUBDIR / sha256[:2] / sha256[2:4] / f"{sha256}{ext}"
+
+
+def _write_atomic(path: Path, content: bytes) -> bool:
+    """Write `content` to `path` unless it already exists. Returns True if written."""
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # Same directory, so the rename is atomic; concurrent writers of the same sha produce identical bytes.
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return True
+
+
+def _retire(path: Path) -> Optional[Path]:
+    """Atomically move a blob out of its served path. Returns the new path, or None if it was absent."""
+    retired = path.with_name(f".{path.name}.{uuid.uuid4().hex}.released")
+    try:
+        os.replace(path, retired)
+    except FileNotFoundError:
+        return None
+    return retired
+
+
+def _restore(retired: Path, path: Path) -> None:
+    # A concurrent store may have rewritten the same bytes already; either copy is fine.
+    os.replace(retired, path)
+
+
+def _discard(retired: Path, path: Path) -> None:
+    retired.unlink(missing_ok=True)
+
+
+class _PathCache:
+    """Small LRU of public name -> file path. Names are immutable, so entries only go away on release."""
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self._items: OrderedDict[str, Path] = OrderedDict()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+
+    def get(self, name: str) -> Optional[Path]:
+        with self._lock:
+            path = self._items.get(name)
+            if path is not None:
+                self._items.move_to_end(name)
+            return path
+
+    def put(self, name: str, path: Path) -> None:
+        with self._lock:
+            self._items[name] = path
+            self._items.move_to_end(name)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, name: str) -> None:
+        with self._lock:
+            self._items.pop(name, None)
+
+
+_paths = _PathCache()
+
+
+async def ensure_blob_indexes(db) -> None:
+    await db[NAMES_COLLECTION].create_index([("sha256", 1)])
+
+
+async def store_upload(db, content: bytes, sha256: str, ext: str) -> tuple[str, Path]:
+    """
+    Store bytes (once per sha) and register a new public name for them.
+    Returns (public filename, path on disk).
+    """
+    name = f"{uuid.uuid4().hex}{ext}"
+    path = blob_path(sha256, ext)
+    # Take the reference before touching disk. A release racing with this either sees the
+    # reference when it re-checks (and puts the file back) or retired the file before our
+    # existence check (so we write it); see release_upload.
+    await db[BLOBS_COLLECTION].update_one(
+        {"_id": sha256},
+        {
+            "$inc": {"refs": 1},
+            "$setOnInsert": {"ext": ext, "size": len(content), "created_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+    await asyncio.to_thread(_write_atomic, path, content)
+    await db[NAMES_COLLECTION].insert_one(
+        {"_id": name, "sha256": sha256, "ext": ext, "created_at": datetime.utcnow()}
+    )
+    _paths.put(name, path)
+    return name, path
+
+
+async def resolve_upload(db, name: str) -> Optional[Path]:
+    """Path for a public upload name: mapped blob first, then a legacy flat file."""
+    if not name or "/" in name or "\\" in name or name.startswith("."):
+        return None
+    path = _paths.get(name)
+    if path is not None and path.exists():
+        return path
+    mapping = await db[NAMES_COLLECTION].find_one({"_id": name})
+    if mapping:
+        path = blob_path(mapping["sha256"], mapping.get("ext") or "")
+    else:
+        path = UPLOAD_ROOT / name
+    if not path.is_file():
+        return None
+    _paths.put(name, path)
+    return path
+
+
+async def release_upload(db, name: Optional[str]) -> None:
+    """Drop a public name; the blob is deleted when its last reference goes away."""
+    if not name:
+        return
+    _paths.pop(name)
+    mapping = await db[NAMES_COLLECTION].find_one_and_delete({"_id": name})
+    if not mapping:
+        # Legacy flat files are left in place; they were never reference-counted.
+        return
+    sha = mapping["sha256"]
+    blob = await db[BLOBS_COLLECTION].find_one_and_update(
+        {"_id": sha}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER
+    )
+    if blob is None or blob.get("refs", 0) > 0:
+        return
+    r = await db[BLOBS_COLLECTION].delete_one({"_id": sha, "refs": {"$lte": 0}})
+    if not r.deleted_count:
+        return
+    path = blob_path(sha, mapping.get("ext") or "")
+    # A store_upload of the same bytes may take a new reference right after the delete and
+    # skip writing because the file is still there. So move the file aside first, then
+    # look again: if the blob was referenced meanwhile, put it back instead of deleting it.
+    try:
+        retired = await asyncio.to_thread(_retire, path)
+    except OSError as e:
+        logger.warning("Could not remove upload blob %s: %s", path, e)
+        return
+    if retired is None:
+        return
+    revived = await db[BLOBS_COLLECTION].find_one({"_id": sha, "refs": {"$gt": 0}}, {"_id": 1})
+    try:
+        await asyncio.to_thread(_restore if revived else _discard, retired, path)
+    except OSError as e:
+        logger.warning("Could not finish releasing upload blob %s: %s", path, e)
+
+
+async def import_legacy_uploads(db) -> int:
+    """Move flat UPLOAD_DIR files into the sharded layout, keeping their names. Idempotent."""
+    import hashlib
+
+    moved = 0
+    for path in sorted(UPLOAD_ROOT.iterdir()):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        if await db[NAMES_COLLECTION].find_one({"_id": path.name}, {"_id": 1}):
+            continue
+        content = await asyncio.to_thread(path.read_bytes)
+        sha = hashlib.sha256(content).hexdigest()
+        ext = path.suffix.lower()
+        await db[BLOBS_COLLECTION].update_one(
+            {"_id": sha},
+            {
+                "$inc": {"refs": 1},
+                "$setOnInsert": {"ext": ext, "size": len(content), "created_at": datetime.utcnow()},
+            },
+            upsert=True,
+        )
+        await asyncio.to_thread(_write_atomic, blob_path(sha, ext), content)
+        await db[NAMES_COLLECTION].insert_one(
+            {"_id": path.name, "sha256": sha, "ext": ext, "created_at": datetime.utcnow()}
+        )
+        await asyncio.to_thread(path.unlink)
+        moved += 1
+    return moved
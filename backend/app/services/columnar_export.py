@@ -0,0 +1,318 @@
+"""
+Analytics exports: Parquet / Arrow IPC (zip of record + child tables) and NDJSON.
+Nested metal_weights and gem_details rows are normalized into child tables keyed by record_id.
+pyarrow is only imported when a columnar format is requested.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional
+
+from app.services.export_service import EXPORT_BATCH_SIZE, _batches, _ChunkSink, export_cursor
+from app.services.record_store import BLOB_COLLECTION, attach_cold_many
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+ANALYTICS_FORMATS = COLUMNAR_FORMATS + ("ndjson",)
+
+# (column, arrow type name) for the records table; extracted_data fields are flattened.
+RECORD_FIELDS: list[tuple[str, str]] = [
+    ("id", "string"),
+    ("status", "string"),
+    ("source", "string"),
+    ("confidence_score", "float64"),
+    ("review_required", "bool"),
+    ("image_filename", "string"),
+    ("ring_size", "string"),
+    ("gold_weight_14kt_gm", "float64"),
+    ("gold_weight_18kt_gm", "float64"),
+    ("gold_weight_22kt_gm", "float64"),
+    ("silver_weight_gm", "float64"),
+    ("platinum_weight_gm", "float64"),
+    ("diamond_weight_ct", "float64"),
+    ("diamond_count", "int64"),
+    ("diamond_shape", "string"),
+    ("stone_weight_ct", "float64"),
+    ("stone_count", "int64"),
+    ("stone_type", "string"),
+    ("dimensions_mm", "string"),
+    ("length_mm", "float64"),
+    ("width_mm", "float64"),
+    ("height_mm", "float64"),
+    ("created_at", "timestamp"),
+    ("updated_at", "timestamp"),
+]
+_TOP_LEVEL = {"status", "source", "confidence_score", "review_required", "image_filename", "created_at", "updated_at"}
+
+METAL_FIELDS: list[tuple[str, str]] = [
+    ("record_id", "string"),
+    ("row_index", "int32"),
+    ("metal", "string"),
+    ("grams", "float64"),
+    ("dwt", "float64"),
+    ("spg", "float64"),
+    ("extra", "string"),
+]
+GEM_FIELDS: list[tuple[str, str]] = [
+    ("record_id", "string"),
+    ("row_index", "int32"),
+    ("gem", "string"),
+    ("shape", "string"),
+    ("size", "string"),
+    ("count", "int64"),
+    ("weight", "string"),
+    ("weight_ct", "float64"),
+    ("extra", "string"),
+]
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _to_float(v: Any) -> Optional[float]:
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    m = _NUMBER_RE.search(str(v))
+    return float(m.group(0)) if m else None
+
+
+def _to_int(v: Any) -> Optional[int]:
+    f = _to_float(v)
+    return int(f) if f is not None else None
+
+
+def _to_str(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    return v if isinstance(v, str) else str(v)
+
+
+_COERCE: dict[str, Callable[[Any], Any]] = {
+    "string": _to_str,
+    "float64": _to_float,
+    "int64": _to_int,
+    "int32": _to_int,
+    "bool": lambda v: None if v is None else bool(v),
+    "timestamp": lambda v: v,
+}
+
+
+def _record_row(doc: dict, fields: list[tuple[str, str]]) -> dict:
+    ext = doc.get("extracted_data") or {}
+    row = {}
+    for name, typ in fields:
+        if name == "id":
+            raw = str(doc.get("_id", ""))
+        elif name in _TOP_LEVEL:
+            raw = doc.get(name)
+        else:
+            raw = ext.get(name)
+        row[name] = _COERCE[typ](raw)
+    return row
+
+
+def _child_rows(record_id: str, rows: Any, fields: list[tuple[str, str]], aliases: dict[str, str]) -> list[dict]:
+    if not isinstance(rows, list):
+        return []
+    known = {name for name, _ in fields}
+    out = []
+    for i, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            continue
+        norm = {str(k).strip().lower().replace(" ", "_"): v for k, v in raw.items()}
+        for src, dst in aliases.items():
+            if dst not in norm and src in norm:
+                norm[dst] = norm.pop(src)
+        row: dict[str, Any] = {"record_id": record_id, "row_index": i}
+        for name, typ in fields:
+            if name in ("record_id", "row_index", "extra", "weight_ct"):
+                continue
+            row[name] = _COERCE[typ](norm.get(name))
+        if "weight_ct" in known:
+            row["weight_ct"] = _to_float(norm.get("weight"))
+        extra = {k: v for k, v in norm.items() if k not in known}
+        row["extra"] = json.dumps(extra, default=str) if extra else None
+        out.append(row)
+    return out
+
+
+_METAL_ALIASES = {"weight": "grams", "gm": "grams", "grams_(g)": "grams"}
+_GEM_ALIASES = {"stone": "gem", "qty": "count", "pcs": "count", "carat": "weight", "ct": "weight"}
+
+
+def normalize_batch(docs: list[dict], record_fields: list[tuple[str, str]]) -> tuple[list[dict], list[dict], list[dict]]:
+    """Split a cursor batch into (records, metal_weights, gem_details) rows."""
+    records, metals, gems = [], [], []
+    for doc in docs:
+        rid = str(doc.get("_id", ""))
+        ext = doc.get("extracted_data") or {}
+        records.append(_record_row(doc, record_fields))
+        metals.extend(_child_rows(rid, ext.get("metal_weights"), METAL_FIELDS, _METAL_ALIASES))
+        gems.extend(_child_rows(rid, ext.get("gem_details"), GEM_FIELDS, _GEM_ALIASES))
+    return records, metals, gems
+
+
+def select_record_fields(fields: Optional[str]) -> list[tuple[str, str]]:
+    if not fields:
+        return list(RECORD_FIELDS)
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    # id is always kept so child tables can be joined back.
+    selected = [f for f in RECORD_FIELDS if f[0] == "id" or f[0] in wanted]
+    return selected if len(selected) > 1 else list(RECORD_FIELDS)
+
+
+def _arrow_schema(fields: list[tuple[str, str]]):
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "int32": pa.int32(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us"),
+    }
+    return pa.schema([(name, types[typ]) for name, typ in fields])
+
+
+class _TableWriter:
+    """Appends record batches to one Parquet or Arrow IPC file."""
+
+    def __init__(self, path: Path, fields: list[tuple[str, str]], fmt: str) -> None:
+        import pyarrow as pa
+
+        self.schema = _arrow_schema(fields)
+        self.names = [name for name, _ in fields]
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(str(path), "wb")
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, rows: list[dict]) -> None:
+        import pyarrow as pa
+
+        if not rows:
+            return
+        arrays = [pa.array([r.get(n) for r in rows], type=self.schema.field(n).type) for n in self.names]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if hasattr(self._writer, "write_batch"):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(pa.Table.from_batches([batch]))
+
+    def close(self) -> None:
+        self._writer.close()
+        sink = getattr(self, "_sink", None)
+        if sink is not None:
+            sink.close()
+
+
+async def _stream_zip_of(paths: list[Path], chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    # Parquet/Arrow files are already compressed (or columnar); store them as-is.
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for p in paths:
+            with zf.open(p.name, mode="w", force_zip64=True) as dst, p.open("rb") as src:
+                while True:
+                    block = src.read(chunk_size)
+                    if not block:
+                        break
+                    dst.write(block)
+                    yield sink.drain()
+    yield sink.drain()
+
+
+async def _full_batches(cursor, blob_coll, batch_size: int) -> AsyncIterator[list[dict]]:
+    """Cursor batches with metal_weights / gem_details merged back from the blob collection."""
+    async for batch in _batches(cursor, batch_size):
+        yield await attach_cold_many(blob_coll, batch) if blob_coll is not None else batch
+
+
+async def stream_columnar(
+    cursor,
+    fmt: str,
+    record_fields: list[tuple[str, str]],
+    batch_size: int = EXPORT_BATCH_SIZE,
+    on_rows: Optional[Callable[[int], None]] = None,
+    blob_coll=None,
+) -> AsyncIterator[bytes]:
+    """
+    Write records/metal_weights/gem_details tables batch by batch into temp files,
+    then stream them as one zip. Memory is bounded by one cursor batch.
+    """
+    ext = "parquet" if fmt == "parquet" else "arrow"
+    with tempfile.TemporaryDirectory(prefix="karatplus-export-") as tmp:
+        tmp_dir = Path(tmp)
+        paths = [tmp_dir / f"records.{ext}", tmp_dir / f"metal_weights.{ext}", tmp_dir / f"gem_details.{ext}"]
+        writers = [
+            _TableWriter(paths[0], record_fields, fmt),
+            _TableWriter(paths[1], METAL_FIELDS, fmt),
+            _TableWriter(paths[2], GEM_FIELDS, fmt),
+        ]
+        try:
+            async for batch in _full_batches(cursor, blob_coll, batch_size):
+                tables = normalize_batch(batch, record_fields)
+                await asyncio.to_thread(lambda: [w.write(rows) for w, rows in zip(writers, tables)])
+                if on_rows:
+                    on_rows(len(batch))
+        finally:
+            for w in writers:
+                w.close()
+        async for chunk in _stream_zip_of(paths):
+            if chunk:
+                yield chunk
+
+
+async def stream_ndjson(
+    cursor,
+    record_fields: list[tuple[str, str]],
+    batch_size: int = EXPORT_BATCH_SIZE,
+    on_rows: Optional[Callable[[int], None]] = None,
+    blob_coll=None,
+) -> AsyncIterator[bytes]:
+    """One JSON object per line, tagged with `_table` (records / metal_weights / gem_details)."""
+    import orjson
+
+    for_tables = ("records", "metal_weights", "gem_details")
+    async for batch in _full_batches(cursor, blob_coll, batch_size):
+        lines = []
+        for table, rows in zip(for_tables, normalize_batch(batch, record_fields)):
+            for row in rows:
+                row["_table"] = table
+                lines.append(orjson.dumps(row))
+        if on_rows:
+            on_rows(len(batch))
+        yield b"\n".join(lines) + b"\n"
+
+
+def stream_analytics_export(
+    coll,
+    query: dict,
+    fmt: str,
+    fields: Optional[str] = None,
+    on_rows: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[bytes]:
+    record_fields = select_record_fields(fields)
+    # raw_text is never exported; legacy documents may still carry the arrays inline.
+    cursor = export_cursor(coll, query, projection={"raw_text": 0})
+    blob_coll = coll.database[BLOB_COLLECTION]
+    if fmt == "ndjson":
+        return stream_ndjson(cursor, record_fields, on_rows=on_rows, blob_coll=blob_coll)
+    return stream_columnar(cursor, fmt, record_fields, on_rows=on_rows, blob_coll=blob_coll)
+
+
+def columnar_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,97 @@
+"""
+Delta sync: records changed since a watermark, ordered by (updated_at, _id), plus tombstones
+for deletions. Watermarks are opaque base64url tokens of "<updated_at iso>|<_id>".
+"""
+
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.services.record_store import HOT_PROJECTION
+
+TOMBSTONE_COLLECTION = "jewelry_tombstones"
+MAX_PAGE = 2000
+
+
+def encode_watermark(ts: datetime, oid: Optional[ObjectId]) -> str:
+    raw = f"{ts.isoformat()}|{oid or ''}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_watermark(token: Optional[str]) -> tuple[Optional[datetime], Optional[ObjectId]]:
+    """Raises ValueError for malformed tokens; empty token means "from the beginning"."""
+    if not token:
+        return None, None
+    padded = token + "=" * (-len(token) % 4)
+    raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+    ts_part, _, oid_part = raw.partition("|")
+    ts = datetime.fromisoformat(ts_part)
+    try:
+        oid = ObjectId(oid_part) if oid_part else None
+    except (InvalidId, TypeError) as e:
+        raise ValueError(f"Invalid watermark id: {e}") from e
+    return ts, oid
+
+
+async def ensure_tombstone_indexes(db) -> None:
+    await db[TOMBSTONE_COLLECTION].create_index([("deleted_at", 1)])
+    await db["jewelry"].create_index([("updated_at", 1), ("_id", 1)])
+
+
+async def write_tombstone(db, oid: ObjectId) -> None:
+    await db[TOMBSTONE_COLLECTION].update_one(
+        {"_id": oid}, {"$set": {"deleted_at": datetime.utcnow()}}, upsert=True
+    )
+
+
+async def changes_since(db, token: Optional[str], limit: int = 500) -> dict:
+    """
+    One page of changes after `token`. Clients apply `items` (upsert by id) and
+    `deleted` (remove by id), store `next`, and call again while `has_more`.
+    """
+    limit = max(1, min(limit, MAX_PAGE))
+    since_ts, since_oid = decode_watermark(token)
+
+    q: dict = {}
+    if since_ts is not None:
+        if since_oid is not None:
+            q = {
+                "$or": [
+                    {"updated_at": {"$gt": since_ts}},
+                    {"updated_at": since_ts, "_id": {"$gt": since_oid}},
+                ]
+            }
+        else:
+            q = {"updated_at": {"$gt": since_ts}}
+    cursor = db["jewelry"].find(q, HOT_PROJECTION).sort([("updated_at", 1), ("_id", 1)]).limit(limit + 1)
+    docs = await cursor.to_list(length=limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    deleted: list[str] = []
+    next_ts, next_oid = since_ts, since_oid
+    if docs:
+        next_ts, next_oid = docs[-1].get("updated_at"), docs[-1]["_id"]
+    if since_ts is not None:
+        tq: dict = {"deleted_at": {"$gt": since_ts}}
+        if has_more and next_ts is not None:
+            tq["deleted_at"]["$lte"] = next_ts
+        async for t in db[TOMBSTONE_COLLECTION].find(tq).sort("deleted_at", 1):
+            deleted.append(str(t["_id"]))
+            if not docs and (next_ts is None or t["deleted_at"] > next_ts):
+                next_ts, next_oid = t["deleted_at"], None
+
+    if next_ts is None:
+        # Empty collection on first sync: start from now so later writes are picked up.
+        next_ts = datetime.utcnow()
+    return {
+        "docs": docs,
+        "deleted": deleted,
+        "next": encode_watermark(next_ts, next_oid),
+        "has_more": has_more,
+    }
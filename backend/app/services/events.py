@@ -0,0 +1,124 @@
+"""
+In-memory event broker for record state transitions and progress (single-node fan-out).
+`publish` is thread-safe so the background extraction threads can feed it directly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+SUBSCRIBER_QUEUE_SIZE = 256
+REPLAY_BUFFER_SIZE = 1000
+
+
+class Subscription:
+    def __init__(self, broker: "InMemoryBroker", record_id: Optional[str]) -> None:
+        self.broker = broker
+        self.record_id = record_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, event: dict) -> None:
+        if self.record_id and event.get("record_id") != self.record_id:
+            return
+        if self.queue.full():
+            # Slow consumer: drop the oldest event rather than block publishers.
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker._subscribers.discard(self)
+
+
+class InMemoryBroker:
+    """Fan-out to every subscriber in this process, with a short replay buffer for Last-Event-ID."""
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+        self._recent: deque[dict] = deque(maxlen=REPLAY_BUFFER_SIZE)
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def publish(self, event_type: str, record_id: Optional[str] = None, **data) -> None:
+        with self._id_lock:
+            event_id = next(self._ids)
+        event = {
+            "id": event_id,
+            "type": event_type,
+            "record_id": record_id,
+            "ts": datetime.utcnow().isoformat(),
+            **data,
+        }
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: dict) -> None:
+        self._recent.append(event)
+        for sub in list(self._subscribers):
+            sub.offer(event)
+
+    def subscribe(self, record_id: Optional[str] = None, last_event_id: Optional[int] = None) -> Subscription:
+        sub = Subscription(self, record_id)
+        if last_event_id is not None:
+            for event in self._recent:
+                if event["id"] > last_event_id:
+                    sub.offer(event)
+        self._subscribers.add(sub)
+        return sub
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = InMemoryBroker()
+
+
+def format_sse(event: dict) -> bytes:
+    import orjson
+
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: ".encode("utf-8") + orjson.dumps(event) + b"\n\n"
+
+
+async def sse_stream(request, sub: Subscription, heartbeat: float = 15.0) -> AsyncIterator[bytes]:
+    """SSE body for one subscriber; ends when the client disconnects."""
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            if await request.is_disconnected():
+                break
+            event = await sub.get(timeout=heartbeat)
+            if event is None:
+                yield b": keepalive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        sub.close()
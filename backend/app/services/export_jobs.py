@@ -0,0 +1,213 @@
+"""
+Asynchronous export jobs. Results are cached on disk by query fingerprint + data
+watermark (latest updated_at and matching count), so unchanged exports are served instantly.
+Builds run in a worker thread with their own event loop and Mongo client, so XLSX/Parquet
+encoding never stalls the API loop. Files older than EXPORT_TTL_HOURS are swept.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.services.export_service import build_export_query, export_media_type, stream_export
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = Path(settings.EXPORT_DIR)
+MAX_TRACKED_JOBS = 200
+SWEEP_INTERVAL_S = 600.0
+
+
+class ExportJob:
+    def __init__(self, params: dict, fingerprint: str, cache_key: str, total: int) -> None:
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.fingerprint = fingerprint
+        self.cache_key = cache_key
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.total = total
+        self.rows_written = 0
+        self.cached = False
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def path(self) -> Path:
+        return EXPORT_DIR / f"{self.cache_key}-{export_media_type(self.params['format'])[1]}"
+
+    def to_dict(self) -> dict:
+        progress = 1.0 if self.status == "completed" else (
+            round(self.rows_written / self.total, 4) if self.total else 0.0
+        )
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "total": self.total,
+            "rows_written": self.rows_written,
+            "progress": progress,
+            "cached": self.cached,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "download_url": f"/api/jewelry/export/jobs/{self.id}/download" if self.status == "completed" else None,
+        }
+
+
+_jobs: dict[str, ExportJob] = {}
+_running_by_key: dict[str, ExportJob] = {}
+_tasks: set[asyncio.Task] = set()
+_last_sweep = 0.0
+
+
+def _fingerprint(params: dict) -> str:
+    blob = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:24]
+
+
+async def _watermark(coll, query: dict) -> tuple[str, int]:
+    """Token that changes whenever a matching record is written, added or removed."""
+    total = await coll.count_documents(query)
+    latest = await coll.find(query, {"updated_at": 1}).sort("updated_at", -1).limit(1).to_list(1)
+    ts = latest[0].get("updated_at") if latest else None
+    stamp = ts.strftime("%Y%m%dT%H%M%S%f") if ts else "empty"
+    return f"{stamp}-{total}", total
+
+
+def _remember(job: ExportJob) -> None:
+    _jobs[job.id] = job
+    if len(_jobs) > MAX_TRACKED_JOBS:
+        for old_id in list(_jobs)[: len(_jobs) - MAX_TRACKED_JOBS]:
+            if _jobs[old_id].status in ("completed", "failed"):
+                _jobs.pop(old_id, None)
+
+
+def _drop_stale(job: ExportJob) -> None:
+    """Remove cached files for the same query with an older watermark."""
+    for p in EXPORT_DIR.glob(f"{job.fingerprint}-*"):
+        if p != job.path and not p.name.endswith(".part"):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+
+def sweep_exports(max_age_s: float) -> int:
+    """Delete export files (and leftover .part files) not modified for `max_age_s`. Returns the count."""
+    cutoff = time.time() - max_age_s
+    removed = 0
+    for p in EXPORT_DIR.glob("*"):
+        try:
+            if p.is_file() and p.stat().st_mtime < cutoff:
+                p.unlink()
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _maybe_sweep() -> None:
+    # Files only appear when jobs are submitted, so sweeping from there bounds the directory.
+    global _last_sweep
+    if settings.EXPORT_TTL_HOURS <= 0 or time.monotonic() - _last_sweep < SWEEP_INTERVAL_S:
+        return
+    _last_sweep = time.monotonic()
+    removed = sweep_exports(settings.EXPORT_TTL_HOURS * 3600)
+    if removed:
+        logger.info("Removed %d expired export files", removed)
+
+
+async def _build(job: ExportJob, query: dict, tmp: Path) -> None:
+    """Write the export to `tmp`. Runs on the job's own loop in a worker thread (Motor clients are per loop)."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    def on_rows(n: int) -> None:
+        job.rows_written += n
+
+    client = AsyncIOMotorClient(settings.MONGODB_URI, maxPoolSize=2)
+    try:
+        coll = client[settings.MONGODB_DB]["jewelry"]
+        with open(tmp, "wb") as f:
+            async for chunk in stream_export(
+                coll, query, fmt=job.params["format"], fields=job.params.get("fields"), on_rows=on_rows
+            ):
+                f.write(chunk)
+    finally:
+        client.close()
+
+
+async def _run(job: ExportJob, query: dict) -> None:
+    job.status = "running"
+    tmp = job.path.with_name(job.path.name + f".{job.id}.part")
+    try:
+        await asyncio.to_thread(asyncio.run, _build(job, query, tmp))
+        os.replace(tmp, job.path)
+        job.status = "completed"
+        _drop_stale(job)
+    except Exception as e:
+        logger.exception("Export job %s failed", job.id)
+        job.status = "failed"
+        job.error = str(e) or e.__class__.__name__
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+    finally:
+        job.finished_at = datetime.utcnow()
+        _running_by_key.pop(job.cache_key, None)
+
+
+async def submit_export_job(coll, params: dict) -> ExportJob:
+    """Return a completed job for a cache hit, an in-flight job for the same key, or start a new one."""
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    _maybe_sweep()
+    query = build_export_query(
+        date=params.get("date"), start=params.get("start"), end=params.get("end"), status=params.get("status")
+    )
+    fingerprint = _fingerprint(params)
+    watermark, total = await _watermark(coll, query)
+    cache_key = f"{fingerprint}-{watermark}"
+
+    running = _running_by_key.get(cache_key)
+    if running is not None:
+        return running
+
+    job = ExportJob(params, fingerprint, cache_key, total)
+    _remember(job)
+    if job.path.exists():
+        try:
+            os.utime(job.path)  # served again: restart its TTL
+        except OSError:
+            pass
+        job.status = "completed"
+        job.cached = True
+        job.rows_written = total
+        job.finished_at = datetime.utcnow()
+        return job
+
+    _running_by_key[cache_key] = job
+    task = asyncio.create_task(_run(job, query))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def get_export_job(job_id: str) -> Optional[ExportJob]:
+    return _jobs.get(job_id)
+
+
+def export_job_download(job: ExportJob) -> tuple[Path, str, str]:
+    """(path, media type, download filename) for a completed job."""
+    media_type, name = export_media_type(job.params["format"])
+    return job.path, media_type, name
@@ -0,0 +1,301 @@
+"""Streaming XLSX/CSV export. Rows are emitted per cursor batch, so memory stays flat."""
+
+from __future__ import annotations
+
+import csv
+import io
+import math
+import re
+import zipfile
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Optional
+from xml.sax.saxutils import escape
+
+EXPORT_BATCH_SIZE = 1000
+
+# (key, header, getter). Keys are what ?fields= selects on.
+EXPORT_COLUMNS: list[tuple[str, str, Callable[[dict, dict], Any]]] = [
+    ("id", "Product ID", lambda d, e: str(d.get("_id", ""))),
+    ("status", "Status", lambda d, e: d.get("status", "")),
+    ("source", "Source", lambda d, e: d.get("source", "")),
+    ("confidence_score", "Confidence", lambda d, e: d.get("confidence_score", "")),
+    ("image_filename", "Image Filename", lambda d, e: d.get("image_filename", "")),
+    ("ring_size", "Ring Size", lambda d, e: e.get("ring_size", "")),
+    ("gold_weight_14kt_gm", "Gold Wt 14k (g)", lambda d, e: e.get("gold_weight_14kt_gm", "")),
+    ("gold_weight_18kt_gm", "Gold Wt 18k (g)", lambda d, e: e.get("gold_weight_18kt_gm", "")),
+    ("gold_weight_22kt_gm", "Gold Wt 22k (g)", lambda d, e: e.get("gold_weight_22kt_gm", "")),
+    ("silver_weight_gm", "Silver Wt (g)", lambda d, e: e.get("silver_weight_gm", "")),
+    ("platinum_weight_gm", "Platinum Wt (g)", lambda d, e: e.get("platinum_weight_gm", "")),
+    ("diamond_weight_ct", "Diamond Wt (ct)", lambda d, e: e.get("diamond_weight_ct", "")),
+    ("diamond_count", "Diamond Count", lambda d, e: e.get("diamond_count", "")),
+    ("diamond_shape", "Diamond Shape", lambda d, e: e.get("diamond_shape", "")),
+    ("stone_weight_ct", "Stone Wt (ct)", lambda d, e: e.get("stone_weight_ct", "")),
+    ("stone_count", "Stone Count", lambda d, e: e.get("stone_count", "")),
+    ("stone_type", "Stone Type", lambda d, e: e.get("stone_type", "")),
+    ("dimensions_mm", "Dimensions", lambda d, e: e.get("dimensions_mm", "")),
+    ("length_mm", "Length (mm)", lambda d, e: e.get("length_mm", "")),
+    ("width_mm", "Width (mm)", lambda d, e: e.get("width_mm", "")),
+    ("height_mm", "Height (mm)", lambda d, e: e.get("height_mm", "")),
+    ("created_at", "Created At", lambda d, e: d.get("created_at").isoformat() if d.get("created_at") else ""),
+    ("updated_at", "Updated At", lambda d, e: d.get("updated_at").isoformat() if d.get("updated_at") else ""),
+]
+COLUMN_KEYS = [c[0] for c in EXPORT_COLUMNS]
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+
+def select_columns(fields: Optional[str]) -> list[tuple[str, str, Callable[[dict, dict], Any]]]:
+    """Columns for a comma-separated ?fields= list (unknown keys ignored; empty = all)."""
+    if not fields:
+        return list(EXPORT_COLUMNS)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    by_key = {c[0]: c for c in EXPORT_COLUMNS}
+    cols = [by_key[k] for k in wanted if k in by_key]
+    return cols or list(EXPORT_COLUMNS)
+
+
+def _parse_day(value: str, name: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid {name} date {value!r}; expected YYYY-MM-DD") from None
+
+
+def build_export_query(
+    date: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    status: Optional[str] = None,
+) -> dict:
+    """
+    Mongo filter for an export. `date` keeps the old single-day behaviour; `start`/`end`
+    are inclusive YYYY-MM-DD days. Raises ValueError for an unparsable day, since
+    dropping a bound would silently widen the export.
+    """
+    query: dict = {}
+    created: dict = {}
+    if date:
+        day = _parse_day(date, "date")
+        created = {"$gte": day, "$lt": day + timedelta(days=1)}
+    else:
+        if start:
+            created["$gte"] = _parse_day(start, "start")
+        if end:
+            created["$lt"] = _parse_day(end, "end") + timedelta(days=1)
+    if created:
+        query["created_at"] = created
+    if status:
+        query["status"] = status
+    return query
+
+
+def _row(doc: dict, columns) -> list[Any]:
+    ext = doc.get("extracted_data") or {}
+    out = []
+    for _, _, get in columns:
+        v = get(doc, ext)
+        out.append("" if v is None else v)
+    return out
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until drained (no tell/seek)."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+
+    def write(self, b: bytes) -> int:
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _col_letter(i: int) -> str:
+    s = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+# Characters XML 1.0 does not allow at all (escaping doesn't help); OCR raw_text has form
+# feeds and escape codes, and Excel rejects the whole workbook if a sheet contains them.
+_XML_INVALID_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff\ud800-\udfff]")
+
+
+def _xlsx_cell(ref: str, value: Any) -> str:
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return ""
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if value == "":
+        return ""
+    text = escape(_XML_INVALID_RE.sub("", str(value)))
+    if not text:
+        return ""
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(n: int, values: list[Any], letters: list[str]) -> str:
+    cells = "".join(_xlsx_cell(f"{letters[i]}{n}", v) for i, v in enumerate(values))
+    return f'<row r="{n}">{cells}</row>'
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Jewelry Specs" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
+
+
+async def _batches(cursor, batch_size: int) -> AsyncIterator[list[dict]]:
+    batch: list[dict] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def stream_csv(
+    cursor,
+    columns,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    on_rows: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c[1] for c in columns])
+    # UTF-8 BOM so Excel picks the right encoding when opening the CSV directly.
+    yield ("\ufeff" + buf.getvalue()).encode("utf-8")
+    async for batch in _batches(cursor, batch_size):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(_row(doc, columns) for doc in batch)
+        if on_rows:
+            on_rows(len(batch))
+        yield buf.getvalue().encode("utf-8")
+
+
+async def stream_xlsx(
+    cursor,
+    columns,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    on_rows: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Minimal SpreadsheetML package written straight into a streaming zip
+    (inline strings, no shared-string table), so nothing is held per row.
+    """
+    sink = _ChunkSink()
+    zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    for name, xml in _XLSX_STATIC.items():
+        zf.writestr(name, xml)
+    yield sink.drain()
+
+    letters = [_col_letter(i) for i in range(len(columns))]
+    sheet = zf.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True)
+    sheet.write(
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+    )
+    sheet.write(_xlsx_row(1, [c[1] for c in columns], letters).encode("utf-8"))
+    n = 1
+    async for batch in _batches(cursor, batch_size):
+        parts = []
+        for doc in batch:
+            n += 1
+            parts.append(_xlsx_row(n, _row(doc, columns), letters))
+        sheet.write("".join(parts).encode("utf-8"))
+        if on_rows:
+            on_rows(len(batch))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    sheet.write(b"</sheetData></worksheet>")
+    sheet.close()
+    zf.close()
+    yield sink.drain()
+
+
+def export_cursor(coll, query: dict, batch_size: int = EXPORT_BATCH_SIZE, projection: Optional[dict] = None):
+    """Cursor for an export: newest first, fetched from Mongo in `batch_size` batches."""
+    return coll.find(query, projection).sort("created_at", -1).batch_size(batch_size)
+
+
+EXPORT_FORMATS = ("xlsx", "csv", "parquet", "arrow", "ndjson")
+
+
+def stream_export(
+    coll,
+    query: dict,
+    fmt: str = "xlsx",
+    fields: Optional[str] = None,
+    on_rows: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[bytes]:
+    if fmt in ("parquet", "arrow", "ndjson"):
+        from app.services.columnar_export import stream_analytics_export
+
+        return stream_analytics_export(coll, query, fmt, fields=fields, on_rows=on_rows)
+    from app.services.record_store import HOT_PROJECTION
+
+    columns = select_columns(fields)
+    cursor = export_cursor(coll, query, projection=HOT_PROJECTION)
+    if fmt == "csv":
+        return stream_csv(cursor, columns, on_rows=on_rows)
+    return stream_xlsx(cursor, columns, on_rows=on_rows)
+
+
+def export_media_type(fmt: str) -> tuple[str, str]:
+    """(media type, download filename) for an export format."""
+    if fmt == "csv":
+        return CSV_MEDIA_TYPE, "jewelry_export.csv"
+    if fmt == "ndjson":
+        return "application/x-ndjson", "jewelry_export.ndjson"
+    if fmt in ("parquet", "arrow"):
+        return "application/zip", f"jewelry_export_{fmt}.zip"
+    return XLSX_MEDIA_TYPE, "jewelry_export.xlsx"
@@ -0,0 +1,196 @@
+"""
+Building blocks shared by the in-memory record indexes (similar-design search, valuation).
+
+ColumnStore keeps record ids and numpy columns with one dense row per record (capacity
+grown by doubling, swap-remove on delete). FeedFollower builds an index once and then keeps
+it current from changes_since (the delta sync feed), so writes from any process or path
+(uploads, edits, backfills, deletes) reach it within one refresh interval.
+numpy is imported on first use.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+from datetime import datetime
+from typing import Any, Optional
+
+from app.services.delta_sync import changes_since, encode_watermark
+
+logger = logging.getLogger(__name__)
+
+FEED_PAGE = 1000
+DIAMOND_SHAPES = (
+    "round", "princess", "oval", "pear", "marquise", "cushion", "emerald", "heart", "asscher", "radiant", "other",
+)
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def load_numpy():
+    import numpy
+
+    return numpy
+
+
+def to_number(v: Any) -> Optional[float]:
+    """Non-negative finite number from a value or a string like "1.25 ct"; None otherwise."""
+    if v is None or isinstance(v, bool):
+        return None
+    if not isinstance(v, (int, float)):
+        m = _NUMBER_RE.search(str(v))
+        if not m:
+            return None
+        v = m.group(0)
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) and f >= 0 else None
+
+
+def category_index(value: Any, vocab: tuple[str, ...]) -> Optional[int]:
+    """Index of the first vocab word contained in `value`, the last entry ("other") if none, None if empty."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    v = value.strip().lower()
+    for i, name in enumerate(vocab):
+        if name in v:
+            return i
+    return len(vocab) - 1
+
+
+class ColumnStore:
+    """
+    Record ids plus named numpy columns, one row per id; rows [0, len) are live.
+    `columns` maps name -> (trailing shape, dtype). Not locked: owners hold their own lock.
+    """
+
+    def __init__(self, columns: dict[str, tuple[tuple[int, ...], str]]) -> None:
+        self._spec = columns
+        self.ids: list[str] = []
+        self._row: dict[str, int] = {}
+        self._cols: dict[str, Any] = {}
+        self.capacity = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, name: str):
+        """Whole column including spare capacity; slice [:len(store)] for live rows."""
+        return self._cols[name]
+
+    def row(self, record_id: str) -> Optional[int]:
+        return self._row.get(record_id)
+
+    def _grow(self, needed: int) -> None:
+        np = load_numpy()
+        if needed <= self.capacity and self._cols:
+            return
+        new_cap = max(1024, needed, self.capacity * 2)
+        for name, (shape, dtype) in self._spec.items():
+            col = np.zeros((new_cap, *shape), dtype=dtype)
+            if name in self._cols and self.capacity:
+                col[: self.capacity] = self._cols[name]
+            self._cols[name] = col
+        self.capacity = new_cap
+
+    def reset(self, ids: list[str]) -> None:
+        """Replace the contents with zeroed rows for `ids` (fill the columns afterwards)."""
+        self._cols = {}
+        self.capacity = 0
+        self._grow(len(ids))
+        self.ids = list(ids)
+        self._row = {rid: i for i, rid in enumerate(self.ids)}
+
+    def slot(self, record_id: str) -> int:
+        """Row of `record_id`, appending a zeroed row if it is new."""
+        i = self._row.get(record_id)
+        if i is None:
+            i = len(self.ids)
+            self._grow(i + 1)
+            for col in self._cols.values():
+                col[i] = 0
+            self.ids.append(record_id)
+            self._row[record_id] = i
+        return i
+
+    def remove(self, record_id: str) -> bool:
+        i = self._row.pop(record_id, None)
+        if i is None:
+            return False
+        last = len(self.ids) - 1
+        if i != last:
+            # Swap-remove keeps rows [0, n) dense.
+            moved = self.ids[last]
+            for col in self._cols.values():
+                col[i] = col[last]
+            self.ids[i] = moved
+            self._row[moved] = i
+        self.ids.pop()
+        return True
+
+
+class FeedFollower:
+    """
+    Base for an in-memory index fed by changes_since. Subclasses implement `load` (full
+    build) and `apply` (one page of changed docs and deleted ids); `before_page` runs every
+    cycle for anything else to poll. `ready` turns True after the first load.
+    """
+
+    name = "index"
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def refresh_s(self) -> float:
+        return 2.0
+
+    async def load(self, db) -> None:
+        raise NotImplementedError
+
+    async def apply(self, db, page: dict) -> None:
+        raise NotImplementedError
+
+    async def before_page(self, db) -> None:
+        pass
+
+    async def _follow(self, db) -> None:
+        token = None
+        while True:
+            try:
+                if token is None:
+                    # Watermark before the scan: changes during the load are replayed (applies are idempotent).
+                    start = encode_watermark(datetime.utcnow(), None)
+                    await self.load(db)
+                    self.ready = True
+                    token = start
+                await self.before_page(db)
+                page = await changes_since(db, token, limit=FEED_PAGE)
+                if page["docs"] or page["deleted"]:
+                    await self.apply(db, page)
+                token = page["next"]
+                if page["has_more"]:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s refresh failed", self.name)
+            await asyncio.sleep(self.refresh_s)
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._follow(db))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,73 @@
+"""File responses with single-range (HTTP Range) support for resumable downloads."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse `bytes=a-b`, `bytes=a-` or `bytes=-n`. Returns inclusive (start, end) or None."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            n = int(last)
+            if n <= 0:
+                return None
+            return max(size - n, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+async def _iter_file(path: Path, start: int, length: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+    path: Path,
+    range_header: Optional[str],
+    media_type: str,
+    headers: Optional[dict] = None,
+) -> Response:
+    """FileResponse for full reads; 206 partial content when a valid Range is requested."""
+    headers = dict(headers or {})
+    headers["Accept-Ranges"] = "bytes"
+    size = os.stat(path).st_size
+    if not range_header:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    rng = _parse_range(range_header, size)
+    if rng is None:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+    start, end = rng
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,59 @@
+"""Fast JSON encoding of Mongo documents (ObjectId, datetime, nested lists) straight to bytes."""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Iterable
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "value"):  # Enum
+        return obj.value
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def doc_payload(doc: dict) -> dict:
+    """
+    API shape of a Mongo document: `_id` -> `id`, missing extracted_data -> {}.
+    Datetimes and ObjectIds are left for orjson, so this is one shallow copy.
+    """
+    item = {"id": str(doc.get("_id", ""))}
+    item.update(doc)
+    item.pop("_id", None)
+    item.setdefault("created_at", None)
+    item.setdefault("updated_at", None)
+    if not item.get("extracted_data"):
+        item["extracted_data"] = {}
+    return item
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def encode_docs(docs: Iterable[dict], total: int | None = None) -> bytes:
+    items = [doc_payload(d) for d in docs]
+    return dumps({"items": items, "total": len(items) if total is None else total})
+
+
+class RecordJSONResponse(Response):
+    """JSON response rendered with orjson; bypasses FastAPI's jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
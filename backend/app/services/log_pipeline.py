@@ -0,0 +1,156 @@
+"""
+Structured logging off the request path. Handlers on the root logger only enqueue records
+(bounded, dropping when full); one writer thread formats them as JSON lines (or plain text)
+and writes them to stderr in batches. Records carry the current trace id.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import settings
+
+BATCH_MAX = 256
+# LogRecord attributes that are not user-supplied `extra` fields.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _RESERVED and not k.startswith("_"):
+                out[k] = v
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "trace_id"):
+            record.trace_id = "-"
+        return super().format(record)
+
+
+class QueueingHandler(logging.Handler):
+    """Enqueue-only handler: never blocks the caller; counts records dropped when the queue is full."""
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__()
+        self.queue = q
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        from app.services.tracing import current_trace_id
+
+        if not hasattr(record, "trace_id"):
+            tid = current_trace_id()
+            if tid:
+                record.trace_id = tid
+        # Render args and tracebacks now; the objects they reference may change before the writer runs.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BatchWriter(threading.Thread):
+    def __init__(self, q: "queue.Queue[Optional[logging.LogRecord]]", formatter: logging.Formatter, stream) -> None:
+        super().__init__(name="log-writer", daemon=True)
+        self.q = q
+        self.formatter = formatter
+        self.stream = stream
+
+    def run(self) -> None:
+        while True:
+            record = self.q.get()
+            batch = [record]
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = []
+            for r in batch:
+                if r is None:
+                    continue
+                try:
+                    lines.append(self.formatter.format(r))
+                except Exception:
+                    continue
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+
+_handler: Optional[QueueingHandler] = None
+_writer: Optional[_BatchWriter] = None
+
+
+def configure_logging() -> None:
+    """Install the queueing handler on the root logger (idempotent)."""
+    global _handler, _writer
+    if _handler is not None:
+        return
+    q: "queue.Queue" = queue.Queue(maxsize=max(100, settings.LOG_QUEUE_SIZE))
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    _writer = _BatchWriter(q, formatter, sys.stderr)
+    _writer.start()
+    _handler = QueueingHandler(q)
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+
+def queue_pressure() -> float:
+    """Fill ratio of the log queue (0..1); tracing samples less when it is high."""
+    if _handler is None:
+        return 0.0
+    q = _handler.queue
+    return q.qsize() / q.maxsize if q.maxsize else 0.0
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def shutdown_logging(timeout: float = 2.0) -> None:
+    """Flush what is queued and stop the writer."""
+    global _handler, _writer
+    if _handler is None or _writer is None:
+        return
+    logging.getLogger().removeHandler(_handler)
+    try:
+        _handler.queue.put(None, timeout=timeout)
+    except queue.Full:
+        pass
+    _writer.join(timeout)
+    _handler = _writer = None
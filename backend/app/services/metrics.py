@@ -0,0 +1,241 @@
+"""
+In-process metrics (counters, gauges, histograms) rendered in the Prometheus text format
+at /metrics. Thread-safe, since extraction stages run in worker threads.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Covers sub-millisecond DB/hash stages up to slow Gemini calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 45.0, 90.0)
+
+LabelKey = tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple[str, ...], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_str(self.labels, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set/inc/dec gauge, or a callback gauge read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[LabelKey, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> list[str]:
+        if self._callback is not None:
+            try:
+                return [f"{self.name} {_fmt(self._callback())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_str(self.labels, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        n = len(self.buckets)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (n + 2)
+            i = 0
+            while i < n and value > self.buckets[i]:
+                i += 1
+            series[i] += 1
+            series[n + 1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        out = []
+        n = len(self.buckets)
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[: n + 1]):
+                cumulative += count
+                le = f'le="{_fmt(bound)}"'
+                out.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {_fmt(cumulative)}")
+            out.append(f"{self.name}_sum{_label_str(self.labels, key)} {_fmt(series[n + 1])}")
+            out.append(f"{self.name}_count{_label_str(self.labels, key)} {_fmt(cumulative)}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, help, labels, callback))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Pipeline metrics shared by the router, processor and extraction services.
+STAGE_SECONDS = registry.histogram(
+    "karatplus_stage_seconds",
+    "Duration of upload and extraction pipeline stages.",
+    ("stage",),
+)
+GEMINI_SECONDS = registry.histogram(
+    "karatplus_gemini_request_seconds",
+    "Duration of Gemini generateContent calls by model and result.",
+    ("model", "result"),
+)
+UPLOADS_TOTAL = registry.counter(
+    "karatplus_uploads_total",
+    "Upload requests by result.",
+    ("result",),
+)
+EXTRACTIONS_TOTAL = registry.counter(
+    "karatplus_extractions_total",
+    "Finished extractions by source and status.",
+    ("source", "status"),
+)
+FALLBACKS_TOTAL = registry.counter(
+    "karatplus_fallbacks_total",
+    "Fallback paths taken (next Gemini model, OCR, text, minimal review record).",
+    ("path",),
+)
+EXTRACTIONS_IN_FLIGHT = registry.gauge(
+    "karatplus_extractions_in_flight",
+    "Background extraction jobs currently running.",
+)
+EXTRACTIONS_IN_FLIGHT.set(0)
+
+
+def stage(name: str):
+    """`with stage("hash"): ...` records into karatplus_stage_seconds."""
+    return STAGE_SECONDS.time(stage=name)
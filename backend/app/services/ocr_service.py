@@ -10,6 +10,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 from app.models.jewelry import JewelryData
+from app.services.metrics import stage
 
 # OCR availability cache. We avoid pytesseract/cv2 imports because unstable
 # numpy wheels on some Windows setups can crash the Python process.
@@ -28,6 +29,29 @@ def _ocr_available() -> bool:
     return _OCR_AVAILABLE
 
 
+def warm_ocr() -> Optional[str]:
+    """
+    Resolve OCR availability now instead of on the first fallback, and run `tesseract --version`
+    once so a broken install is found at startup. Returns the version line, or None if unavailable.
+    """
+    global _OCR_AVAILABLE
+    if not _ocr_available():
+        return None
+    from PIL import Image
+
+    Image.init()  # plugin registration otherwise happens inside the first Image.open
+    try:
+        proc = subprocess.run(["tesseract", "--version"], capture_output=True, text=True, timeout=15)
+    except (OSError, subprocess.SubprocessError):
+        _OCR_AVAILABLE = False
+        return None
+    if proc.returncode != 0:
+        _OCR_AVAILABLE = False
+        return None
+    # Older releases print the version on stderr.
+    return ((proc.stdout or proc.stderr).strip().splitlines() or [""])[0]
+
+
 # Regex patterns for jewelry units: (\d+\.?\d*)\s*(gm|ct|mm) and karat (14k, 18k, 22k)
 PATTERNS = {
     "gold_weight_14kt_gm": re.compile(r"(?:14\s*k|14kt|14k)\s*[:\s]*(\d+\.?\d*)\s*gm", re.I),
@@ -160,7 +184,8 @@ def extract_from_text(text: str) -> JewelryData:
     """Public helper to map plain text/table text into JewelryData."""
     if not text:
         return JewelryData()
-    return _extract_with_regex(text)
+    with stage("regex_parse"):
+        return _extract_with_regex(text)
 
 
 def extract_with_ocr(image_path: str | Path) -> tuple[JewelryData, str]:
@@ -175,20 +200,22 @@ def extract_with_ocr(image_path: str | Path) -> tuple[JewelryData, str]:
     if not path.exists():
         return JewelryData(), "OCR unavailable: image file does not exist."
     try:
-        pil_img = _preprocess_image(path)
+        with stage("ocr_preprocess"):
+            pil_img = _preprocess_image(path)
         if pil_img is None:
             return JewelryData(), "OCR preprocessing failed."
         with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
             tmp_path = Path(tmp.name)
         try:
             pil_img.save(tmp_path)
-            proc = subprocess.run(
-                ["tesseract", str(tmp_path), "stdout", "--psm", "6"],
-                capture_output=True,
-                text=True,
-                timeout=25,
-                check=False,
-            )
+            with stage("tesseract"):
+                proc = subprocess.run(
+                    ["tesseract", str(tmp_path), "stdout", "--psm", "6"],
+                    capture_output=True,
+                    text=True,
+                    timeout=25,
+                    check=False,
+                )
             raw_text = proc.stdout or ""
             if proc.returncode != 0 and not raw_text:
                 raw_text = (proc.stderr or "").strip()
@@ -0,0 +1,145 @@
+"""
+Perceptual hashing (dHash, 64-bit) of uploaded images and an in-memory BK-tree for
+near-duplicate lookup by Hamming distance. Hashes are stored on records as 16-char hex.
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+from typing import Optional
+
+HASH_SIZE = 8  # 8x8 difference grid -> 64 bits
+
+
+def compute_dhash(content: bytes) -> Optional[str]:
+    """dHash of image bytes, or None if the bytes are not a readable image."""
+    try:
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(content)) as img:
+            # draft() lets JPEG decode at reduced scale; it only works before the first load(),
+            # which exif_transpose triggers.
+            img.draft("L", (HASH_SIZE * 16, HASH_SIZE * 16))
+            img = ImageOps.exif_transpose(img)
+            small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+            px = list(small.getdata())
+    except Exception:
+        return None
+    bits = 0
+    w = HASH_SIZE + 1
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = px[row * w + col]
+            right = px[row * w + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"{bits:016x}"
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Metric tree over Hamming distance; each node holds all record ids with the same hash."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self) -> None:
+        # node = [hash, ids(set), children(dict distance -> node)]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, h: int, record_id: str) -> None:
+        self._size += 1
+        if self._root is None:
+            self._root = [h, {record_id}, {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].add(record_id)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, {record_id}, {}]
+                return
+            node = child
+
+    def discard(self, h: int, record_id: str) -> None:
+        node = self._root
+        while node is not None:
+            d = hamming(h, node[0])
+            if d == 0:
+                if record_id in node[1]:
+                    node[1].discard(record_id)
+                    self._size -= 1
+                return
+            node = node[2].get(d)
+
+    def search(self, h: int, max_distance: int) -> list[tuple[int, str]]:
+        """All (distance, record_id) within max_distance, nearest first."""
+        if self._root is None:
+            return []
+        out: list[tuple[int, str]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_distance:
+                out.extend((d, rid) for rid in node[1])
+            lo, hi = d - max_distance, d + max_distance
+            for cd, child in node[2].items():
+                if lo <= cd <= hi:
+                    stack.append(child)
+        out.sort()
+        return out
+
+
+class PhashIndex:
+    """Thread-safe BK-tree of record hashes, loaded from Mongo at startup and updated on writes."""
+
+    def __init__(self) -> None:
+        self._tree = BKTree()
+        self._by_id: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def add(self, record_id: str, phash: Optional[str]) -> None:
+        if not phash:
+            return
+        h = int(phash, 16)
+        with self._lock:
+            old = self._by_id.get(record_id)
+            if old is not None:
+                self._tree.discard(old, record_id)
+            self._by_id[record_id] = h
+            self._tree.add(h, record_id)
+
+    def remove(self, record_id: str) -> None:
+        with self._lock:
+            h = self._by_id.pop(record_id, None)
+            if h is not None:
+                self._tree.discard(h, record_id)
+
+    def nearest(self, phash: str, max_distance: int) -> list[tuple[int, str]]:
+        h = int(phash, 16)
+        with self._lock:
+            return self._tree.search(h, max_distance)
+
+    async def load(self, db) -> int:
+        cursor = db["jewelry"].find({"phash": {"$type": "string"}}, {"phash": 1})
+        n = 0
+        async for doc in cursor:
+            self.add(str(doc["_id"]), doc["phash"])
+            n += 1
+        return n
+
+
+phash_index = PhashIndex()
@@ -1,6 +1,7 @@
 """Orchestrates AI -> OCR fallback. Never raises; returns record with Review status on full failure."""
 
 from pathlib import Path
+from typing import Callable, Optional
 
 from app.models.jewelry import (
     JewelryData,
@@ -9,7 +10,9 @@ from app.models.jewelry import (
     ExtractionSource,
 )
 from app.services.ai_service import extract_with_gemini
+from app.services.metrics import FALLBACKS_TOTAL, stage
 from app.services.ocr_service import extract_from_text, extract_with_ocr
+from app.services.tracing import span
 
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
 PDF_EXTS = {".pdf"}
@@ -65,9 +68,23 @@ def _extract_excel_text(path: Path) -> str:
         return ""
 
 
-def _process_text_document(path: Path, record: JewelryRecord) -> JewelryRecord:
+def _report(on_progress: Optional[Callable[[str], None]], stage: str) -> None:
+    if on_progress is None:
+        return
+    try:
+        on_progress(stage)
+    except Exception:
+        pass
+
+
+def _process_text_document(
+    path: Path,
+    record: JewelryRecord,
+    on_progress: Optional[Callable[[str], None]] = None,
+) -> JewelryRecord:
     ext = path.suffix.lower()
     if ext in PDF_EXTS:
+        _report(on_progress, "gemini")
         # Scanned PDFs often have no embedded text; Gemini can read visual content directly.
         ai_data = extract_with_gemini(path)
         if ai_data is not None:
@@ -83,11 +100,15 @@ def _process_text_document(path: Path, record: JewelryRecord) -> JewelryRecord:
                 record.review_required = True
             return record
 
-    raw_text = ""
+    _report(on_progress, "text")
     if ext in PDF_EXTS:
-        raw_text = _extract_pdf_text(path)
-    elif ext in EXCEL_EXTS:
-        raw_text = _extract_excel_text(path)
+        FALLBACKS_TOTAL.inc(path="pdf_text")
+    raw_text = ""
+    with stage("text_extract"), span("text_extract", ext=ext):
+        if ext in PDF_EXTS:
+            raw_text = _extract_pdf_text(path)
+        elif ext in EXCEL_EXTS:
+            raw_text = _extract_excel_text(path)
 
     data = extract_from_text(raw_text)
     record.extracted_data = data
@@ -139,10 +160,12 @@ def process_upload(
     file_path: str | Path,
     image_url: str = "",
     image_filename: str | None = None,
+    on_progress: Optional[Callable[[str], None]] = None,
 ) -> JewelryRecord:
     """
     Step 1: Try Gemini. Step 2: On failure, use OCR + regex.
     Never raises. On total failure returns record with status Review Required, partial data, confidence 0.5.
+    `on_progress` is called with the stage name ("gemini", "ocr", "text") as work starts.
     """
     path = Path(file_path)
     record = JewelryRecord(
@@ -156,7 +179,7 @@ def process_upload(
 
     ext = path.suffix.lower()
     if ext in PDF_EXTS or ext in EXCEL_EXTS:
-        return _process_text_document(path, record)
+        return _process_text_document(path, record, on_progress)
     if ext not in IMAGE_EXTS:
         record.status = ProcessingStatus.REVIEW
         record.source = ExtractionSource.OCR
@@ -166,6 +189,7 @@ def process_upload(
         return record
 
     # Step 1: Gemini
+    _report(on_progress, "gemini")
     data = extract_with_gemini(path)
     if data is not None:
         data_dict = data.model_dump()
@@ -185,7 +209,10 @@ def process_upload(
         return record
 
     # Step 2: Safety net - OCR + regex
-    ocr_data, raw_text = extract_with_ocr(path)
+    _report(on_progress, "ocr")
+    FALLBACKS_TOTAL.inc(path="ocr")
+    with span("ocr"):
+        ocr_data, raw_text = extract_with_ocr(path)
     record.extracted_data = ocr_data
     record.raw_text = raw_text or None
     record.status = ProcessingStatus.REVIEW
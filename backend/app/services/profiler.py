@@ -0,0 +1,170 @@
+"""
+On-demand sampling profiler. A sampler thread walks sys._current_frames() at a fixed
+interval and counts stacks in collapsed format ("frame;frame;frame count"), ready for
+flamegraph.pl / speedscope. Nothing runs unless a profile is requested, so the cost is
+zero when idle.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+TARGETS = ("all", "api", "workers")
+MAX_STACK_DEPTH = 128
+KEEP_REQUEST_PROFILES = 50
+
+# Threads that belong to the profiling/logging machinery rather than the app.
+_IGNORED_THREAD_PREFIXES = ("profiler-", "log-writer")
+
+_api_thread_id: Optional[int] = None
+
+
+def mark_api_thread() -> None:
+    """Call from the event loop thread at startup so target="api" can find it."""
+    global _api_thread_id
+    _api_thread_id = threading.get_ident()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}"
+
+
+def _collapse(frame) -> str:
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+def _thread_filter(target: str) -> Callable[[int, str], bool]:
+    api = _api_thread_id
+
+    def accept(ident: int, name: str) -> bool:
+        if name.startswith(_IGNORED_THREAD_PREFIXES):
+            return False
+        if target == "api":
+            return ident == api
+        if target == "workers":
+            return ident != api
+        return True
+
+    return accept
+
+
+class Sampler:
+    def __init__(self, accept: Callable[[int, str], bool], interval: float, label_threads: bool = True) -> None:
+        self.accept = accept
+        self.interval = max(0.001, interval)
+        self.label_threads = label_threads
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                name = names.get(ident, str(ident))
+                if not self.accept(ident, name):
+                    continue
+                stack = _collapse(frame)
+                if self.label_threads:
+                    # Group worker threads under one root so the flame graph isn't split per thread id.
+                    root = "api" if ident == _api_thread_id else name.rstrip("0123456789_ ") or "thread"
+                    stack = f"{root};{stack}"
+                self.stacks[stack] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+_session_lock = threading.Lock()
+
+
+def profile_process(seconds: float, target: str = "all", interval: float = 0.01) -> str:
+    """Blocking: sample the chosen threads for `seconds` and return collapsed stacks."""
+    if target not in TARGETS:
+        raise ValueError(f"target must be one of {TARGETS}")
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        sampler = Sampler(_thread_filter(target), interval)
+        sampler.start()
+        time.sleep(seconds)
+        sampler.stop()
+        return sampler.collapsed()
+    finally:
+        _session_lock.release()
+
+
+class _RequestProfiles:
+    """Recent single-job profiles, keyed by record id."""
+
+    def __init__(self, maxsize: int = KEEP_REQUEST_PROFILES) -> None:
+        self._items: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+
+    def put(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._items.get(key)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(reversed(self._items))
+
+
+request_profiles = _RequestProfiles()
+
+
+@contextmanager
+def profile_current_thread(key: str, interval: float = 0.005) -> Iterator[None]:
+    """Sample only the calling thread while the block runs; result stored under `key`."""
+    ident = threading.get_ident()
+    sampler = Sampler(lambda i, _name: i == ident, interval, label_threads=False)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        request_profiles.put(key, {
+            "duration_s": round(time.perf_counter() - started, 3),
+            "samples": sampler.samples,
+            "interval_ms": interval * 1000,
+            "collapsed": sampler.collapsed(),
+        })
@@ -0,0 +1,43 @@
+"""Side effects to run after a jewelry record is written (caches, events, rollups)."""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from app.services import response_cache
+from app.services.events import broker
+from app.services.rollups import record_completions
+
+
+async def record_changed(record_id: Optional[str], event: Optional[str] = "record.updated", **fields) -> None:
+    """Any insert/update/delete of a record."""
+    response_cache.invalidate_record(record_id)
+    if event:
+        broker.publish(event, record_id, **fields)
+
+
+def record_progress(record_id: str, stage: str) -> None:
+    """Extraction progress from the worker thread (no DB write)."""
+    broker.publish("record.progress", record_id, stage=stage)
+
+
+async def record_completed(db, record_id: str, data: dict) -> None:
+    """Background extraction finished and `data` was written to the record."""
+    await records_completed(db, [(record_id, data)])
+
+
+async def records_completed(db, items: list[tuple[str, dict]]) -> None:
+    """
+    A batch of extraction results was written (e.g. one write-behind flush): rollups get one
+    bulk_write for the whole batch, then each record's caches and status event follow.
+    """
+    await record_completions(db, [data for _, data in items])
+    for record_id, data in items:
+        await record_changed(
+            record_id,
+            "record.status",
+            status=data["status"],
+            source=data["source"],
+            confidence_score=data["confidence_score"],
+            review_required=data["review_required"],
+        )
@@ -0,0 +1,234 @@
+"""
+Hot/cold storage layout for jewelry records.
+
+The hot `jewelry` document keeps only what lists, stats and exports read, with a sparse
+extracted_data (no null keys). raw_text and the bulky table arrays (metal_weights,
+gem_details, diamonds) live in `jewelry_blobs` under the same _id and are loaded only
+for the detail view and analytics exports. Documents written before the split still
+carry those fields inline; readers handle both.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.models.jewelry import JewelryData
+
+BLOB_COLLECTION = "jewelry_blobs"
+COLD_TOP_FIELDS = ("raw_text",)
+COLD_EXTRACTED_FIELDS = ("metal_weights", "gem_details", "diamonds")
+
+# Projection that keeps list/stats queries off the cold fields (also for legacy documents).
+HOT_PROJECTION = {
+    "raw_text": 0,
+    **{f"extracted_data.{k}": 0 for k in COLD_EXTRACTED_FIELDS},
+}
+
+
+def _empty(v: Any) -> bool:
+    return v is None or v == [] or v == {}
+
+
+def sparse_extracted(ext: Optional[dict]) -> dict:
+    """Hot part of extracted_data: cold arrays removed, null/empty values dropped."""
+    return {k: v for k, v in (ext or {}).items() if k not in COLD_EXTRACTED_FIELDS and not _empty(v)}
+
+
+def cold_part(doc: dict) -> dict:
+    """Cold fields of a full document or $set payload (None values included, to clear them)."""
+    cold: dict[str, Any] = {}
+    for k in COLD_TOP_FIELDS:
+        if k in doc:
+            cold[k] = doc[k]
+    ext = doc.get("extracted_data")
+    if isinstance(ext, dict):
+        for k in COLD_EXTRACTED_FIELDS:
+            if k in ext:
+                cold[k] = ext[k]
+    for k in COLD_EXTRACTED_FIELDS:
+        dotted = f"extracted_data.{k}"
+        if dotted in doc:
+            cold[k] = doc[dotted]
+    return cold
+
+
+def split_document(doc: dict) -> tuple[dict, dict]:
+    """(hot document, cold fields) for an insert."""
+    hot = {k: v for k, v in doc.items() if k not in COLD_TOP_FIELDS}
+    if "extracted_data" in doc:
+        hot["extracted_data"] = sparse_extracted(doc.get("extracted_data"))
+    return hot, cold_part(doc)
+
+
+def split_update(fields: dict) -> tuple[dict, dict, dict]:
+    """
+    Split a $set payload into (hot $set, hot $unset, cold fields). Full extracted_data
+    replacements become sparse; dotted extracted_data.* nulls become $unset.
+    """
+    hot_set: dict[str, Any] = {}
+    hot_unset: dict[str, str] = {}
+    for k, v in fields.items():
+        if k in COLD_TOP_FIELDS:
+            continue
+        if k == "extracted_data":
+            hot_set[k] = sparse_extracted(v)
+            continue
+        if k.startswith("extracted_data."):
+            sub = k.split(".", 1)[1]
+            if sub in COLD_EXTRACTED_FIELDS:
+                continue
+            if _empty(v):
+                hot_unset[k] = ""
+                continue
+        hot_set[k] = v
+    # Legacy documents may still hold cold fields inline; drop them when the cold copy is rewritten.
+    cold = cold_part(fields)
+    for k in cold:
+        hot_unset["raw_text" if k == "raw_text" else f"extracted_data.{k}"] = ""
+    if "extracted_data" in hot_set:
+        hot_unset = {k: v for k, v in hot_unset.items() if not k.startswith("extracted_data.")}
+    return hot_set, hot_unset, cold
+
+
+def hot_update(hot_set: dict, hot_unset: dict) -> dict:
+    update: dict[str, dict] = {}
+    if hot_set:
+        update["$set"] = hot_set
+    if hot_unset:
+        update["$unset"] = hot_unset
+    return update
+
+
+def cold_update_op(oid: ObjectId, cold: dict) -> Optional[UpdateOne]:
+    """Upsert for the blob document; None values are unset to keep blobs sparse."""
+    if not cold:
+        return None
+    to_set = {k: v for k, v in cold.items() if not _empty(v)}
+    to_unset = {k: "" for k, v in cold.items() if _empty(v)}
+    update: dict[str, dict] = {}
+    if to_set:
+        update["$set"] = to_set
+    if to_unset:
+        update["$unset"] = to_unset
+    return UpdateOne({"_id": oid}, update, upsert=bool(to_set))
+
+
+async def write_cold(db, oid: ObjectId, cold: dict) -> None:
+    op = cold_update_op(oid, cold)
+    if op is not None:
+        await db[BLOB_COLLECTION].bulk_write([op], ordered=False)
+
+
+async def insert_record(db, doc: dict) -> None:
+    hot, cold = split_document(doc)
+    await db["jewelry"].insert_one(hot)
+    await write_cold(db, hot["_id"], cold)
+
+
+async def update_record_fields(db, oid: ObjectId, fields: dict):
+    """$set-style update that routes cold fields to the blob collection. Returns the UpdateResult."""
+    hot_set, hot_unset, cold = split_update(fields)
+    r = await db["jewelry"].update_one({"_id": oid}, hot_update(hot_set, hot_unset))
+    if r.matched_count:
+        await write_cold(db, oid, cold)
+    return r
+
+
+async def delete_cold(db, oid: ObjectId) -> None:
+    await db[BLOB_COLLECTION].delete_one({"_id": oid})
+
+
+def merge_cold(doc: dict, cold: Optional[dict], expand: bool = True) -> dict:
+    """Full record for the detail view: cold fields merged back, optionally all JewelryData keys present."""
+    out = dict(doc)
+    ext = dict(out.get("extracted_data") or {})
+    cold = cold or {}
+    for k in COLD_EXTRACTED_FIELDS:
+        if k in cold:
+            ext[k] = cold[k]
+    for k in COLD_TOP_FIELDS:
+        if k in cold:
+            out[k] = cold[k]
+    if expand:
+        for k in JewelryData.model_fields:
+            ext.setdefault(k, None)
+        for k in COLD_TOP_FIELDS:
+            out.setdefault(k, None)
+    out["extracted_data"] = ext
+    return out
+
+
+async def load_full_record(db, oid: ObjectId) -> Optional[dict]:
+    doc = await db["jewelry"].find_one({"_id": oid})
+    if not doc:
+        return None
+    cold = await db[BLOB_COLLECTION].find_one({"_id": oid}, {"_id": 0})
+    return merge_cold(doc, cold)
+
+
+async def attach_cold_many(blob_coll, docs: Iterable[dict]) -> list[dict]:
+    """Merge cold fields into a batch of hot documents with one $in query (exports)."""
+    docs = list(docs)
+    if not docs:
+        return docs
+    by_id = {d["_id"]: d async for d in blob_coll.find({"_id": {"$in": [d["_id"] for d in docs]}})}
+    return [merge_cold(d, by_id.get(d["_id"]), expand=False) for d in docs]
+
+
+def search_pipeline(match: dict, pattern: str) -> list[dict]:
+    """
+    Aggregation over the hot collection: records matching `match` whose image_filename or
+    raw_text matches a case-insensitive regex, newest first, in HOT_PROJECTION shape.
+    raw_text lives in the blob collection, so it is matched through a per-record $lookup
+    rather than a capped list of ids; legacy documents may still hold it inline.
+    """
+    regex = {"$regex": pattern, "$options": "i"}
+    return [
+        {"$match": match},
+        {"$sort": {"created_at": -1}},
+        {"$lookup": {
+            "from": BLOB_COLLECTION,
+            "localField": "_id",
+            "foreignField": "_id",
+            "pipeline": [{"$match": {"raw_text": regex}}, {"$project": {"_id": 1}}],
+            "as": "_raw_text_hit",
+        }},
+        {"$match": {"$or": [
+            {"image_filename": regex},
+            {"_raw_text_hit": {"$ne": []}},
+            {"raw_text": regex},
+        ]}},
+        {"$project": {**HOT_PROJECTION, "_raw_text_hit": 0}},
+    ]
+
+
+async def migrate_legacy_documents(db, batch_size: int = 500) -> int:
+    """Move inline cold fields of pre-split documents into the blob collection. Idempotent."""
+    coll = db["jewelry"]
+    legacy_q = {
+        "$or": [{"raw_text": {"$exists": True}}]
+        + [{f"extracted_data.{k}": {"$exists": True}} for k in COLD_EXTRACTED_FIELDS]
+    }
+    moved = 0
+    while True:
+        docs = await coll.find(legacy_q).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            return moved
+        hot_ops, cold_ops = [], []
+        for doc in docs:
+            hot, cold = split_document(doc)
+            op = cold_update_op(doc["_id"], cold)
+            if op is not None:
+                cold_ops.append(op)
+            hot_ops.append(UpdateOne(
+                {"_id": doc["_id"]},
+                # Replacing extracted_data with its sparse hot part drops the inline arrays.
+                {"$set": {"extracted_data": hot.get("extracted_data") or {}}, "$unset": {"raw_text": ""}},
+            ))
+        if cold_ops:
+            await db[BLOB_COLLECTION].bulk_write(cold_ops, ordered=False)
+        await coll.bulk_write(hot_ops, ordered=False)
+        moved += len(docs)
@@ -0,0 +1,100 @@
+"""
+ETags and an in-process response cache for record and list endpoints.
+Record ETags come from `_id` + `updated_at`; list ETags from the query plus a collection
+version token (document count + latest updated_at). Writers call `invalidate_record`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+MAX_ENTRIES = 2048
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def _stamp(ts: Optional[datetime]) -> str:
+    return ts.strftime("%Y%m%d%H%M%S%f") if ts else "0"
+
+
+def record_etag(record_id: str, updated_at: Optional[datetime]) -> str:
+    return f'"r-{record_id}-{_stamp(updated_at)}"'
+
+
+async def collection_version(coll) -> str:
+    """Cheap token that changes on any insert, update or delete in the collection."""
+    count = await coll.estimated_document_count()
+    latest = await coll.find({}, {"updated_at": 1}).sort("updated_at", -1).limit(1).to_list(1)
+    ts = latest[0].get("updated_at") if latest else None
+    return f"{count}-{_stamp(ts)}"
+
+
+def list_etag(params: dict, version: str) -> str:
+    key = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    digest = hashlib.sha1(f"{key}|{version}".encode("utf-8")).hexdigest()[:20]
+    return f'"l-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """Thread-safe LRU of encoded bodies keyed by ETag (the background worker invalidates from a thread)."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or hit[0] != etag:
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def put(self, key: str, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._data[key] = (etag, body)
+            self._bytes += len(body)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+
+    def discard_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                self._bytes -= len(self._data.pop(key)[1])
+
+
+cache = ResponseCache()
+
+
+def invalidate_record(record_id: Optional[str] = None) -> None:
+    """Drop the cached record body (if any) and every cached list page."""
+    if record_id:
+        cache.discard(f"record:{record_id}")
+    cache.discard_prefix("list:")
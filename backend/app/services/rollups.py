@@ -0,0 +1,254 @@
+"""Time-bucketed confidence/throughput rollups (hourly and daily buckets in Mongo)."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from pymongo import UpdateOne
+
+ROLLUP_COLLECTION = "jewelry_rollups"
+GRANULARITIES = ("hour", "day")
+
+# Confidence histogram: 20 bins of width 0.05 over [0, 1]. Quantiles are read
+# back from the merged histogram, so buckets stay small and mergeable.
+HIST_BINS = 20
+
+
+def _bin_index(confidence: float) -> int:
+    try:
+        c = float(confidence)
+    except (TypeError, ValueError):
+        c = 0.0
+    c = min(max(c, 0.0), 1.0)
+    return min(int(c * HIST_BINS), HIST_BINS - 1)
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _step(granularity: str) -> timedelta:
+    return timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+
+
+def _increments(status: str, source: str, confidence: float, review_required: bool) -> dict:
+    conf = float(confidence or 0.0)
+    inc: dict[str, Any] = {
+        "count": 1,
+        "confidence_sum": conf,
+        f"hist.{_bin_index(conf)}": 1,
+        "review_count": 1 if review_required else 0,
+    }
+    inc["source_ai" if source == "AI" else "source_ocr"] = 1
+    if status:
+        inc[f"status.{status}"] = 1
+    return inc
+
+
+async def ensure_rollup_indexes(db, collection: str = ROLLUP_COLLECTION) -> None:
+    await db[collection].create_index([("granularity", 1), ("bucket", 1)], unique=True)
+    if collection == ROLLUP_COLLECTION:
+        await db["jewelry"].create_index([("completed_at", 1)], sparse=True)
+
+
+async def record_completions(db, records: Iterable[dict]) -> None:
+    """
+    Fold many finished extractions (record-shaped dicts) into their buckets: increments are
+    summed per bucket first and applied with one bulk_write, however many records there are.
+    """
+    pending: dict[tuple, dict] = {}
+    now = datetime.utcnow()
+    for doc in records:
+        _accumulate(pending, doc, doc.get("completed_at") or doc.get("updated_at") or now)
+    await _apply_increments(db[ROLLUP_COLLECTION], pending)
+
+
+def _quantile(hist: list[int], q: float) -> Optional[float]:
+    total = sum(hist)
+    if total <= 0:
+        return None
+    target = q * total
+    running = 0
+    for i, n in enumerate(hist):
+        if n <= 0:
+            continue
+        if running + n >= target:
+            # Linear interpolation inside the bin.
+            frac = (target - running) / n
+            return round((i + frac) / HIST_BINS, 4)
+        running += n
+    return 1.0
+
+
+def _hist_list(raw: Any) -> list[int]:
+    hist = [0] * HIST_BINS
+    if isinstance(raw, dict):
+        for k, v in raw.items():
+            try:
+                i = int(k)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= i < HIST_BINS:
+                hist[i] += int(v or 0)
+    return hist
+
+
+def summarize_bucket(doc: dict) -> dict:
+    count = int(doc.get("count") or 0)
+    hist = _hist_list(doc.get("hist"))
+    return {
+        "bucket": doc["bucket"].isoformat() if doc.get("bucket") else None,
+        "count": count,
+        "mean_confidence": round(doc.get("confidence_sum", 0.0) / count, 4) if count else None,
+        "p50_confidence": _quantile(hist, 0.5),
+        "p10_confidence": _quantile(hist, 0.1),
+        "ai": int(doc.get("source_ai") or 0),
+        "ocr": int(doc.get("source_ocr") or 0),
+        "review_rate": round((doc.get("review_count") or 0) / count, 4) if count else None,
+        "status": doc.get("status") or {},
+    }
+
+
+def _merge(docs: list[dict]) -> dict:
+    merged: dict[str, Any] = {
+        "count": 0,
+        "confidence_sum": 0.0,
+        "source_ai": 0,
+        "source_ocr": 0,
+        "review_count": 0,
+        "hist": {},
+        "status": {},
+    }
+    for d in docs:
+        for key in ("count", "confidence_sum", "source_ai", "source_ocr", "review_count"):
+            merged[key] += d.get(key) or 0
+        for k, v in (d.get("hist") or {}).items():
+            merged["hist"][k] = merged["hist"].get(k, 0) + (v or 0)
+        for k, v in (d.get("status") or {}).items():
+            merged["status"][k] = merged["status"].get(k, 0) + (v or 0)
+    return merged
+
+
+async def query_rollups(
+    db,
+    granularity: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> dict:
+    """Return buckets in [start, end) plus a merged summary over the whole range."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}")
+    end = end or datetime.utcnow()
+    start = start or end - _step(granularity) * (48 if granularity == "hour" else 30)
+    q = {
+        "granularity": granularity,
+        "bucket": {"$gte": bucket_start(start, granularity), "$lt": end},
+    }
+    docs = [d async for d in db[ROLLUP_COLLECTION].find(q).sort("bucket", 1)]
+    merged = summarize_bucket(_merge(docs))
+    merged.pop("bucket", None)
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "buckets": [summarize_bucket(d) for d in docs],
+        "summary": merged,
+    }
+
+
+_REBUILD_PROJECTION = {
+    "status": 1, "source": 1, "confidence_score": 1, "review_required": 1, "completed_at": 1, "updated_at": 1,
+}
+
+
+def _accumulate(pending: dict[tuple, dict], doc: dict, ts: datetime) -> None:
+    inc = _increments(
+        doc.get("status") or "",
+        doc.get("source") or "AI",
+        doc.get("confidence_score") or 0.0,
+        bool(doc.get("review_required")),
+    )
+    for granularity in GRANULARITIES:
+        acc = pending.setdefault((granularity, bucket_start(ts, granularity)), {})
+        for k, v in inc.items():
+            acc[k] = acc.get(k, 0) + v
+
+
+async def _apply_increments(coll, pending: dict[tuple, dict]) -> None:
+    if not pending:
+        return
+    now = datetime.utcnow()
+    await coll.bulk_write(
+        [
+            UpdateOne(
+                {"granularity": granularity, "bucket": bucket},
+                {"$inc": inc, "$set": {"updated_at": now}},
+                upsert=True,
+            )
+            for (granularity, bucket), inc in pending.items()
+        ],
+        ordered=False,
+    )
+
+
+async def rebuild_rollups(db) -> int:
+    """
+    Recompute all buckets from the records collection (e.g. after a bulk import).
+
+    Buckets are keyed by completed_at (updated_at for records written before it existed), so
+    later edits and backfills don't move a record into today's bucket. Everything completed
+    before the cutoff is built into a temporary collection and swapped in with a rename, so
+    readers never see partial buckets. Completions between the cutoff and the swap went to
+    the old collection and are replayed into the new one; later ones arrive live.
+    """
+    cutoff = datetime.utcnow()
+    temp = f"{ROLLUP_COLLECTION}_rebuild_{cutoff:%Y%m%d%H%M%S%f}"
+    await db[temp].drop()
+    await ensure_rollup_indexes(db, temp)
+    pending: dict[tuple, dict] = {}
+    n = 0
+    cursor = db["jewelry"].find({"status": {"$ne": "Processing"}}, _REBUILD_PROJECTION)
+    async for doc in cursor:
+        ts = doc.get("completed_at") or doc.get("updated_at") or cutoff
+        if ts >= cutoff:
+            continue  # replayed below
+        _accumulate(pending, doc, ts)
+        n += 1
+    now = datetime.utcnow()
+    docs = [
+        {"granularity": granularity, "bucket": bucket, **_nested(inc), "updated_at": now}
+        for (granularity, bucket), inc in pending.items()
+    ]
+    try:
+        if docs:
+            await db[temp].insert_many(docs, ordered=False)
+        swapped = datetime.utcnow()
+        await db[temp].rename(ROLLUP_COLLECTION, dropTarget=True)
+    except Exception:
+        await db[temp].drop()
+        raise
+
+    replay: dict[tuple, dict] = {}
+    cursor = db["jewelry"].find(
+        {"status": {"$ne": "Processing"}, "completed_at": {"$gte": cutoff, "$lt": swapped}}, _REBUILD_PROJECTION
+    )
+    async for doc in cursor:
+        _accumulate(replay, doc, doc["completed_at"])
+        n += 1
+    await _apply_increments(db[ROLLUP_COLLECTION], replay)
+    return n
+
+
+def _nested(inc: dict) -> dict:
+    """Dotted $inc keys ("hist.3", "status.Completed") as the nested fields an upsert would create."""
+    out: dict[str, Any] = {}
+    for k, v in inc.items():
+        head, _, tail = k.partition(".")
+        if tail:
+            out.setdefault(head, {})[tail] = v
+        else:
+            out[k] = v
+    return out
@@ -0,0 +1,260 @@
+"""
+Similar-design search over extracted specifications.
+
+Each record with extracted values becomes one float32 row: log1p of metal grams (per karat
+and total), diamond and stone counts/carats, dimensions in mm, and one-hot stone type and
+diamond shape. Distances are weighted Euclidean in standardized units. Standardizing is a
+per-column scale only, so the matrix keeps unscaled features plus each row's squared norm
+under the current scale, and a k-NN query is one matrix-vector product and an argpartition:
+||x-q||^2 = |x|^2 - 2 x.q + |q|^2 (all with the per-column scale squared folded in).
+
+The index is a FeedFollower: loaded at startup in the background, then kept current from
+the delta sync feed every SIMILARITY_REFRESH_S.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Optional
+
+from app.config import settings
+from app.services.feed_index import (
+    DIAMOND_SHAPES,
+    ColumnStore,
+    FeedFollower,
+    category_index,
+    load_numpy,
+    to_number,
+)
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# (extracted_data field, weight). Weights and counts are log1p'd (heavy tailed); missing = none.
+LOG_FIELDS = (
+    ("gold_weight_14kt_gm", 1.0),
+    ("gold_weight_18kt_gm", 1.0),
+    ("gold_weight_22kt_gm", 1.0),
+    ("silver_weight_gm", 1.0),
+    ("platinum_weight_gm", 1.0),
+    ("total_metal_gm", 1.5),
+    ("diamond_count", 1.0),
+    ("diamond_weight_ct", 1.5),
+    ("stone_count", 0.7),
+    ("stone_weight_ct", 1.0),
+)
+# Millimetres as-is; missing = column mean (no opinion).
+DIM_FIELDS = (("length_mm", 0.8), ("width_mm", 0.8), ("height_mm", 0.8))
+STONE_TYPES = ("ruby", "sapphire", "emerald", "other")
+CATEGORY_WEIGHT = 0.6
+
+N_LOG = len(LOG_FIELDS)
+N_NUMERIC = N_LOG + len(DIM_FIELDS)
+N_FEATURES = N_NUMERIC + len(STONE_TYPES) + len(DIAMOND_SHAPES)
+METAL_FIELDS = tuple(f for f, _ in LOG_FIELDS[:5])
+LOAD_CHUNK = 10000
+REFIT_DRIFT = 0.25  # re-standardize when the row count moved this much since the last fit
+
+_DIMS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*[x×*]\s*(\d+(?:\.\d+)?)(?:\s*[x×*]\s*(\d+(?:\.\d+)?))?", re.I)
+
+
+def feature_row(ext: Optional[dict]) -> Optional[list[float]]:
+    """Unscaled feature vector for extracted_data, or None if it has nothing to compare on."""
+    ext = ext or {}
+    metals = [to_number(ext.get(f)) for f in METAL_FIELDS]
+    total = sum(m for m in metals if m)
+    values: dict[str, Optional[float]] = dict(zip(METAL_FIELDS, metals))
+    values["total_metal_gm"] = total or None
+    for f in ("diamond_count", "diamond_weight_ct", "stone_count", "stone_weight_ct"):
+        values[f] = to_number(ext.get(f))
+    dims = [to_number(ext.get(f)) for f, _ in DIM_FIELDS]
+    if any(d is None for d in dims) and isinstance(ext.get("dimensions_mm"), str):
+        m = _DIMS_RE.search(ext["dimensions_mm"])
+        if m:
+            parsed = [to_number(g) for g in m.groups()]
+            dims = [d if d is not None else p for d, p in zip(dims, parsed)]
+    stone = category_index(ext.get("stone_type"), STONE_TYPES)
+    shape = category_index(ext.get("diamond_shape"), DIAMOND_SHAPES)
+    if not any(values.values()) and all(d is None for d in dims) and stone is None and shape is None:
+        return None
+
+    row = [math.log1p(values[f] or 0.0) for f, _ in LOG_FIELDS]
+    row += [d if d is not None else math.nan for d in dims]
+    cats = [0.0] * (len(STONE_TYPES) + len(DIAMOND_SHAPES))
+    if stone is not None:
+        cats[stone] = 1.0
+    if shape is not None:
+        cats[len(STONE_TYPES) + shape] = 1.0
+    return row + cats
+
+
+def _indexable(doc: dict) -> bool:
+    return doc.get("status") != "Processing"
+
+
+class SimilarityIndex(FeedFollower):
+    name = "Similarity index"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        # X: unscaled features (NaN-free); norms: squared scaled norm per row.
+        self._store = ColumnStore({"X": ((N_FEATURES,), "float32"), "norms": ((), "float32")})
+        self._scale2 = None  # float32 (N_FEATURES,), squared per-column scale
+        self._dim_means = [0.0] * len(DIM_FIELDS)
+        self._fitted_n = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    @property
+    def refresh_s(self) -> float:
+        return settings.SIMILARITY_REFRESH_S
+
+    # -- building -------------------------------------------------------------------------
+
+    def _fit(self) -> None:
+        """Recompute column scales from the live rows and refresh all row norms. Lock held."""
+        np = load_numpy()
+        n = len(self._store)
+        X = self._store["X"][:n]
+        weights = np.array(
+            [w for _, w in LOG_FIELDS] + [w for _, w in DIM_FIELDS]
+            + [CATEGORY_WEIGHT] * (N_FEATURES - N_NUMERIC),
+            dtype=np.float32,
+        )
+        std = np.ones(N_FEATURES, dtype=np.float32)
+        if n > 1:
+            std[:N_NUMERIC] = X[:, :N_NUMERIC].std(axis=0)
+        std[std < 1e-6] = 1.0
+        std[N_NUMERIC:] = 1.0  # one-hot columns are weighted, not standardized
+        self._scale2 = (weights / std) ** 2
+        self._store["norms"][:n] = (X * X) @ self._scale2
+        if n:
+            self._dim_means = [float(v) for v in X[:, N_LOG:N_NUMERIC].mean(axis=0)]
+        self._fitted_n = n
+
+    def _impute(self, row: list[float]) -> list[float]:
+        for j in range(len(DIM_FIELDS)):
+            if math.isnan(row[N_LOG + j]):
+                row[N_LOG + j] = self._dim_means[j]
+        return row
+
+    def replace_all(self, ids: list[str], rows) -> None:
+        """Swap in a freshly loaded matrix (rows: float32 array with NaN for missing dims)."""
+        np = load_numpy()
+        with self._lock:
+            self._store.reset(ids)
+            n = len(ids)
+            if n:
+                X = self._store["X"]
+                X[:n] = rows
+                dims = X[:n, N_LOG:N_NUMERIC]
+                missing = np.isnan(dims)
+                means = np.where(missing, 0.0, dims).sum(axis=0) / np.maximum((~missing).sum(axis=0), 1)
+                nan_r, nan_c = np.nonzero(missing)
+                dims[nan_r, nan_c] = means[nan_c]
+            self._fit()
+
+    def upsert(self, record_id: str, row: Optional[list[float]]) -> None:
+        if row is None:
+            self.remove(record_id)
+            return
+        np = load_numpy()
+        with self._lock:
+            if self._scale2 is None:
+                return
+            vec = np.asarray(self._impute(row), dtype=np.float32)
+            i = self._store.slot(record_id)
+            self._store["X"][i] = vec
+            self._store["norms"][i] = float((vec * vec) @ self._scale2)
+            self._maybe_refit()
+
+    def remove(self, record_id: str) -> None:
+        with self._lock:
+            if self._store.remove(record_id):
+                self._maybe_refit()
+
+    def _maybe_refit(self) -> None:
+        n = len(self._store)
+        if abs(n - self._fitted_n) > REFIT_DRIFT * max(self._fitted_n, 100):
+            self._fit()
+
+    # -- queries --------------------------------------------------------------------------
+
+    def vector_for(self, record_id: str):
+        with self._lock:
+            i = self._store.row(record_id)
+            return None if i is None else self._store["X"][i].copy()
+
+    def query(self, q: Any, k: int, exclude: Optional[str] = None) -> list[tuple[str, float]]:
+        """k nearest (record id, distance). `q` is a feature row (list with NaN allowed) or array."""
+        np = load_numpy()
+        with self._lock:
+            n = len(self._store)
+            if not n or self._scale2 is None:
+                return []
+            q = np.asarray(q, dtype=np.float32).copy()
+            for j in range(len(DIM_FIELDS)):
+                if math.isnan(q[N_LOG + j]):
+                    q[N_LOG + j] = self._dim_means[j]
+            qs = q * self._scale2
+            d2 = self._store["norms"][:n] - 2.0 * (self._store["X"][:n] @ qs) + float(q @ qs)
+            take = min(n, k + (1 if exclude is not None else 0))
+            idx = np.argpartition(d2, take - 1)[:take] if take < n else np.arange(n)
+            idx = idx[np.argsort(d2[idx])]
+            out = []
+            for i in idx:
+                rid = self._store.ids[i]
+                if rid == exclude:
+                    continue
+                out.append((rid, math.sqrt(max(0.0, float(d2[i])))))
+            return out[:k]
+
+    # -- keeping up with Mongo ------------------------------------------------------------
+
+    async def load(self, db) -> None:
+        np = load_numpy()
+        started = time.perf_counter()
+        ids: list[str] = []
+        chunks = []
+        pending: list[list[float]] = []
+        cursor = db["jewelry"].find({"status": {"$ne": "Processing"}}, {"extracted_data": 1}).batch_size(LOAD_CHUNK)
+        async for doc in cursor:
+            row = feature_row(doc.get("extracted_data"))
+            if row is None:
+                continue
+            ids.append(str(doc["_id"]))
+            pending.append(row)
+            if len(pending) >= LOAD_CHUNK:
+                chunks.append(np.asarray(pending, dtype=np.float32))
+                pending = []
+        if pending:
+            chunks.append(np.asarray(pending, dtype=np.float32))
+        rows = np.concatenate(chunks) if chunks else np.zeros((0, N_FEATURES), dtype=np.float32)
+        await asyncio.to_thread(self.replace_all, ids, rows)
+        logger.info("Similarity index built: %d records in %.1fs", len(ids), time.perf_counter() - started)
+
+    async def apply(self, db, page: dict) -> None:
+        def apply() -> None:
+            for doc in page["docs"]:
+                rid = str(doc["_id"])
+                self.upsert(rid, feature_row(doc.get("extracted_data")) if _indexable(doc) else None)
+            for rid in page["deleted"]:
+                self.remove(rid)
+
+        await asyncio.to_thread(apply)
+
+
+similarity_index = SimilarityIndex()
+
+registry.gauge(
+    "karatplus_similarity_index_rows",
+    "Records in the in-memory similar-design index.",
+    callback=lambda: len(similarity_index),
+)
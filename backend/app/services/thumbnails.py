@@ -0,0 +1,178 @@
+"""
+Preview derivatives of uploads: WebP thumbnails in a few fixed widths, generated on first
+request (first page for PDFs) and kept in THUMBNAIL_DIR with LRU eviction by total size.
+Derivatives are keyed by the source file stem, which is the SHA-256 for blob-store files.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.services.blob_store import _write_atomic
+
+logger = logging.getLogger(__name__)
+
+SIZE_BUCKETS = (64, 160, 480, 1024)
+WEBP_QUALITY = 80
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+PDF_EXTS = {".pdf"}
+
+
+def size_bucket(width: int) -> int:
+    """Smallest bucket >= width (capped at the largest), so arbitrary widths share files."""
+    for size in SIZE_BUCKETS:
+        if width <= size:
+            return size
+    return SIZE_BUCKETS[-1]
+
+
+def supports_preview(path: Path) -> bool:
+    ext = path.suffix.lower()
+    return ext in IMAGE_EXTS or ext in PDF_EXTS
+
+
+def _pdf_first_page(path: Path, size: int):
+    """First page as a PIL image: pypdfium2 render if installed, else its largest embedded image."""
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            page = pdf[0]
+            width_pt = page.get_width() or 612
+            bitmap = page.render(scale=max(size / width_pt, 0.1))
+            return bitmap.to_pil()
+        finally:
+            pdf.close()
+
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(path))
+    if not reader.pages:
+        return None
+    images = list(reader.pages[0].images)
+    if not images:
+        return None
+    best = max(images, key=lambda im: len(im.data))
+    return best.image
+
+
+def _render(path: Path, size: int) -> Optional[bytes]:
+    from PIL import Image, ImageOps
+
+    ext = path.suffix.lower()
+    if ext in PDF_EXTS:
+        img = _pdf_first_page(path, size)
+        if img is None:
+            return None
+    else:
+        img = Image.open(path)
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, which skips most of the work for phone photos.
+        img.draft("RGB", (size, size))
+        img = ImageOps.exif_transpose(img)
+    try:
+        img.thumbnail((size, size), Image.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+        return buf.getvalue()
+    finally:
+        img.close()
+
+
+class ThumbnailCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._inflight: dict[Path, asyncio.Future] = {}
+
+    def path_for(self, key: str, size: int) -> Path:
+        return self.root / str(size) / key[:2] / f"{key}.webp"
+
+    def _load(self) -> None:
+        """Index existing files once, oldest access first."""
+        found = []
+        if self.root.exists():
+            for p in self.root.rglob("*.webp"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                found.append((st.st_atime, p, st.st_size))
+        found.sort()
+        for _, p, n in found:
+            self._entries[p] = n
+            self._total += n
+        self._loaded = True
+
+    def _touch(self, path: Path) -> bool:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if path in self._entries:
+                self._entries.move_to_end(path)
+                return True
+            return False
+
+    def _added(self, path: Path, nbytes: int) -> None:
+        victims = []
+        with self._lock:
+            self._total += nbytes - self._entries.pop(path, 0)
+            self._entries[path] = nbytes
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old, n = self._entries.popitem(last=False)
+                self._total -= n
+                victims.append(old)
+        for p in victims:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    async def get(self, source: Path, width: int) -> Optional[Path]:
+        """Path of the cached derivative, generating it on a miss. None if no preview can be made."""
+        if not supports_preview(source):
+            return None
+        size = size_bucket(width)
+        path = self.path_for(source.stem, size)
+        if await asyncio.to_thread(self._touch, path) and path.exists():
+            return path
+        # Concurrent requests for the same derivative share one render.
+        fut = self._inflight.get(path)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[path] = fut
+        try:
+            data = await asyncio.to_thread(_render, source, size)
+            if data is None:
+                result = None
+            else:
+                await asyncio.to_thread(_write_atomic, path, data)
+                self._added(path, len(data))
+                result = path
+            fut.set_result(result)
+            return result
+        except Exception as e:
+            logger.warning("Thumbnail for %s failed: %s", source.name, e)
+            fut.set_result(None)
+            return None
+        finally:
+            self._inflight.pop(path, None)
+
+
+thumbnails = ThumbnailCache(Path(settings.THUMBNAIL_DIR), settings.THUMBNAIL_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,182 @@
+"""
+Lightweight tracing. A trace id (X-Request-ID, or generated) is set per request by
+TraceMiddleware and bound explicitly in background jobs, so an upload, its extraction
+job, each Gemini attempt and the DB write all log under one id. Spans are logged with
+their duration; traces are head-sampled at TRACE_SAMPLE_RATE (less when the log queue
+backs up), while failed spans are always logged.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.config import settings
+
+logger = logging.getLogger("karatplus.trace")
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("trace_sampled", default=False)
+_span_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Attribute names LogRecord already uses; span attributes with these names are prefixed.
+_RESERVED_ATTRS = {"name", "msg", "args", "module", "filename", "lineno", "process", "thread", "message", "levelname"}
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def is_sampled() -> bool:
+    return _sampled.get()
+
+
+def _sample() -> bool:
+    from app.services.log_pipeline import queue_pressure
+
+    rate = settings.TRACE_SAMPLE_RATE
+    if rate <= 0:
+        return False
+    pressure = queue_pressure()
+    if pressure > 0.5:
+        # Shed span logging under load before the log queue starts dropping records.
+        rate *= max(0.0, 1.0 - pressure)
+    return rate >= 1.0 or random.random() < rate
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def bind_trace(trace_id: Optional[str] = None, sampled: Optional[bool] = None) -> Iterator[str]:
+    """Make `trace_id` current (e.g. in a worker thread); a new id is created if none is given."""
+    tid = trace_id or new_trace_id()
+    t1 = _trace_id.set(tid)
+    t2 = _sampled.set(_sample() if sampled is None else sampled)
+    t3 = _span_id.set(None)
+    try:
+        yield tid
+    finally:
+        _span_id.reset(t3)
+        _sampled.reset(t2)
+        _trace_id.reset(t1)
+
+
+def _log_span(name: str, duration: float, error: Optional[BaseException], parent: Optional[str], span_id: str, attrs: dict) -> None:
+    if error is None and not _sampled.get():
+        return
+    extra = {
+        "span": name,
+        "span_id": span_id,
+        "parent_span_id": parent,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    for k, v in attrs.items():
+        extra[f"attr_{k}" if k in _RESERVED_ATTRS else k] = v
+    if error is not None:
+        extra["error"] = f"{type(error).__name__}: {error}"
+        logger.warning("span %s failed", name, extra=extra)
+    else:
+        logger.info("span %s", name, extra=extra)
+
+
+@contextmanager
+def span(name: str, /, **attrs) -> Iterator[dict]:
+    """
+    Time a block as a child of the current span. The yielded dict can be filled with
+    attributes discovered inside the block (e.g. result="ok").
+    """
+    if _trace_id.get() is None:
+        # Outside any request or job: nothing to correlate with, skip the bookkeeping.
+        yield attrs
+        return
+    parent = _span_id.get()
+    sid = uuid.uuid4().hex[:16]
+    token = _span_id.set(sid)
+    start = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _span_id.reset(token)
+        _log_span(name, time.perf_counter() - start, error, parent, sid, attrs)
+
+
+def record_span(name: str, duration: float, /, **attrs) -> None:
+    """Record an already-timed block as a child of the current span (no-op outside a trace)."""
+    if _trace_id.get() is None:
+        return
+    _log_span(name, duration, None, _span_id.get(), uuid.uuid4().hex[:16], attrs)
+
+
+def log_span(trace_id: Optional[str], sampled: bool, name: str, duration: float, /, **attrs) -> None:
+    """
+    Record a span measured elsewhere (e.g. one bulk write shared by many jobs) under `trace_id`.
+    `sampled` is the trace's own decision, so the span is logged exactly when the rest of it is.
+    """
+    if not trace_id:
+        return
+    with bind_trace(trace_id, sampled):
+        record_span(name, duration, **attrs)
+
+
+class TraceMiddleware:
+    """ASGI middleware: one trace per HTTP request, echoed back as X-Request-ID."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = None
+        for k, v in scope.get("headers") or ():
+            if k == REQUEST_ID_HEADER:
+                incoming = v.decode("latin-1")[:64] or None
+                break
+        state = {"status": 0, "end": None}
+        start = time.perf_counter()
+
+        with bind_trace(incoming) as tid:
+            sid = uuid.uuid4().hex[:16]
+            token = _span_id.set(sid)
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    state["status"] = message["status"]
+                    headers = list(message.get("headers") or [])
+                    headers.append((REQUEST_ID_HEADER, tid.encode("latin-1")))
+                    message = {**message, "headers": headers}
+                elif message["type"] == "http.response.body" and not message.get("more_body"):
+                    # Background tasks run after this inside the same call; they are not request time.
+                    state["end"] = time.perf_counter()
+                await send(message)
+
+            error: Optional[BaseException] = None
+            try:
+                await self.app(scope, receive, send_with_id)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _span_id.reset(token)
+                end = state["end"] or time.perf_counter()
+                _log_span(
+                    "http.request",
+                    end - start,
+                    error,
+                    None,
+                    sid,
+                    {"method": scope.get("method"), "path": scope.get("path"), "status": state["status"]},
+                )
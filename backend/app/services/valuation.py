@@ -0,0 +1,528 @@
+"""
+Catalog valuation: every record priced from its metal grams and diamond/stone carats
+against the current rate table.
+
+The priceable quantities of all records live in columnar float64 arrays (grams per metal,
+diamond carats + shape, stone carats + type, status), alongside one value column per
+component. Pricing the whole catalog is one matrix-vector product for metals and one
+indexed multiply each for diamonds and stones. When the rate table changes only what the
+change touches is recomputed: metal values are shifted by grams[:, changed] @ rate_delta,
+and diamond/stone values are re-priced only on rows whose shape/type rate moved.
+
+Rate tables are stored in `valuation_rates` with an effective_at time, so tomorrow's table
+can be posted today. The engine is a FeedFollower like the similarity index: loaded at
+startup, then kept current from changes_since (record edits) while the rates collection
+is polled every VALUATION_REFRESH_S, so every API process converges on the same numbers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.services import metrics
+from app.services.feed_index import (
+    DIAMOND_SHAPES,
+    ColumnStore,
+    FeedFollower,
+    category_index,
+    load_numpy,
+    to_number,
+)
+from app.services.metrics import registry
+from app.services.record_store import BLOB_COLLECTION, COLD_EXTRACTED_FIELDS, merge_cold
+
+logger = logging.getLogger(__name__)
+
+RATES_COLLECTION = "valuation_rates"
+
+METALS = ("gold_24kt", "gold_22kt", "gold_18kt", "gold_14kt", "gold_10kt", "silver", "platinum")
+GOLD_PURITY = {"gold_24kt": 1.0, "gold_22kt": 22 / 24, "gold_18kt": 18 / 24, "gold_14kt": 14 / 24, "gold_10kt": 10 / 24}
+FLAT_METAL_FIELDS = {
+    "gold_weight_14kt_gm": "gold_14kt",
+    "gold_weight_18kt_gm": "gold_18kt",
+    "gold_weight_22kt_gm": "gold_22kt",
+    "silver_weight_gm": "silver",
+    "platinum_weight_gm": "platinum",
+}
+STONE_TYPES = (
+    "ruby", "sapphire", "emerald", "tanzanite", "amethyst", "topaz", "garnet", "opal", "pearl", "tourmaline",
+    "aquamarine", "peridot", "citrine", "morganite", "other",
+)
+STATUSES = ("Completed", "Review Required")
+GROUP_BY = ("status", "metal", "diamond_shape", "stone_type")
+LOAD_CHUNK = 5000
+
+_KARAT_RE = re.compile(r"(\d{1,2})\s*k", re.I)
+_STAMP_RE = re.compile(r"(?<!\d)(\d{3})(?!\d)")
+# Millesimal fineness stamps ("750", "Au585", "916 KDM") -> gold column.
+GOLD_STAMPS = {
+    "999": "gold_24kt", "995": "gold_24kt", "917": "gold_22kt", "916": "gold_22kt", "750": "gold_18kt",
+    "585": "gold_14kt", "583": "gold_14kt", "417": "gold_10kt", "416": "gold_10kt",
+}
+_TABLE_PROJECTION = {k: 1 for k in COLD_EXTRACTED_FIELDS}
+
+
+def metal_column(label: Any) -> Optional[str]:
+    """METALS entry for a metal_weights label such as "18K Yellow", "Au750", "PT950" or "Silver 925"."""
+    if not isinstance(label, str):
+        return None
+    v = label.strip().lower()
+    if "plat" in v or v.startswith("pt"):
+        return "platinum"
+    if "silver" in v or "sterling" in v or "925" in v or v.startswith("ag"):
+        return "silver"
+    m = _KARAT_RE.search(v)
+    if m and f"gold_{int(m.group(1))}kt" in GOLD_PURITY:
+        return f"gold_{int(m.group(1))}kt"
+    m = _STAMP_RE.search(v)
+    if m:
+        return GOLD_STAMPS.get(m.group(1))
+    return None
+
+
+def _rows(value: Any) -> list[dict]:
+    if not isinstance(value, list):
+        return []
+    return [{str(k).strip().lower().replace(" ", "_"): v for k, v in r.items()} for r in value if isinstance(r, dict)]
+
+
+def _first(row: dict, *keys: str) -> Any:
+    for k in keys:
+        if row.get(k) not in (None, ""):
+            return row[k]
+    return None
+
+
+def quantities(ext: Optional[dict]) -> Optional[dict]:
+    """
+    Priceable quantities of one record's extracted_data, or None if there is nothing to price.
+    Flat fields win; metal_weights / gem_details (or, without those, diamonds) rows fill in
+    what the flat fields leave empty.
+    """
+    ext = ext or {}
+    grams = dict.fromkeys(METALS, 0.0)
+    flat = set()
+    for field, metal in FLAT_METAL_FIELDS.items():
+        g = to_number(ext.get(field))
+        if g:
+            grams[metal] = g
+            flat.add(metal)
+    for row in _rows(ext.get("metal_weights")):
+        metal = metal_column(_first(row, "metal", "type", "karat", "purity"))
+        g = to_number(_first(row, "grams", "weight", "gm", "grams_(g)", "weight_(gm)"))
+        if metal and g and metal not in flat:
+            grams[metal] += g
+
+    diamond_ct = to_number(ext.get("diamond_weight_ct"))
+    stone_ct = to_number(ext.get("stone_weight_ct"))
+    diamond_shape = ext.get("diamond_shape")
+    stone_type = ext.get("stone_type")
+    row_diamond_ct = row_stone_ct = 0.0
+    # Extraction fills gem_details and the older diamonds array from the same table, so only
+    # fall back to diamonds when gem_details is absent (adding both would double the carats).
+    gem_rows = [(r, False) for r in _rows(ext.get("gem_details"))]
+    if not gem_rows:
+        gem_rows = [(r, True) for r in _rows(ext.get("diamonds"))]
+    for row, is_diamond in gem_rows:
+        gem = _first(row, "gem", "stone", "type", "name")
+        ct = to_number(_first(row, "weight_ct", "weight", "carat", "ct")) or 0.0
+        if is_diamond or (isinstance(gem, str) and "diamond" in gem.lower()):
+            row_diamond_ct += ct
+            diamond_shape = diamond_shape or _first(row, "shape")
+        else:
+            row_stone_ct += ct
+            stone_type = stone_type or gem
+    diamond_ct = diamond_ct or row_diamond_ct
+    stone_ct = stone_ct or row_stone_ct
+
+    if not any(grams.values()) and not diamond_ct and not stone_ct:
+        return None
+    return {
+        "grams": [grams[m] for m in METALS],
+        "diamond_ct": diamond_ct,
+        "diamond_shape": category_index(diamond_shape, DIAMOND_SHAPES),
+        "stone_ct": stone_ct,
+        "stone_type": category_index(stone_type, STONE_TYPES),
+    }
+
+
+def validate_rates(table: dict) -> None:
+    """Raise ValueError for rate keys the engine cannot price (typos would silently price at 0)."""
+    for field, vocab in (("metals", METALS), ("diamond_shapes", DIAMOND_SHAPES), ("stone_types", STONE_TYPES)):
+        unknown = sorted(set(table.get(field) or {}) - set(vocab))
+        if unknown:
+            raise ValueError(f"Unknown {field} keys {unknown}; expected any of {list(vocab)}")
+        if any(v is None or v < 0 for v in (table.get(field) or {}).values()):
+            raise ValueError(f"{field} rates must be >= 0")
+
+
+def _rate_vectors(table: Optional[dict]):
+    """(metal per gram, diamond per ct by shape slot, stone per ct by type slot) as float64 arrays."""
+    np = load_numpy()
+    table = table or {}
+    metals = table.get("metals") or {}
+    spot = metals.get("gold_24kt")
+    metal = np.array(
+        [metals.get(m, spot * GOLD_PURITY[m] if spot is not None and m in GOLD_PURITY else 0.0) for m in METALS],
+        dtype=np.float64,
+    )
+
+    def per_ct(default: float, overrides: dict, vocab: tuple[str, ...]):
+        # One slot per vocab entry plus a trailing slot for "not stated", which gets the default.
+        return np.array([overrides.get(name, default) for name in vocab] + [default], dtype=np.float64)
+
+    diamond = per_ct(float(table.get("diamond_per_ct") or 0.0), table.get("diamond_shapes") or {}, DIAMOND_SHAPES)
+    stone = per_ct(float(table.get("stone_per_ct") or 0.0), table.get("stone_types") or {}, STONE_TYPES)
+    return metal, diamond, stone
+
+
+def rates_payload(table: Optional[dict]) -> Optional[dict]:
+    if table is None:
+        return None
+    out = {k: v for k, v in table.items() if k != "_id"}
+    out["id"] = str(table["_id"])
+    for k in ("effective_at", "created_at"):
+        if isinstance(out.get(k), datetime):
+            out[k] = out[k].isoformat()
+    return out
+
+
+async def current_rates(db) -> Optional[dict]:
+    """Latest rate table already in effect."""
+    return await db[RATES_COLLECTION].find_one(
+        {"effective_at": {"$lte": datetime.utcnow()}}, sort=[("effective_at", -1), ("_id", -1)]
+    )
+
+
+async def save_rates(db, table: dict) -> dict:
+    validate_rates(table)
+    now = datetime.utcnow()
+    doc = {**table, "_id": ObjectId(), "effective_at": table.get("effective_at") or now, "created_at": now}
+    await db[RATES_COLLECTION].insert_one(doc)
+    return doc
+
+
+async def list_rates(db, limit: int = 30) -> list[dict]:
+    return await db[RATES_COLLECTION].find().sort([("effective_at", -1), ("_id", -1)]).to_list(length=limit)
+
+
+async def ensure_valuation_indexes(db) -> None:
+    await db[RATES_COLLECTION].create_index([("effective_at", -1)])
+
+
+async def _with_tables(db, docs: list[dict]) -> list[dict]:
+    """Merge metal_weights / gem_details / diamonds back from the blob collection (not raw_text)."""
+    if not docs:
+        return docs
+    cursor = db[BLOB_COLLECTION].find({"_id": {"$in": [d["_id"] for d in docs]}}, _TABLE_PROJECTION)
+    by_id = {d["_id"]: d async for d in cursor}
+    return [merge_cold(d, by_id.get(d["_id"]), expand=False) for d in docs]
+
+
+def _slot(category: Optional[int], vocab: tuple[str, ...]) -> int:
+    """Rate vector slot: the category, or the trailing "not stated" slot."""
+    return len(vocab) if category is None else category
+
+
+def _priceable(doc: dict) -> bool:
+    return doc.get("status") in STATUSES
+
+
+class ValuationEngine(FeedFollower):
+    name = "Valuation engine"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._store = ColumnStore({
+            "grams": ((len(METALS),), "float64"),
+            "diamond_ct": ((), "float64"),
+            "diamond_shape": ((), "int16"),  # slot into the diamond rate vector
+            "stone_ct": ((), "float64"),
+            "stone_type": ((), "int16"),  # slot into the stone rate vector
+            "status": ((), "int8"),  # index into STATUSES
+            "metal_v": ((), "float64"),
+            "diamond_v": ((), "float64"),
+            "stone_v": ((), "float64"),
+        })
+        self._rates: Optional[dict] = None
+        self._metal_rate = self._diamond_rate = self._stone_rate = None
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    @property
+    def refresh_s(self) -> float:
+        return settings.VALUATION_REFRESH_S
+
+    @property
+    def rates(self) -> Optional[dict]:
+        return self._rates
+
+    # -- columns ---------------------------------------------------------------------------
+
+    def _set_row(self, i: int, q: dict, status: str) -> None:
+        c = self._store
+        c["grams"][i] = q["grams"]
+        c["diamond_ct"][i] = q["diamond_ct"] or 0.0
+        c["diamond_shape"][i] = _slot(q["diamond_shape"], DIAMOND_SHAPES)
+        c["stone_ct"][i] = q["stone_ct"] or 0.0
+        c["stone_type"][i] = _slot(q["stone_type"], STONE_TYPES)
+        c["status"][i] = STATUSES.index(status)
+
+    def _price(self, rows) -> None:
+        """Recompute all value columns for `rows` (a slice or index array). Lock held."""
+        c = self._store
+        c["metal_v"][rows] = c["grams"][rows] @ self._metal_rate
+        c["diamond_v"][rows] = c["diamond_ct"][rows] * self._diamond_rate[c["diamond_shape"][rows]]
+        c["stone_v"][rows] = c["stone_ct"][rows] * self._stone_rate[c["stone_type"][rows]]
+
+    def replace_all(self, ids: list[str], items: list[tuple[dict, str]], rates: Optional[dict]) -> None:
+        """Swap in a freshly loaded catalog ((quantities, status) per id) and price it in one pass."""
+        with self._lock:
+            c = self._store
+            c.reset(ids)
+            n = len(ids)
+            if n:
+                c["grams"][:n] = [q["grams"] for q, _ in items]
+                c["diamond_ct"][:n] = [q["diamond_ct"] or 0.0 for q, _ in items]
+                c["diamond_shape"][:n] = [_slot(q["diamond_shape"], DIAMOND_SHAPES) for q, _ in items]
+                c["stone_ct"][:n] = [q["stone_ct"] or 0.0 for q, _ in items]
+                c["stone_type"][:n] = [_slot(q["stone_type"], STONE_TYPES) for q, _ in items]
+                c["status"][:n] = [STATUSES.index(status) for _, status in items]
+            self._rates = rates
+            self._metal_rate, self._diamond_rate, self._stone_rate = _rate_vectors(rates)
+            self._price(slice(0, n))
+
+    def upsert(self, record_id: str, q: Optional[dict], status: Optional[str]) -> None:
+        if q is None or status not in STATUSES:
+            self.remove(record_id)
+            return
+        with self._lock:
+            if self._metal_rate is None:
+                return
+            i = self._store.slot(record_id)
+            self._set_row(i, q, status)
+            self._price(slice(i, i + 1))
+
+    def remove(self, record_id: str) -> None:
+        with self._lock:
+            self._store.remove(record_id)
+
+    def reprice(self, rates: Optional[dict]) -> int:
+        """Apply a new rate table, touching only the columns and rows whose rate changed. Returns rows touched."""
+        np = load_numpy()
+        metal, diamond, stone = _rate_vectors(rates)
+        with self._lock:
+            c = self._store
+            n = len(c)
+            touched = np.zeros(n, dtype=bool)
+            if self._metal_rate is not None and n:
+                cols = np.nonzero(metal != self._metal_rate)[0]
+                if cols.size:
+                    G = c["grams"][:n, cols]
+                    c["metal_v"][:n] += G @ (metal[cols] - self._metal_rate[cols])
+                    touched |= (G > 0).any(axis=1)
+                changed = diamond != self._diamond_rate
+                if changed.any():
+                    shape, ct = c["diamond_shape"][:n], c["diamond_ct"][:n]
+                    rows = np.nonzero(changed[shape] & (ct > 0))[0]
+                    c["diamond_v"][rows] = ct[rows] * diamond[shape[rows]]
+                    touched[rows] = True
+                changed = stone != self._stone_rate
+                if changed.any():
+                    kind, ct = c["stone_type"][:n], c["stone_ct"][:n]
+                    rows = np.nonzero(changed[kind] & (ct > 0))[0]
+                    c["stone_v"][rows] = ct[rows] * stone[kind[rows]]
+                    touched[rows] = True
+            self._rates = rates
+            self._metal_rate, self._diamond_rate, self._stone_rate = metal, diamond, stone
+            return int(touched.sum())
+
+    # -- queries ---------------------------------------------------------------------------
+
+    def _breakdown(self, grams, diamond_ct: float, shape: int, stone_ct: float, stone_type: int) -> dict:
+        metal_values = grams * self._metal_rate
+        metals = {
+            m: {"grams": round(float(g), 4), "value": round(float(v), 2)}
+            for m, g, v in zip(METALS, grams, metal_values)
+            if g
+        }
+        metal_v = float(metal_values.sum())
+        diamond_v = diamond_ct * float(self._diamond_rate[shape])
+        stone_v = stone_ct * float(self._stone_rate[stone_type])
+        return {
+            "currency": (self._rates or {}).get("currency"),
+            "rates_id": str(self._rates["_id"]) if self._rates else None,
+            "metals": metals,
+            "diamond_ct": round(diamond_ct, 4),
+            "diamond_shape": DIAMOND_SHAPES[shape] if shape < len(DIAMOND_SHAPES) else None,
+            "stone_ct": round(stone_ct, 4),
+            "stone_type": STONE_TYPES[stone_type] if stone_type < len(STONE_TYPES) else None,
+            "metal_value": round(metal_v, 2),
+            "diamond_value": round(diamond_v, 2),
+            "stone_value": round(stone_v, 2),
+            "total": round(metal_v + diamond_v + stone_v, 2),
+        }
+
+    def valuation(self, record_id: str) -> Optional[dict]:
+        with self._lock:
+            c = self._store
+            i = c.row(record_id)
+            if i is None or self._metal_rate is None:
+                return None
+            return self._breakdown(
+                c["grams"][i],
+                float(c["diamond_ct"][i]),
+                int(c["diamond_shape"][i]),
+                float(c["stone_ct"][i]),
+                int(c["stone_type"][i]),
+            )
+
+    def value_of(self, ext: Optional[dict]) -> Optional[dict]:
+        """Valuation of extracted data that is not (yet) in the engine, at the current rates."""
+        np = load_numpy()
+        q = quantities(ext)
+        if q is None:
+            return None
+        with self._lock:
+            if self._metal_rate is None:
+                return None
+            return self._breakdown(
+                np.array(q["grams"], dtype=np.float64),
+                q["diamond_ct"] or 0.0,
+                _slot(q["diamond_shape"], DIAMOND_SHAPES),
+                q["stone_ct"] or 0.0,
+                _slot(q["stone_type"], STONE_TYPES),
+            )
+
+    def summary(self, status: Optional[str] = None, group_by: Optional[str] = None, top: int = 0) -> dict:
+        """Catalog totals (optionally one status), grouped totals and the `top` most valuable records."""
+        np = load_numpy()
+        with self._lock:
+            c = self._store
+            n = len(c)
+            rows = slice(0, n)
+            if status is not None:
+                rows = np.nonzero(c["status"][:n] == STATUSES.index(status))[0]
+            metal_v, diamond_v, stone_v = c["metal_v"][rows], c["diamond_v"][rows], c["stone_v"][rows]
+            total_v = metal_v + diamond_v + stone_v
+            out: dict[str, Any] = {
+                "currency": (self._rates or {}).get("currency"),
+                "rates_id": str(self._rates["_id"]) if self._rates else None,
+                "records": int(total_v.size),
+                "priced": int((total_v > 0).sum()),
+                "metal_value": round(float(metal_v.sum()), 2),
+                "diamond_value": round(float(diamond_v.sum()), 2),
+                "stone_value": round(float(stone_v.sum()), 2),
+                "total": round(float(total_v.sum()), 2),
+            }
+            if group_by == "metal":
+                grams = c["grams"][rows].sum(axis=0)
+                out["groups"] = [
+                    {"key": m, "grams": round(float(g), 4), "value": round(float(g * r), 2)}
+                    for m, g, r in zip(METALS, grams, self._metal_rate)
+                    if g
+                ]
+            elif group_by in ("status", "diamond_shape", "stone_type"):
+                codes, values, vocab = {
+                    "status": (c["status"][rows], total_v, STATUSES),
+                    "diamond_shape": (c["diamond_shape"][rows], diamond_v, DIAMOND_SHAPES + (None,)),
+                    "stone_type": (c["stone_type"][rows], stone_v, STONE_TYPES + (None,)),
+                }[group_by]
+                counts = np.bincount(codes, minlength=len(vocab))
+                sums = np.bincount(codes, weights=values, minlength=len(vocab))
+                out["groups"] = [
+                    {"key": vocab[i], "records": int(counts[i]), "value": round(float(sums[i]), 2)}
+                    for i in range(len(vocab))
+                    if counts[i]
+                ]
+            if top and total_v.size:
+                take = min(top, total_v.size)
+                idx = np.argpartition(-total_v, take - 1)[:take]
+                idx = idx[np.argsort(-total_v[idx])]
+                pos = idx if status is None else rows[idx]
+                out["top"] = [
+                    {"id": c.ids[p], "total": round(float(total_v[j]), 2)} for j, p in zip(idx, pos)
+                ]
+            return out
+
+    # -- keeping up with Mongo -------------------------------------------------------------
+
+    async def load(self, db) -> None:
+        started = time.perf_counter()
+        rates = await current_rates(db)
+        ids: list[str] = []
+        items: list[tuple[dict, str]] = []
+        batch: list[dict] = []
+        cursor = db["jewelry"].find(
+            {"status": {"$in": list(STATUSES)}}, {"extracted_data": 1, "status": 1}
+        ).batch_size(LOAD_CHUNK)
+
+        async def flush() -> None:
+            for doc in await _with_tables(db, batch):
+                q = quantities(doc.get("extracted_data"))
+                if q is not None:
+                    ids.append(str(doc["_id"]))
+                    items.append((q, doc["status"]))
+            batch.clear()
+
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= LOAD_CHUNK:
+                await flush()
+        await flush()
+        with metrics.stage("valuation_price_all"):
+            await asyncio.to_thread(self.replace_all, ids, items, rates)
+        logger.info("Valuation engine built: %d priced records in %.1fs", len(ids), time.perf_counter() - started)
+
+    async def apply(self, db, page: dict) -> None:
+        docs = await _with_tables(db, [d for d in page["docs"] if _priceable(d)])
+        quantities_by_id = {str(d["_id"]): (quantities(d.get("extracted_data")), d.get("status")) for d in docs}
+
+        def apply() -> None:
+            for doc in page["docs"]:
+                rid = str(doc["_id"])
+                q, status = quantities_by_id.get(rid, (None, None))
+                self.upsert(rid, q, status)
+            for rid in page["deleted"]:
+                self.remove(rid)
+
+        await asyncio.to_thread(apply)
+
+    async def before_page(self, db) -> None:
+        """Re-price when a different rate table has come into effect."""
+        rates = await current_rates(db)
+        current = self._rates["_id"] if self._rates else None
+        if (rates["_id"] if rates else None) == current:
+            return
+        started = time.perf_counter()
+        with metrics.stage("valuation_reprice"):
+            touched = await asyncio.to_thread(self.reprice, rates)
+        logger.info(
+            "Valuation repriced %d of %d records for rates %s in %.3fs",
+            touched, len(self), rates["_id"] if rates else None, time.perf_counter() - started,
+        )
+
+    async def refresh_rates(self, db) -> None:
+        """Pick up a just-saved rate table now instead of on the next refresh tick."""
+        if self.ready:
+            await self.before_page(db)
+
+
+valuation_engine = ValuationEngine()
+
+registry.gauge(
+    "karatplus_valuation_records",
+    "Records priced by the in-memory valuation engine.",
+    callback=lambda: len(valuation_engine),
+)
@@ -0,0 +1,90 @@
+"""
+Startup warmup: do the discovery work that would otherwise land on the first requests
+(Mongo connection, Tesseract check, Gemini TLS handshakes, PDF/Excel/imaging imports).
+Steps run concurrently, each bounded by WARMUP_TIMEOUT_S; failures are logged, never raised.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import mimetypes
+import time
+from typing import Any, Awaitable, Callable
+
+from app.config import settings
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the services that use them; loaded here so the first upload doesn't wait.
+PRELOAD_MODULES = ("PIL.Image", "pypdf", "openpyxl")
+
+WARMUP_SECONDS = registry.gauge(
+    "karatplus_warmup_seconds",
+    "Duration of each startup warmup step.",
+    ("step",),
+)
+
+
+async def _ping_mongo(db) -> str:
+    await db.command("ping")
+    return "ok"
+
+
+def _preload_libraries() -> str:
+    mimetypes.init()
+    loaded = []
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except ImportError:
+            pass
+    return ",".join(loaded) or "none"
+
+
+def _check_ocr() -> str:
+    from app.services.ocr_service import warm_ocr
+
+    return warm_ocr() or "unavailable"
+
+
+def _open_gemini() -> str:
+    from app.services.ai_service import warm_connections
+
+    if not settings.GEMINI_API_KEY:
+        return "skipped (no GEMINI_API_KEY)"
+    return f"{warm_connections(settings.GEMINI_WARM_CONNECTIONS)} connections"
+
+
+async def _timed(name: str, fn: Callable[[], Awaitable[Any]], report: dict) -> None:
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(fn(), timeout=settings.WARMUP_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        result = "timeout"
+    except Exception as e:
+        result = f"failed: {e.__class__.__name__}: {e}"
+    elapsed = time.perf_counter() - started
+    WARMUP_SECONDS.set(elapsed, step=name)
+    report[name] = {"result": result, "seconds": round(elapsed, 3)}
+
+
+async def run_warmup(db) -> dict:
+    """Run all steps concurrently; returns {step: {"result", "seconds"}}."""
+    report: dict[str, dict] = {}
+    started = time.perf_counter()
+    await asyncio.gather(
+        _timed("mongo", lambda: _ping_mongo(db), report),
+        _timed("libraries", lambda: asyncio.to_thread(_preload_libraries), report),
+        _timed("ocr", lambda: asyncio.to_thread(_check_ocr), report),
+        _timed("gemini", lambda: asyncio.to_thread(_open_gemini), report),
+    )
+    logger.info(
+        "Warmup finished in %.2fs: %s",
+        time.perf_counter() - started,
+        ", ".join(f"{k}={v['result']} ({v['seconds']}s)" for k, v in report.items()),
+    )
+    return report
@@ -0,0 +1,262 @@
+"""
+Write-behind coalescer for finished extraction results. Worker threads `submit` results;
+a task on the API event loop flushes them with one unordered bulk_write when the buffer
+reaches WRITE_BEHIND_MAX_BATCH or WRITE_BEHIND_FLUSH_MS elapses, and on shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.services.metrics import STAGE_SECONDS, registry
+from app.services.tracing import log_span
+from app.services.record_store import (
+    BLOB_COLLECTION,
+    cold_update_op,
+    hot_update,
+    split_update,
+    update_record_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+FlushCallback = Callable[[list[tuple[str, dict]]], Awaitable[None]]  # (record id, data) per written result
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        get_collection: Callable[[], Awaitable],
+        on_flushed: Optional[FlushCallback] = None,
+        max_batch: int = 100,
+        flush_interval: float = 0.25,
+    ) -> None:
+        self._get_collection = get_collection
+        self._on_flushed = on_flushed
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = max(0.01, flush_interval)
+        self._pending: dict[str, dict] = {}
+        self._attempts: dict[str, int] = {}
+        self._traces: dict[str, tuple[str, bool]] = {}  # record id -> (trace id, sampled)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task = self._loop.create_task(self._run())
+
+    def submit(self, record_id: str, data: dict, trace_id: Optional[str] = None, sampled: bool = False) -> bool:
+        """
+        Thread-safe. Returns False when the flusher is not running (caller must write itself).
+        `trace_id` and its `sampled` decision tie the eventual bulk write back to the upload
+        that produced the result.
+        """
+        loop = self._loop
+        if not self.running or loop is None or self._closing:
+            return False
+        with self._lock:
+            # Later results for the same record win; keys are merged.
+            self._pending.setdefault(record_id, {}).update(data)
+            if trace_id:
+                self._traces[record_id] = (trace_id, sampled)
+            full = len(self._pending) >= self.max_batch
+        if full:
+            loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed")
+
+    async def flush(self) -> int:
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch = self._pending
+            self._pending = {}
+        ids = list(batch)
+        # Stamp at write time, not when the worker finished: a result that waited in the buffer
+        # (or for retries) must not land behind watermarks that later writes already moved.
+        now = datetime.utcnow()
+        for rid in ids:
+            stamp_written(batch[rid], now)
+        ops, cold_ops = [], []
+        for rid in ids:
+            # Hot fields go to the record; raw_text and table arrays to the blob collection.
+            hot_set, hot_unset, cold = split_update(batch[rid])
+            ops.append(UpdateOne({"_id": ObjectId(rid)}, hot_update(hot_set, hot_unset)))
+            op = cold_update_op(ObjectId(rid), cold)
+            if op is not None:
+                cold_ops.append(op)
+        failed: set[int] = set()
+        started = time.perf_counter()
+        try:
+            coll = await self._get_collection()
+            if cold_ops:
+                await coll.database[BLOB_COLLECTION].bulk_write(cold_ops, ordered=False)
+        except Exception:
+            # Cold-op error indices don't map to records; retry the whole batch.
+            logger.exception("Write-behind blob write of %d results failed", len(cold_ops))
+            failed = set(range(len(ops)))
+        if not failed:
+            try:
+                await coll.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            except Exception:
+                logger.exception("Write-behind bulk_write of %d results failed", len(ops))
+                failed = set(range(len(ops)))
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage="db_update")
+
+        flushed: list[tuple[str, dict]] = []
+        for i, rid in enumerate(ids):
+            if i in failed:
+                if self._requeue(rid, batch[rid]):
+                    continue
+                # Out of batch retries: write this result on its own rather than leave it Processing.
+                batch[rid] = await self._write_direct(rid, batch[rid])
+                if batch[rid] is None:
+                    continue
+            flushed.append((rid, batch[rid]))
+            self._attempts.pop(rid, None)
+            with self._lock:
+                trace = self._traces.pop(rid, None) if rid not in self._pending else self._traces.get(rid)
+            if trace is not None:
+                log_span(trace[0], trace[1], "db_update", elapsed, record_id=rid, batch_size=len(ids))
+        if flushed and self._on_flushed is not None:
+            # One call per flush so the hook can batch its own writes (rollups) too.
+            try:
+                await self._on_flushed(flushed)
+            except Exception:
+                logger.exception("Post-flush hook failed for %d records", len(flushed))
+        return len(flushed)
+
+    def _requeue(self, record_id: str, data: dict) -> bool:
+        """Put a failed result back for the next flush; False once it has used MAX_ATTEMPTS."""
+        attempts = self._attempts.get(record_id, 0) + 1
+        if attempts >= MAX_ATTEMPTS:
+            self._attempts.pop(record_id, None)
+            logger.error("Extraction result for %s failed %d batched writes; writing it directly", record_id, attempts)
+            return False
+        self._attempts[record_id] = attempts
+        with self._lock:
+            # Keep anything newer that arrived meanwhile.
+            merged = dict(data)
+            merged.update(self._pending.get(record_id, {}))
+            self._pending[record_id] = merged
+        return True
+
+    async def _write_direct(self, record_id: str, data: dict) -> Optional[dict]:
+        """
+        Last resort for one result: the regular single-record update, else just move the record
+        to Review Required so it is not stuck in Processing. Returns what was written, or None.
+        """
+        oid = ObjectId(record_id)
+        stamp_written(data, datetime.utcnow())
+        try:
+            coll = await self._get_collection()
+            await update_record_fields(coll.database, oid, data)
+            return data
+        except Exception:
+            logger.exception("Direct write of extraction result for %s failed", record_id)
+        fallback = {
+            "status": "Review Required",
+            "review_required": True,
+            "source": data.get("source") or "AI",
+            "confidence_score": data.get("confidence_score") or 0.0,
+        }
+        stamp_written(fallback, datetime.utcnow())
+        try:
+            coll = await self._get_collection()
+            await coll.update_one({"_id": oid}, {"$set": fallback})
+            return fallback
+        except Exception:
+            with self._lock:
+                self._traces.pop(record_id, None)
+            logger.exception("Dropping extraction result for %s; record stays Processing", record_id)
+            return None
+
+    async def close(self) -> None:
+        """Stop the flusher and drain everything still buffered."""
+        self._closing = True
+        if self._task is not None:
+            self._wake.set()
+            try:
+                await self._task
+            except Exception:
+                pass
+        for _ in range(MAX_ATTEMPTS):
+            if not self.depth:
+                break
+            await self.flush()
+        self._task = None
+
+
+def stamp_written(data: dict, now: datetime) -> None:
+    """updated_at (and completed_at for finished extractions) as of the moment the write happens."""
+    data["updated_at"] = now
+    if data.get("status") and data["status"] != "Processing":
+        data["completed_at"] = now
+
+
+async def _jewelry_collection():
+    from app.db import get_db
+
+    db = await get_db()
+    return db["jewelry"]
+
+
+async def _after_flush(items: list[tuple[str, dict]]) -> None:
+    from app.db import get_db
+    from app.services.record_hooks import records_completed
+
+    await records_completed(await get_db(), items)
+
+
+write_behind = WriteBehindBuffer(
+    _jewelry_collection,
+    on_flushed=_after_flush,
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH,
+    flush_interval=settings.WRITE_BEHIND_FLUSH_MS / 1000.0,
+)
+
+registry.gauge(
+    "karatplus_write_behind_depth",
+    "Extraction results waiting to be flushed to MongoDB.",
+    callback=lambda: write_behind.depth,
+)
@@ -0,0 +1,100 @@
+"""
+Re-run extraction on stored files of existing records (e.g. after a parser or prompt change)
+and keep only results that improved. Progress is checkpointed in MongoDB: Ctrl-C pauses, and
+--resume continues from the checkpoint. Same jobs as POST /api/admin/backfill.
+Run from backend directory:
+  python backfill.py --status "Review Required" --source OCR --concurrency 4 --rate 2
+  python backfill.py --dry-run --limit 500
+  python backfill.py --resume <job id>
+  python backfill.py --list
+"""
+import argparse
+import asyncio
+
+# Add parent to path so app is importable
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.config import settings
+from app.services import backfill
+from app.services.log_pipeline import configure_logging, shutdown_logging
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+def _print_job(job: dict) -> None:
+    p = backfill.job_payload(job)
+    counts = ", ".join(f"{k}={v}" for k, v in (p.get("counts") or {}).items())
+    print(f"{p['id']}  {p['status']:<9} {p.get('processed', 0)}/{p.get('total', 0)}  {counts}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Resumable re-extraction backfill.")
+    parser.add_argument("--status", action="append", choices=["Completed", "Review Required"],
+                        help="Repeatable (default: Review Required)")
+    parser.add_argument("--source", action="append", choices=["AI", "OCR"], help="Repeatable (default: any)")
+    parser.add_argument("--max-confidence", type=float)
+    parser.add_argument("--created-from", help="ISO date/time, inclusive")
+    parser.add_argument("--created-to", help="ISO date/time, exclusive")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=1.0, help="Extraction starts per second (0 = unlimited)")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--dry-run", action="store_true", help="Count improvements without writing")
+    parser.add_argument("--no-rollups", action="store_true", help="Skip the rollup rebuild at the end")
+    parser.add_argument("--resume", metavar="JOB_ID")
+    parser.add_argument("--list", action="store_true", help="Show recent jobs and exit")
+    args = parser.parse_args()
+
+    configure_logging()
+    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    db = client[settings.MONGODB_DB]
+    try:
+        if args.list:
+            for job in await backfill.list_jobs(db):
+                _print_job(job)
+            return
+        if args.resume:
+            job_id = args.resume
+        else:
+            filt = {"status": args.status or ["Review Required"]}
+            if args.source:
+                filt["source"] = args.source
+            if args.max_confidence is not None:
+                filt["max_confidence"] = args.max_confidence
+            if args.created_from:
+                filt["created_from"] = args.created_from
+            if args.created_to:
+                filt["created_to"] = args.created_to
+            job = await backfill.create_job(
+                db,
+                filt,
+                concurrency=args.concurrency,
+                rate_per_s=args.rate,
+                limit=args.limit,
+                dry_run=args.dry_run,
+                rebuild_rollups=not args.no_rollups,
+            )
+            job_id = job["_id"]
+            print(f"Created backfill job {job_id} ({job['total']} matching records)")
+        try:
+            job = await backfill.claim_job(db, job_id)
+        except backfill.BackfillError as e:
+            raise SystemExit(f"{job_id}: {e}")
+        try:
+            job = await backfill.run_job(db, job)
+        finally:
+            # Also reached on Ctrl-C: run_job has saved the checkpoint by then.
+            job = await backfill.get_job(db, job_id)
+            _print_job(job)
+            if job["status"] != "completed":
+                print(f"Resume with: python backfill.py --resume {job_id}")
+    finally:
+        client.close()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
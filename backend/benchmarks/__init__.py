@@ -0,0 +1 @@
+# Benchmarks (run from backend directory: python -m benchmarks.<name>)
@@ -0,0 +1,199 @@
+"""
+Benchmark the extraction pipeline stages on the synthetic corpus (benchmarks/corpus.py).
+Fully offline: Gemini calls are answered from benchmarks/recorded/gemini_responses.json.
+
+For each stage: throughput, p50/p95/p99 latency and peak traced memory, with p50 compared
+against a stored baseline (benchmarks/baseline.json by default).
+
+Run from backend directory:
+  python -m benchmarks.bench_pipeline [--stages regex,pdf_text] [--repeat 3] [--save-baseline]
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import DEFAULT_OUT, build_corpus, recorded_gemini_responses
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _percentile(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def _stage_regex(manifest: dict) -> tuple[Callable[[Any], Any], list]:
+    from app.services.ocr_service import extract_from_text
+
+    return extract_from_text, manifest["text"]
+
+
+def _stage_preprocess(manifest: dict):
+    from app.services import ocr_service
+
+    # Preprocessing only needs Pillow; don't let a missing tesseract binary skip it.
+    ocr_service._OCR_AVAILABLE = True
+    return ocr_service._preprocess_image, [Path(p) for p in manifest["images"]]
+
+
+def _stage_pdf_text(manifest: dict):
+    from app.services.processor import _extract_pdf_text
+
+    return _extract_pdf_text, [Path(p) for p in manifest["pdfs"]]
+
+
+def _stage_excel_text(manifest: dict):
+    from app.services.processor import _extract_excel_text
+
+    return _extract_excel_text, [Path(p) for p in manifest["workbooks"]]
+
+
+def _stage_gemini_parse(manifest: dict):
+    from app.services.ai_service import _extract_text_from_response, _parse_json_text
+
+    return (lambda resp: _parse_json_text(_extract_text_from_response(resp) or "")), recorded_gemini_responses()
+
+
+def _stage_gemini_offline(manifest: dict):
+    """extract_with_gemini end to end (file read, response handling, validation) with the HTTP call replayed."""
+    from app.config import settings
+    from app.services import ai_service
+
+    responses = itertools.cycle(recorded_gemini_responses())
+
+    def replay(image_path: Path, model: str) -> dict:
+        # Keep the request-building cost (file read + base64) that the live call pays.
+        ai_service.base64.b64encode(image_path.read_bytes())
+        return next(responses)
+
+    ai_service._generate_content = replay
+    settings.GEMINI_API_KEY = settings.GEMINI_API_KEY or "offline-benchmark"
+    inputs = [Path(p) for p in (manifest["images"] or manifest["pdfs"])]
+    return ai_service.extract_with_gemini, inputs
+
+
+STAGES: dict[str, Callable[[dict], tuple[Callable[[Any], Any], list]]] = {
+    "regex": _stage_regex,
+    "preprocess": _stage_preprocess,
+    "pdf_text": _stage_pdf_text,
+    "excel_text": _stage_excel_text,
+    "gemini_parse": _stage_gemini_parse,
+    "gemini_offline": _stage_gemini_offline,
+}
+
+
+def run_stage(fn: Callable[[Any], Any], inputs: list, repeat: int) -> dict:
+    fn(inputs[0])  # warm caches and lazy imports
+    latencies = []
+    wall = time.perf_counter()
+    for _ in range(repeat):
+        for x in inputs:
+            t0 = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - wall
+
+    # Separate pass for memory: tracemalloc slows allocation-heavy code a lot.
+    tracemalloc.start()
+    for x in inputs:
+        fn(x)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Stage names whose p50 got slower than baseline by more than `threshold` (fraction)."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("p50_ms"):
+            r["vs_baseline"] = None
+            continue
+        ratio = r["p50_ms"] / base["p50_ms"]
+        r["vs_baseline"] = f"{(ratio - 1) * 100:+.1f}%"
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--sheets", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed p50 slowdown before flagging (0.20 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    manifest = build_corpus(args.corpus, args.sheets, args.seed)
+    results: dict[str, dict] = {}
+    for name in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        if name not in STAGES:
+            parser.error(f"unknown stage {name!r}")
+        try:
+            fn, inputs = STAGES[name](manifest)
+        except ImportError as e:
+            print(f"{name:<15} skipped: {e}")
+            continue
+        if not inputs:
+            print(f"{name:<15} skipped: no corpus inputs (missing optional package?)")
+            continue
+        results[name] = run_stage(fn, inputs, args.repeat)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, baseline.get("stages", {}), args.threshold)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'stage':<15} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10} {'vs base':>9}")
+        for name, r in results.items():
+            print(
+                f"{name:<15} {r['ops_per_s']:>10} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} "
+                f"{r['peak_kib']:>10} {r['vs_baseline'] or '-':>9}"
+            )
+        if not baseline:
+            print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        for name in regressions:
+            print(f"REGRESSION: {name} p50 is {results[name]['vs_baseline']} vs baseline")
+
+    if args.save_baseline:
+        stages = {k: {m: v for m, v in r.items() if m != "vs_baseline"} for k, r in results.items()}
+        meta = {"python": platform.python_version(), "machine": platform.machine(), "sheets": args.sheets, "seed": args.seed}
+        args.baseline.write_text(json.dumps({"meta": meta, "stages": stages}, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare record-list serialization: the old per-doc dict copy + isoformat + jsonable_encoder
+path against app.services.json_encoding (orjson straight to bytes).
+
+Run from backend directory: python -m benchmarks.bench_serialization [--records 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.services.json_encoding import encode_docs
+
+
+def make_docs(n: int, seed: int = 7) -> list[dict]:
+    rnd = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    docs = []
+    for i in range(n):
+        ts = base + timedelta(minutes=i)
+        docs.append({
+            "_id": ObjectId(),
+            "image_url": f"http://localhost:8000/uploads/{i:08x}.jpg",
+            "image_filename": f"{i:08x}.jpg",
+            "extracted_data": {
+                "ring_size": str(rnd.choice([5, 6, 7, 8])),
+                "gold_weight_14kt_gm": round(rnd.uniform(1, 9), 2),
+                "gold_weight_18kt_gm": None,
+                "diamond_weight_ct": round(rnd.uniform(0, 2), 2),
+                "diamond_count": rnd.randint(0, 80),
+                "diamond_shape": rnd.choice(["Round", "Oval", "Princess"]),
+                "dimensions_mm": "12x8x6",
+                "metal_weights": [{"metal": "Yellow Gold:14KY", "grams": 1.2, "dwt": 0.77}],
+                "gem_details": [{"gem": "Diamond", "shape": "Round", "size": "1.30 x 1.30", "count": 84, "weight": "0.69"}],
+            },
+            "status": rnd.choice(["Completed", "Review Required"]),
+            "source": rnd.choice(["AI", "OCR"]),
+            "confidence_score": rnd.choice([0.5, 0.8, 0.92, 0.95]),
+            "review_required": False,
+            "created_at": ts,
+            "updated_at": ts,
+            "raw_text": None,
+            "file_hash": f"{i:064x}",
+        })
+    return docs
+
+
+def legacy_encode(docs: list[dict]) -> bytes:
+    items = []
+    for doc in docs:
+        item = dict(doc)
+        item["id"] = str(item.pop("_id", ""))
+        item["created_at"] = doc.get("created_at").isoformat() if doc.get("created_at") else None
+        item["updated_at"] = doc.get("updated_at").isoformat() if doc.get("updated_at") else None
+        item["extracted_data"] = doc.get("extracted_data") or {}
+        items.append(item)
+    body = jsonable_encoder({"items": items, "total": len(items)})
+    return json.dumps(body, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _time(fn, docs, repeat: int) -> list[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(docs)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    docs = make_docs(args.records)
+    assert json.loads(legacy_encode(docs[:50])) == json.loads(encode_docs(docs[:50]))
+    for name, fn in (("legacy (jsonable_encoder)", legacy_encode), ("orjson encoder", encode_docs)):
+        ms = _time(fn, docs, args.repeat)
+        print(f"{name:<28} median {statistics.median(ms):8.1f} ms  min {min(ms):8.1f} ms  ({args.records} records)")
+
+
+if __name__ == "__main__":
+    main()
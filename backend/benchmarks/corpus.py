@@ -0,0 +1,221 @@
+"""
+Synthetic, anonymized spec-sheet corpus for the benchmarks: OCR-style text, JPEG/PNG sheet
+images, single-page text PDFs and XLSX workbooks, all generated from a seed. Style numbers
+and values are random; nothing comes from real customer sheets.
+
+Run from backend directory: python -m benchmarks.corpus [--out DIR] [--sheets 40]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+METALS = [
+    ("Yellow Gold:14KY", 12.8),
+    ("White Gold:14KW", 12.6),
+    ("Yellow Gold:18KY", 15.2),
+    ("Rose Gold:18KR", 15.0),
+    ("Platinum:950", 20.1),
+    ("Silver:925", 10.4),
+]
+SHAPES = ["Round", "Princess", "Oval", "Pear", "Marquise", "Cushion", "Emerald"]
+GEMS = ["Diamond", "Diamond", "Diamond", "Ruby", "Sapphire", "Emerald"]
+
+RECORDED_DIR = Path(__file__).resolve().parent / "recorded"
+DEFAULT_OUT = Path(tempfile.gettempdir()) / "karatplus-bench-corpus"
+
+
+@dataclass
+class Sheet:
+    style: str
+    ring_size: str
+    metals: list[dict] = field(default_factory=list)
+    gems: list[dict] = field(default_factory=list)
+    dims: tuple[float, float, float] = (0.0, 0.0, 0.0)
+
+    def lines(self) -> list[str]:
+        out = [f"STYLE NO: {self.style}", f"Ring Size: {self.ring_size}", "", "METAL WEIGHTS"]
+        out.append("Metal              Grams    DWT    SPG")
+        for m in self.metals:
+            out.append(f"{m['metal']:<18} {m['grams']:>6.2f} {m['dwt']:>6.2f} {m['spg']:>5.1f}")
+        out += ["", "GEM REPORTER", "Gem      Shape     Size          Count  Weight"]
+        for g in self.gems:
+            out.append(f"{g['gem']:<8} {g['shape']:<9} {g['size']:<13} {g['count']:>5}  {g['weight']:.2f}")
+        total_ct = sum(g["weight"] for g in self.gems if g["gem"] == "Diamond")
+        total_n = sum(g["count"] for g in self.gems if g["gem"] == "Diamond")
+        out += [
+            "",
+            f"Diamond Count: {total_n}",
+            f"Diamond: {total_ct:.2f} ct",
+            f"Dimensions: {self.dims[0]} x {self.dims[1]} x {self.dims[2]} mm",
+        ]
+        return out
+
+    def text(self) -> str:
+        return "\n".join(self.lines())
+
+
+def make_sheet(rnd: random.Random) -> Sheet:
+    metals = []
+    for metal, spg in rnd.sample(METALS, rnd.randint(1, 3)):
+        grams = round(rnd.uniform(0.8, 12.0), 2)
+        metals.append({"metal": metal, "grams": grams, "dwt": round(grams * 0.643, 2), "spg": spg})
+    gems = []
+    for _ in range(rnd.randint(1, 8)):
+        side = round(rnd.uniform(0.8, 7.5), 2)
+        count = rnd.randint(1, 120)
+        gems.append({
+            "gem": rnd.choice(GEMS),
+            "shape": rnd.choice(SHAPES),
+            "size": f"{side:.2f} x {side:.2f}",
+            "count": count,
+            "weight": round(count * side ** 3 * 0.0037, 2),
+        })
+    return Sheet(
+        style=f"KP-{rnd.randint(1000, 99999)}",
+        ring_size=str(rnd.choice([5, 5.5, 6, 6.5, 7, 7.5, 8, 9])),
+        metals=metals,
+        gems=gems,
+        dims=(round(rnd.uniform(5, 30), 1), round(rnd.uniform(3, 20), 1), round(rnd.uniform(1, 12), 1)),
+    )
+
+
+def ocr_noise(text: str, rnd: random.Random, rate: float = 0.02) -> str:
+    """Typical tesseract confusions, so regexes see realistic input."""
+    swaps = {"0": "O", "1": "l", "5": "S", ".": ",", "x": "×"}
+    chars = list(text)
+    for i, c in enumerate(chars):
+        if c in swaps and rnd.random() < rate:
+            chars[i] = swaps[c]
+    return "".join(chars)
+
+
+def render_image(sheet: Sheet, path: Path, size: tuple[int, int], rnd: random.Random) -> None:
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new("RGB", size, (250, 250, 247))
+    draw = ImageDraw.Draw(img)
+    font_size = max(14, size[0] // 60)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        font = ImageFont.load_default()
+    y = size[1] // 20
+    for line in sheet.lines():
+        draw.text((size[0] // 20, y), line, fill=(20, 20, 20), font=font)
+        y += int(font_size * 1.5)
+    # Slight skew, like a phone photo of a printout.
+    img = img.rotate(rnd.uniform(-1.5, 1.5), expand=False, fillcolor=(235, 235, 230))
+    if path.suffix == ".png":
+        img.save(path, optimize=False)
+    else:
+        img.save(path, quality=85)
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(sheet: Sheet, path: Path) -> None:
+    """Minimal single-page PDF with an embedded text layer (no external dependency)."""
+    ops = ["BT", "/F1 10 Tf", "14 TL", "50 790 Td"]
+    for line in sheet.lines():
+        ops.append(f"({_pdf_escape(line.encode('latin-1', 'replace').decode('latin-1'))}) Tj T*")
+    ops.append("ET")
+    stream = "\n".join(ops).encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def render_workbook(sheet: Sheet, path: Path) -> None:
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Spec"
+    ws.append(["STYLE NO", sheet.style])
+    ws.append(["Ring Size", sheet.ring_size])
+    ws.append([])
+    ws.append(["Metal", "Grams", "DWT", "SPG"])
+    for m in sheet.metals:
+        ws.append([m["metal"], f"{m['grams']} gm", m["dwt"], m["spg"]])
+    ws.append([])
+    ws.append(["Gem", "Shape", "Size", "Count", "Weight"])
+    for g in sheet.gems:
+        ws.append([g["gem"], g["shape"], g["size"], g["count"], f"{g['weight']} ct"])
+    ws.append([])
+    ws.append(["Dimensions", f"{sheet.dims[0]} x {sheet.dims[1]} x {sheet.dims[2]} mm"])
+    wb.save(path)
+
+
+def recorded_gemini_responses() -> list[dict]:
+    """Recorded generateContent responses used in place of the live API."""
+    return json.loads((RECORDED_DIR / "gemini_responses.json").read_text(encoding="utf-8"))
+
+
+def build_corpus(out: Path, sheets: int = 40, seed: int = 42, photo_size: tuple[int, int] = (3024, 4032)) -> dict:
+    """
+    Write the corpus to `out` and return a manifest {"text": [...], "images": [...], "pdfs": [...],
+    "workbooks": [...]}. Files that need optional packages (Pillow, openpyxl) are skipped if missing.
+    """
+    rnd = random.Random(seed)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, list] = {"text": [], "images": [], "pdfs": [], "workbooks": []}
+    for i in range(sheets):
+        sheet = make_sheet(rnd)
+        manifest["text"].append(ocr_noise(sheet.text(), rnd))
+        pdf = out / f"sheet-{i:03d}.pdf"
+        render_pdf(sheet, pdf)
+        manifest["pdfs"].append(str(pdf))
+        try:
+            # Mix of full-size phone photos and smaller scans.
+            ext, size = (".jpg", photo_size) if i % 2 == 0 else (".png", (1240, 1754))
+            img = out / f"sheet-{i:03d}{ext}"
+            if not img.exists():
+                render_image(sheet, img, size, random.Random(seed * 100003 + i))
+            manifest["images"].append(str(img))
+        except ImportError:
+            pass
+        try:
+            wb = out / f"sheet-{i:03d}.xlsx"
+            if not wb.exists():
+                render_workbook(sheet, wb)
+            manifest["workbooks"].append(str(wb))
+        except ImportError:
+            pass
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--sheets", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    manifest = build_corpus(args.out, args.sheets, args.seed)
+    print({k: len(v) for k, v in manifest.items()}, "->", args.out)
+
+
+if __name__ == "__main__":
+    main()
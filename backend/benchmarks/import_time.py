@@ -0,0 +1,84 @@
+"""
+Import-time profile of the API: runs `python -X importtime -c "import app.main"` in a fresh
+interpreter and reports the total plus the slowest modules (cumulative and self time).
+
+Heavy optional libraries must stay lazy (imported inside the functions that use them and
+preloaded by the startup warmup instead); the run fails if any of them load at import time,
+or if the total exceeds --budget-ms.
+
+Run from backend directory:
+  python -m benchmarks.import_time [--top 25] [--budget-ms 1500] [--module app.main]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Must not be imported while the app module graph loads.
+LAZY_MODULES = ("PIL", "pypdf", "pypdfium2", "openpyxl", "pyarrow", "numpy", "cv2", "pytesseract")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def profile_imports(module: str) -> list[dict]:
+    """[{"module", "self_us", "cumulative_us", "depth"}] in import order."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BACKEND_DIR),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))
+        raise SystemExit(f"import {module} failed:\n{tail}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            rows.append({
+                "module": m[4],
+                "self_us": int(m[1]),
+                "cumulative_us": int(m[2]),
+                "depth": len(m[3]) // 2,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="Fail above this total (0 = no budget)")
+    args = parser.parse_args()
+
+    rows = profile_imports(args.module)
+    # Top-level entries (depth 0) sum to the whole import.
+    total_ms = sum(r["cumulative_us"] for r in rows if r["depth"] == 0) / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms, {len(rows)} modules\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for r in sorted(rows, key=lambda r: r["cumulative_us"], reverse=True)[: args.top]:
+        print(f"{r['cumulative_us'] / 1000:>14.1f} {r['self_us'] / 1000:>9.1f}  {'  ' * r['depth']}{r['module']}")
+
+    print(f"\n{'self ms':>9}  module (slowest own work)")
+    for r in sorted(rows, key=lambda r: r["self_us"], reverse=True)[: min(10, args.top)]:
+        print(f"{r['self_us'] / 1000:>9.1f}  {r['module']}")
+
+    eager = sorted({r["module"] for r in rows if r["module"].split(".")[0] in LAZY_MODULES})
+    failed = False
+    if eager:
+        print(f"\nFAIL: heavy modules loaded at import time: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
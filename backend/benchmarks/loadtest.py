@@ -0,0 +1,284 @@
+"""
+End-to-end load test: starts the mock Gemini server and one uvicorn process of the API
+(against a separate Mongo database), drives concurrent upload / list / export traffic,
+then waits for background extraction to drain.
+
+Reports request throughput and latency percentiles per operation, background completions
+per minute, and the peak backlog (records still Processing, in-flight jobs, write-behind depth).
+
+Needs a local MongoDB. Run from backend directory:
+  python -m benchmarks.loadtest [--duration 60] [--concurrency 16] [--mix upload=1,list=4,export=0.2]
+                                [--gemini-latency-ms 1500] [--gemini-error-rate 0.02] [--gemini-rps-limit 10]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.bench_pipeline import _percentile
+from benchmarks.corpus import make_sheet, render_pdf
+from benchmarks.mock_gemini import MockGeminiConfig, start_mock_gemini
+
+_METRIC_RE = re.compile(r"^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>[^}]*)\})?\s+(?P<value>\S+)$")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(method: str, url: str, body: bytes | None = None, headers: dict | None = None, timeout: float = 120):
+    req = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            # Read the whole body so streamed exports are measured end to end.
+            while resp.read(256 * 1024):
+                pass
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _multipart(filename: str, content: bytes, content_type: str) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    return head + content + f"\r\n--{boundary}--\r\n".encode("utf-8"), f"multipart/form-data; boundary={boundary}"
+
+
+class UploadSource:
+    """Unique spec-sheet PDFs (so exact-duplicate checks don't short-circuit), generated up front."""
+
+    def __init__(self, n: int, seed: int) -> None:
+        rnd = random.Random(seed)
+        self._files: list[bytes] = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(n):
+                p = Path(tmp) / f"{i}.pdf"
+                render_pdf(make_sheet(rnd), p)
+                self._files.append(p.read_bytes())
+        self._i = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> bytes:
+        with self._lock:
+            data = self._files[self._i % len(self._files)]
+            self._i += 1
+            # Trailing comment keeps every upload byte-unique even when the pool wraps around.
+            return data + f"\n% {self._i}\n".encode("ascii")
+
+
+def scrape_metrics(base: str) -> dict[str, float]:
+    """Sum Prometheus samples by metric name (labels collapsed)."""
+    out: dict[str, float] = defaultdict(float)
+    try:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as resp:
+            text = resp.read().decode("utf-8")
+    except Exception:
+        return out
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        m = _METRIC_RE.match(line)
+        if m and "_bucket" not in m["name"]:
+            try:
+                out[m["name"]] += float(m["value"])
+            except ValueError:
+                pass
+    return out
+
+
+def processing_count(base: str) -> int:
+    try:
+        with urllib.request.urlopen(f"{base}/api/jewelry/stats", timeout=10) as resp:
+            return int(json.loads(resp.read()).get("processing", 0))
+    except Exception:
+        return -1
+
+
+def start_api(port: int, gemini_url: str, db_name: str, upload_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_BASE": gemini_url,
+        "GEMINI_API_KEY": env.get("LOADTEST_GEMINI_KEY", "loadtest"),
+        "MONGODB_DB": db_name,
+        "UPLOAD_DIR": upload_dir,
+        "THUMBNAIL_DIR": os.path.join(upload_dir, "_thumbs"),
+        "EXPORT_DIR": os.path.join(upload_dir, "_exports"),
+        "LOG_LEVEL": "WARNING",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=str(BACKEND_DIR),
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if _request("GET", f"{base}/health", timeout=2) == 200:
+                return proc
+        except Exception:
+            pass
+        time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("API did not become healthy within 30s")
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {"upload", "list", "export"}
+    if unknown:
+        raise SystemExit(f"unknown operations in --mix: {sorted(unknown)}")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="upload=1,list=4,export=0.2")
+    parser.add_argument("--drain-timeout", type=float, default=300.0, help="Max seconds to wait for the backlog to clear")
+    parser.add_argument("--gemini-latency-ms", type=float, default=1500.0)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=400.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-rps-limit", type=float, default=0.0)
+    parser.add_argument("--api-url", default=None, help="Use an already running API instead of starting one")
+    parser.add_argument("--db", default="karatplus_loadtest")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--upload-priority", choices=["interactive", "bulk"], default="interactive",
+                        help="X-Upload-Priority lane for uploads (bulk is shed first under load)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    ops, weights = list(mix), list(mix.values())
+    gemini = start_mock_gemini(MockGeminiConfig(
+        args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_error_rate, args.gemini_rps_limit, args.seed,
+    ))
+    upload_dir = tempfile.mkdtemp(prefix="karatplus-loadtest-")
+    proc = None
+    if args.api_url:
+        base = args.api_url.rstrip("/")
+    else:
+        port = _free_port()
+        proc = start_api(port, gemini.url, args.db, upload_dir)
+        base = f"http://127.0.0.1:{port}"
+    print(f"API {base}, mock Gemini {gemini.url}")
+
+    uploads = UploadSource(200, args.seed)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    stop_at = time.time() + args.duration
+    rnd = random.Random(args.seed)
+
+    def one(op: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            if op == "upload":
+                body, ctype = _multipart(f"{uuid.uuid4().hex}.pdf", uploads.next(), "application/pdf")
+                status = _request(
+                    "POST",
+                    f"{base}/api/jewelry/upload",
+                    body,
+                    {"Content-Type": ctype, "X-Upload-Priority": args.upload_priority},
+                )
+            elif op == "list":
+                status = _request("GET", f"{base}/api/jewelry")
+            else:
+                status = _request("GET", f"{base}/api/jewelry/export?format=csv")
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies[op].append(elapsed)
+            statuses[op][status] += 1
+
+    def worker(seed: int) -> None:
+        wrnd = random.Random(seed)
+        while time.time() < stop_at:
+            one(wrnd.choices(ops, weights)[0])
+
+    backlog_peak = {"processing": 0, "in_flight": 0.0, "write_behind": 0.0}
+    sampling = threading.Event()
+
+    def sample_backlog() -> None:
+        while not sampling.wait(1.0):
+            m = scrape_metrics(base)
+            backlog_peak["in_flight"] = max(backlog_peak["in_flight"], m.get("karatplus_extractions_in_flight", 0))
+            backlog_peak["write_behind"] = max(backlog_peak["write_behind"], m.get("karatplus_write_behind_depth", 0))
+            backlog_peak["processing"] = max(backlog_peak["processing"], processing_count(base))
+
+    before = scrape_metrics(base)
+    sampler = threading.Thread(target=sample_backlog, daemon=True)
+    sampler.start()
+    started = time.time()
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for _ in range(args.concurrency):
+                pool.submit(worker, rnd.randrange(1 << 30))
+        traffic_s = time.time() - started
+
+        # Background jobs keep running after the traffic stops; measure how long they take to drain.
+        drain_deadline = time.time() + args.drain_timeout
+        while time.time() < drain_deadline and processing_count(base) > 0:
+            time.sleep(1.0)
+        total_s = time.time() - started
+        left = processing_count(base)
+    finally:
+        sampling.set()
+        after = scrape_metrics(base)
+        if proc is not None:
+            proc.terminate()
+            proc.wait(10)
+        gemini.shutdown()
+
+    print(f"\nTraffic {traffic_s:.1f}s at concurrency {args.concurrency}; drained after {total_s:.1f}s")
+    print(f"{'op':<8} {'count':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for op in ops:
+        lat = sorted(latencies.get(op, []))
+        if not lat:
+            continue
+        print(
+            f"{op:<8} {len(lat):>7} {len(lat) / traffic_s:>8.1f} {_percentile(lat, .5) * 1000:>9.1f} "
+            f"{_percentile(lat, .95) * 1000:>9.1f} {_percentile(lat, .99) * 1000:>9.1f} {lat[-1] * 1000:>9.1f}  "
+            f"{dict(statuses[op])}"
+        )
+    completed = after.get("karatplus_extractions_total", 0) - before.get("karatplus_extractions_total", 0)
+    print(f"\nBackground extractions completed: {completed:.0f} ({completed / (total_s / 60):.1f} sheets/min)")
+    print(f"Still processing at exit: {left}")
+    print(
+        f"Peak backlog: {backlog_peak['processing']} records Processing, "
+        f"{backlog_peak['in_flight']:.0f} jobs in flight, write-behind depth {backlog_peak['write_behind']:.0f}"
+    )
+    print(f"Mock Gemini responses: {dict(gemini.stats)}")
+
+
+if __name__ == "__main__":
+    main()
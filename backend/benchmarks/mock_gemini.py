@@ -0,0 +1,161 @@
+"""
+Local stand-in for the Gemini generateContent endpoint. Replies with recorded responses
+(benchmarks/recorded/) after a configurable latency, injects 500s at a given rate, and
+returns 429 with Retry-After once a requests-per-second budget is exceeded.
+
+Run from backend directory:
+  python -m benchmarks.mock_gemini [--port 8765] [--latency-ms 1500] [--error-rate 0.02] [--rps-limit 10]
+Then start the API with GEMINI_API_BASE=http://127.0.0.1:8765 and any GEMINI_API_KEY.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import recorded_gemini_responses
+
+_PATH_RE = re.compile(r"^/v1beta/models/([^/:]+):generateContent")
+
+
+class MockGeminiConfig:
+    def __init__(
+        self,
+        latency_ms: float = 1500.0,
+        jitter_ms: float = 400.0,
+        error_rate: float = 0.0,
+        rps_limit: float = 0.0,
+        seed: int = 1,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rps_limit = rps_limit
+        self.rnd = random.Random(seed)
+
+
+class _TokenBucket:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockGeminiConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.bucket = _TokenBucket(config.rps_limit)
+        self.responses = itertools.cycle(recorded_gemini_responses())
+        self.stats: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def next_response(self) -> dict:
+        with self._lock:
+            return next(self.responses)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockGeminiServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def log_message(self, format, *args):  # noqa: A002 - keep the load test output readable
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if not _PATH_RE.match(self.path):
+            self.server.count("404")
+            self._send_json(404, {"error": {"code": 404, "status": "NOT_FOUND"}})
+            return
+        cfg = self.server.config
+        if not self.server.bucket.take():
+            self.server.count("429")
+            self._send_json(
+                429,
+                {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}},
+                {"Retry-After": "1"},
+            )
+            return
+        delay = max(0.0, cfg.rnd.gauss(cfg.latency_ms, cfg.jitter_ms)) / 1000.0
+        time.sleep(delay)
+        if cfg.rnd.random() < cfg.error_rate:
+            self.server.count("500")
+            self._send_json(500, {"error": {"code": 500, "status": "INTERNAL"}})
+            return
+        self.server.count("200")
+        self._send_json(200, self.server.next_response())
+
+
+def start_mock_gemini(config: MockGeminiConfig, host: str = "127.0.0.1", port: int = 0) -> MockGeminiServer:
+    """Start the stand-in on a background thread; port 0 picks a free port."""
+    server = MockGeminiServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="mock-gemini", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=1500.0)
+    parser.add_argument("--jitter-ms", type=float, default=400.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rps-limit", type=float, default=0.0, help="Return 429 above this many requests/s (0 = unlimited)")
+    args = parser.parse_args()
+    config = MockGeminiConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rps_limit)
+    server = MockGeminiServer((args.host, args.port), config)
+    print(f"Mock Gemini listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(dict(server.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Move raw_text and table arrays of documents written before the hot/cold split into jewelry_blobs,
+and flat files in UPLOAD_DIR into the content-addressed blob layout.
+Run from backend directory: python migrate_storage.py (safe to re-run)
+"""
+import asyncio
+
+# Add parent to path so app is importable
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.config import settings
+from app.services.blob_store import import_legacy_uploads
+from app.services.record_store import migrate_legacy_documents
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+async def main():
+    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    db = client[settings.MONGODB_DB]
+    moved = await migrate_legacy_documents(db)
+    print(f"Migrated {moved} jewelry documents to the hot/cold layout.")
+    files = await import_legacy_uploads(db)
+    print(f"Moved {files} uploaded files into the content-addressed store.")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,24 @@
 """
-Seed the database with 5 dummy jewelry items for demo.
+Seed the database with 5 dummy jewelry items for demo, or generate a large synthetic
+dataset for performance work.
 Run from backend directory: python -m seed (or python seed.py with proper PYTHONPATH)
+
+  python seed.py                          # the 5 demo items
+  python seed.py --count 2000000 --seed 1 # reproducible synthetic records (hot/cold layout)
+  python seed.py --count 50000 --seed 2 --files 500 --append
 """
+import argparse
 import asyncio
-from datetime import datetime
+import hashlib
+import heapq
+import itertools
+import math
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
 from bson import ObjectId
 
 # Add parent to path so app is importable
@@ -14,6 +29,9 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 from app.config import settings
 from motor.motor_asyncio import AsyncIOMotorClient
 
+if TYPE_CHECKING:
+    from benchmarks.corpus import Sheet
+
 
 DUMMY_ITEMS = [
     {
@@ -170,13 +188,244 @@ DUMMY_ITEMS = [
 ]
 
 
+METAL_FIELDS = {
+    "14K": "gold_weight_14kt_gm",
+    "18K": "gold_weight_18kt_gm",
+    "22K": "gold_weight_22kt_gm",
+    "Silver": "silver_weight_gm",
+    "Platinum": "platinum_weight_gm",
+}
+
+# (status, source, confidence, review_required, weight): mirrors what processor.py assigns.
+OUTCOMES = [
+    ("Completed", "AI", 0.95, False, 0.62),
+    ("Completed", "AI", 0.92, False, 0.06),
+    ("Review Required", "AI", 0.0, True, 0.04),
+    ("Completed", "OCR", 0.80, False, 0.06),
+    ("Review Required", "OCR", 0.50, True, 0.20),
+]
+# Share of uploads per weekday (Mon..Sun) and per hour of day.
+WEEKDAY_WEIGHTS = [1.2, 1.25, 1.2, 1.15, 1.0, 0.4, 0.2]
+HOUR_WEIGHTS = [0.1] * 7 + [0.6, 1.2, 1.6, 1.7, 1.5, 1.0, 1.4, 1.6, 1.5, 1.2, 0.8, 0.4] + [0.2] * 5
+
+
+def _metal_field(metal: str):
+    for key, field in METAL_FIELDS.items():
+        if key in metal:
+            return field
+    return None
+
+
+def _pick_timestamp(rnd: random.Random, start: datetime, days: int) -> datetime:
+    """Weekday and office-hours weighted timestamp within [start, start + days)."""
+    while True:
+        day = start + timedelta(days=rnd.randrange(days))
+        if rnd.random() * max(WEEKDAY_WEIGHTS) <= WEEKDAY_WEIGHTS[day.weekday()]:
+            break
+    hour = rnd.choices(range(24), HOUR_WEIGHTS)[0]
+    return day.replace(hour=hour, minute=rnd.randrange(60), second=rnd.randrange(60), microsecond=0)
+
+
+def _object_id(rnd: random.Random, ts: datetime) -> ObjectId:
+    """Deterministic ObjectId whose timestamp part matches created_at (keeps _id order ~ time order)."""
+    # ts is naive UTC; a bare .timestamp() would read it as local time.
+    return ObjectId(int(ts.replace(tzinfo=timezone.utc).timestamp()).to_bytes(4, "big") + rnd.getrandbits(64).to_bytes(8, "big"))
+
+
+def generate_record(rnd: random.Random, start: datetime, days: int) -> tuple[dict, "Sheet"]:
+    """(document, the spec sheet it was extracted from); --files renders that sheet as the upload."""
+    from benchmarks.corpus import make_sheet
+
+    sheet = make_sheet(rnd)
+    created = _pick_timestamp(rnd, start, days)
+    status, source, confidence, review, _ = rnd.choices(OUTCOMES, [o[4] for o in OUTCOMES])[0]
+    # Extraction latency: lognormal around ~8s (Gemini), with a long tail.
+    completed = created + timedelta(seconds=min(600.0, rnd.lognormvariate(2.0, 0.7)))
+    updated = completed
+    if review and rnd.random() < 0.3:
+        # Some review items were fixed by hand later.
+        updated += timedelta(hours=rnd.uniform(1, 72))
+
+    ext: dict = {"ring_size": sheet.ring_size, "dimensions_mm": "x".join(str(d) for d in sheet.dims)}
+    ext["length_mm"], ext["width_mm"], ext["height_mm"] = sheet.dims
+    for m in sheet.metals:
+        field = _metal_field(m["metal"])
+        if field:
+            ext[field] = round(ext.get(field, 0.0) + m["grams"], 2)
+    diamonds = [g for g in sheet.gems if g["gem"] == "Diamond"]
+    stones = [g for g in sheet.gems if g["gem"] != "Diamond"]
+    if diamonds:
+        ext["diamond_count"] = sum(g["count"] for g in diamonds)
+        ext["diamond_weight_ct"] = round(sum(g["weight"] for g in diamonds), 2)
+        ext["diamond_shape"] = diamonds[0]["shape"]
+    if stones:
+        ext["stone_count"] = sum(g["count"] for g in stones)
+        ext["stone_weight_ct"] = round(sum(g["weight"] for g in stones), 2)
+        ext["stone_type"] = stones[0]["gem"]
+    if source == "AI":
+        ext["metal_weights"] = sheet.metals
+        ext["gem_details"] = [dict(g, weight=f"{g['weight']:.2f}") for g in sheet.gems]
+    if status == "Review Required":
+        # Review items are the partial extractions; drop a few fields.
+        for k in rnd.sample(sorted(ext), k=min(len(ext), rnd.randint(2, 6))):
+            ext.pop(k, None)
+
+    ext_name = rnd.choice([".jpg", ".jpg", ".jpg", ".png", ".pdf", ".xlsx"])
+    filename = f"{uuid.UUID(int=rnd.getrandbits(128)).hex}{ext_name}"
+    doc = {
+        "_id": _object_id(rnd, created),
+        "image_url": f"http://localhost:8000/uploads/{filename}",
+        "image_filename": filename,
+        "extracted_data": ext,
+        "status": status,
+        "source": source,
+        "confidence_score": confidence,
+        "review_required": review,
+        "created_at": created,
+        "updated_at": updated,
+        "completed_at": completed,  # extraction finished; later hand edits only move updated_at
+        "raw_text": sheet.text() if source == "OCR" else None,
+        "file_hash": hashlib.sha256(rnd.getrandbits(256).to_bytes(32, "big")).hexdigest(),
+    }
+    return doc, sheet
+
+
+def generate_batch(seed: int, batch_index: int, size: int, start: datetime, days: int) -> list[tuple[dict, "Sheet"]]:
+    # One RNG per batch: output is identical whatever order the workers finish in.
+    rnd = random.Random(f"{seed}:{batch_index}")
+    return [generate_record(rnd, start, days) for _ in range(size)]
+
+
+async def _insert_batch(db, docs: list[dict]) -> None:
+    from app.services.record_store import BLOB_COLLECTION, split_document
+
+    hot, cold = [], []
+    for doc in docs:
+        h, c = split_document(doc)
+        hot.append(h)
+        c = {k: v for k, v in c.items() if v not in (None, [], {})}
+        if c:
+            cold.append({"_id": doc["_id"], **c})
+    await db["jewelry"].insert_many(hot, ordered=False)
+    if cold:
+        await db[BLOB_COLLECTION].insert_many(cold, ordered=False)
+
+
+async def _attach_files(db, records: list[tuple[ObjectId, "Sheet"]]) -> int:
+    """Store each record's own sheet, rendered as a text-layer PDF, as its upload file."""
+    from app.services.blob_store import store_upload
+    from benchmarks.corpus import render_pdf
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sheet.pdf"
+        for oid, sheet in records:
+            render_pdf(sheet, path)
+            content = path.read_bytes()
+            sha = hashlib.sha256(content).hexdigest()
+            name, _ = await store_upload(db, content, sha, ".pdf")
+            await db["jewelry"].update_one(
+                {"_id": oid},
+                {"$set": {
+                    "image_filename": name,
+                    "image_url": f"http://localhost:8000/uploads/{name}",
+                    "file_hash": sha,
+                }},
+            )
+    return len(records)
+
+
+async def generate(
+    db, count: int, seed: int, batch_size: int, workers: int, start: datetime, days: int, files: int = 0
+) -> list[tuple[ObjectId, "Sheet"]]:
+    """Insert `count` records; returns (_id, sheet) of the newest `files` of them, newest first."""
+    from app.db import ensure_indexes
+    from app.services.rollups import rebuild_rollups
+
+    # Same seed + start means the same _ids; fail up front rather than midway with a duplicate-key error.
+    first = generate_batch(seed, 0, 1, start, days)[0][0]["_id"]
+    if await db["jewelry"].find_one({"_id": first}, {"_id": 1}):
+        raise SystemExit(
+            f"Records for --seed {seed} --start {start:%Y-%m-%d} already exist; "
+            "pick another --seed (or --start) to append more, or drop --append to replace them."
+        )
+    batches = math.ceil(count / batch_size)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    inserted = 0
+    t0 = time.perf_counter()
+    # Min-heap of the newest `files` records inserted by this run (created_at, tiebreak, _id, sheet).
+    newest: list[tuple] = []
+    tiebreak = itertools.count()
+
+    async def producer():
+        for b in range(batches):
+            size = min(batch_size, count - b * batch_size)
+            # Generation is CPU-bound; keep it off the loop so inserts overlap with it.
+            await queue.put(await asyncio.to_thread(generate_batch, seed, b, size, start, days))
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def consumer():
+        nonlocal inserted
+        while True:
+            pairs = await queue.get()
+            if pairs is None:
+                return
+            docs = [doc for doc, _ in pairs]
+            await _insert_batch(db, docs)
+            if files:
+                for doc, sheet in pairs:
+                    heapq.heappush(newest, (doc["created_at"], next(tiebreak), doc["_id"], sheet))
+                    if len(newest) > files:
+                        heapq.heappop(newest)
+            inserted += len(docs)
+            if inserted % (batch_size * 50) < len(docs):
+                rate = inserted / (time.perf_counter() - t0)
+                print(f"  {inserted:,}/{count:,} records ({rate:,.0f}/s)")
+
+    await asyncio.gather(producer(), *(consumer() for _ in range(workers)))
+    print(f"Inserted {inserted:,} synthetic records in {time.perf_counter() - t0:.1f}s.")
+    await ensure_indexes()
+    buckets = await rebuild_rollups(db)
+    print(f"Rebuilt rollups from {buckets:,} records.")
+    return [(oid, sheet) for _, _, oid, sheet in sorted(newest, reverse=True)]
+
+
 async def main():
-    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    parser = argparse.ArgumentParser(description="Seed demo items or generate synthetic jewelry records.")
+    parser.add_argument("--count", type=int, default=0, help="Synthetic records to generate (default: the 5 demo items)")
+    parser.add_argument("--seed", type=int, default=1, help="Same seed + start + count gives the same records")
+    parser.add_argument(
+        "--start", default="2025-01-01", help="First day (UTC, YYYY-MM-DD) of the created_at range (default 2025-01-01)"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent insert_many batches")
+    parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days from --start")
+    parser.add_argument("--files", type=int, default=0, help="Also store upload files for the newest N records this run generates")
+    parser.add_argument("--append", action="store_true", help="Keep existing records instead of clearing the collection")
+    args = parser.parse_args()
+    try:
+        start = datetime.strptime(args.start, "%Y-%m-%d")
+    except ValueError:
+        parser.error(f"--start must be a date like 2025-01-01, got {args.start!r}")
+
+    client = AsyncIOMotorClient(settings.MONGODB_URI, maxPoolSize=max(10, args.workers * 2))
     db = client[settings.MONGODB_DB]
     coll = db["jewelry"]
-    await coll.delete_many({})
-    await coll.insert_many(DUMMY_ITEMS)
-    print(f"Inserted {len(DUMMY_ITEMS)} dummy jewelry items.")
+    if not args.append:
+        from app.services.record_store import BLOB_COLLECTION
+
+        await coll.delete_many({})
+        await db[BLOB_COLLECTION].delete_many({})
+    if args.count <= 0:
+        await coll.insert_many(DUMMY_ITEMS)
+        print(f"Inserted {len(DUMMY_ITEMS)} dummy jewelry items.")
+    else:
+        newest = await generate(
+            db, args.count, args.seed, args.batch_size, max(1, args.workers), start, max(1, args.days), args.files
+        )
+        if newest:
+            n = await _attach_files(db, newest)
+            print(f"Stored upload files for {n} records.")
     client.close()
 
 
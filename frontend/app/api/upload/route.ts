@@ -19,6 +19,7 @@ export async function POST(request: NextRequest) {
     
     const res = await fetch(`${BACKEND}/api/jewelry/upload`, {
       method: "POST",
+      headers: { "X-Upload-Priority": request.headers.get("x-upload-priority") || "interactive" },
       body: backendForm,
     });
 
@@ -40,7 +41,12 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    return NextResponse.json(data, { status: res.status });
+    // Keep Retry-After so the browser can back off when the backend sheds load (429/503).
+    const retryAfter = res.headers.get("retry-after");
+    return NextResponse.json(data, {
+      status: res.status,
+      headers: retryAfter ? { "Retry-After": retryAfter } : undefined,
+    });
   } catch (err) {
     console.error("[PROXY] Exception:", err);
     return NextResponse.json(
@@ -6,7 +6,7 @@ import Image from "next/image";
 import Link from "next/link";
 import { ArrowLeft, Save, Sparkles, FileSearch, Download } from "lucide-react";
 import * as XLSX from "xlsx";
-import { fetchJewelry, updateJewelry, type JewelryRecord, type JewelryData } from "@/lib/api";
+import { fetchJewelry, thumbnailUrl, updateJewelry, type JewelryRecord, type JewelryData } from "@/lib/api";
 
 const FIELDS: { key: keyof JewelryData; label: string; type?: string }[] = [
   { key: "ring_size", label: "Ring size" },
@@ -217,7 +217,7 @@ export default function ProductDetailPage() {
                 aria-label="Open zoom preview"
               >
                 <Image
-                  src={record.image_url}
+                  src={thumbnailUrl(record.image_url, 1024) || record.image_url}
                   alt="Specification sheet"
                   fill
                   className="object-contain p-4"
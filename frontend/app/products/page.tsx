@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import JewelryTable from "@/components/JewelryTable";
-import { fetchJewelryList, type JewelryRecord } from "@/lib/api";
+import { fetchJewelryList, subscribeJewelryEvents, syncJewelryCache, type JewelryRecord } from "@/lib/api";
 import { Download } from "lucide-react";
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
@@ -58,19 +58,23 @@ export default function ProductsPage() {
   };
 
   const load = (s?: string, st?: string, silent = false) => {
+    const q = s ?? search;
+    const statusFilter = st ?? status;
     if (!silent) setLoading(true);
-    fetchJewelryList({ search: s ?? search, status: st ?? status })
-      .then((res) => {
+    // The table and batch progress come from the delta-synced cache, so refreshes only pull
+    // changed records. Searches also match OCR raw_text, which only the server has.
+    const cached: Promise<JewelryRecord[] | null> = !q || readBatchState() ? syncJewelryCache() : Promise.resolve(null);
+    const listed = q
+      ? fetchJewelryList({ search: q, status: statusFilter })
+      : cached.then((all) => {
+          const rows = (all ?? []).filter((r) => !statusFilter || r.status === statusFilter);
+          return { items: rows, total: rows.length };
+        });
+    Promise.all([listed, cached])
+      .then(([res, all]) => {
         setItems(res.items);
         setTotal(res.total);
-        const batch = readBatchState();
-        if (!batch) {
-          setBatchProgress(null);
-          return;
-        }
-        fetchJewelryList().then((all) => {
-          setBatchProgress(computeBatchProgress(all.items));
-        });
+        setBatchProgress(all ? computeBatchProgress(all) : null);
       })
       .finally(() => {
         if (!silent) setLoading(false);
@@ -82,11 +86,23 @@ export default function ProductsPage() {
   }, []);
 
   useEffect(() => {
+    // Refresh on pushed state transitions instead of polling; coalesce bursts.
+    let timer: number | undefined;
+    const unsubscribe = subscribeJewelryEvents((e) => {
+      if (e.type === "record.progress") return;
+      window.clearTimeout(timer);
+      timer = window.setTimeout(() => load(undefined, undefined, true), 300);
+    });
+    // Slow safety net in case the event stream is unavailable.
     const intervalId = window.setInterval(() => {
       load(undefined, undefined, true);
-    }, 2500);
+    }, 30000);
 
-    return () => window.clearInterval(intervalId);
+    return () => {
+      unsubscribe();
+      window.clearTimeout(timer);
+      window.clearInterval(intervalId);
+    };
   }, [search, status]);
 
   const handleSearch = (s: string) => {
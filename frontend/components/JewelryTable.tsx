@@ -4,7 +4,7 @@ import { useState } from "react";
 import Link from "next/link";
 import Image from "next/image";
 import { Search, ChevronRight, Sparkles, FileSearch } from "lucide-react";
-import type { JewelryRecord } from "@/lib/api";
+import { thumbnailUrl, type JewelryRecord } from "@/lib/api";
 
 interface JewelryTableProps {
   items: JewelryRecord[];
@@ -101,9 +101,9 @@ export default function JewelryTable({
                   >
                     <td className="px-6 py-4">
                       <div className="relative h-14 w-14 overflow-hidden rounded-xl border border-white/10 bg-black/20 shadow-md">
-                        {row.image_url ? (
+                        {thumbnailUrl(row.image_url) ? (
                           <Image
-                            src={row.image_url}
+                            src={thumbnailUrl(row.image_url)!}
                             alt=""
                             fill
                             className="object-cover"
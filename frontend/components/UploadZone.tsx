@@ -80,7 +80,7 @@ export default function UploadZone() {
 
     const processFile = async (file: File, index: number) => {
       try {
-        const res = await uploadJewelry(file);
+        const res = await uploadJewelry(file, undefined, files.length > 1 ? "bulk" : "interactive");
         if (res?.record) {
           newResults[index].record = res.record;
           const current = readBatchState();
@@ -50,6 +50,49 @@ export interface ConfidencePoint {
   source: string;
 }
 
+export interface RecordEvent {
+  id: number;
+  type: "record.created" | "record.progress" | "record.status" | "record.updated" | string;
+  record_id: string | null;
+  ts: string;
+  status?: string;
+  stage?: string;
+  source?: string;
+  confidence_score?: number;
+  review_required?: boolean;
+}
+
+/** Subscribe to server-sent record events. Returns an unsubscribe function. */
+export function subscribeJewelryEvents(
+  onEvent: (e: RecordEvent) => void,
+  params?: { recordId?: string }
+): () => void {
+  if (typeof window === "undefined" || typeof EventSource === "undefined") return () => {};
+  const sp = new URLSearchParams();
+  if (params?.recordId) sp.set("record_id", params.recordId);
+  const q = sp.toString();
+  const source = new EventSource(`${API_BASE}/api/jewelry/events${q ? `?${q}` : ""}`);
+  const handler = (msg: MessageEvent) => {
+    try {
+      onEvent(JSON.parse(msg.data) as RecordEvent);
+    } catch {
+      // ignore malformed events
+    }
+  };
+  ["record.created", "record.progress", "record.status", "record.updated", "record.deleted"].forEach((t) =>
+    source.addEventListener(t, handler as EventListener)
+  );
+  return () => source.close();
+}
+
+/** Cached WebP preview of an upload (images and PDFs); width is rounded up to 64/160/480/1024 on the server. */
+export function thumbnailUrl(imageUrl: string | null | undefined, width = 160): string | null {
+  if (!imageUrl || !imageUrl.includes("/uploads/")) return null;
+  const lower = imageUrl.split("?")[0].toLowerCase();
+  if (lower.endsWith(".xlsx") || lower.endsWith(".xls")) return null;
+  return `${imageUrl.split("?")[0]}/thumb?w=${width}`;
+}
+
 export async function fetchStats(): Promise<Stats> {
   try {
     const res = await fetch(`${API_BASE}/api/jewelry/stats`, { cache: "no-store" });
@@ -85,6 +128,45 @@ export async function fetchJewelryList(params?: { search?: string; status?: stri
   }
 }
 
+export interface JewelryChanges {
+  items: JewelryRecord[];
+  deleted: string[];
+  next: string;
+  has_more: boolean;
+}
+
+export async function fetchJewelryChanges(since?: string | null, limit = 500): Promise<JewelryChanges | null> {
+  const sp = new URLSearchParams();
+  if (since) sp.set("since", since);
+  sp.set("limit", String(limit));
+  try {
+    const res = await fetch(`${API_BASE}/api/jewelry/changes?${sp.toString()}`, { cache: "no-store" });
+    if (!res.ok) return null;
+    return res.json();
+  } catch {
+    return null;
+  }
+}
+
+// Local record cache kept current with /changes; only deltas cross the wire after the first sync.
+const recordCache = new Map<string, JewelryRecord>();
+let recordWatermark: string | null = null;
+
+/** Pull all changes since the last sync and return the cached records, newest first. */
+export async function syncJewelryCache(): Promise<JewelryRecord[]> {
+  for (let page = 0; page < 100; page++) {
+    const delta = await fetchJewelryChanges(recordWatermark);
+    if (!delta) break;
+    delta.items.forEach((r) => recordCache.set(r.id, r));
+    delta.deleted.forEach((id) => recordCache.delete(id));
+    recordWatermark = delta.next;
+    if (!delta.has_more) break;
+  }
+  return Array.from(recordCache.values()).sort((a, b) =>
+    (b.created_at || "").localeCompare(a.created_at || "")
+  );
+}
+
 export async function fetchJewelry(id: string): Promise<JewelryRecord | null> {
   try {
     const res = await fetch(`${API_BASE}/api/jewelry/${id}`);
@@ -95,7 +177,20 @@ export async function fetchJewelry(id: string): Promise<JewelryRecord | null> {
   }
 }
 
-export async function uploadJewelry(file: File, onProgress?: (p: number) => void): Promise<{ record?: JewelryRecord; duplicate?: boolean; error?: boolean }> {
+export type UploadPriority = "interactive" | "bulk";
+
+const UPLOAD_MAX_RETRIES = 5;
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+/**
+ * Upload one spec sheet. Batch uploads should pass priority "bulk" so single uploads are
+ * extracted first. When the server sheds load (429/503) the upload is retried after Retry-After.
+ */
+export async function uploadJewelry(
+  file: File,
+  onProgress?: (p: number) => void,
+  priority: UploadPriority = "interactive",
+): Promise<{ record?: JewelryRecord; duplicate?: boolean; error?: boolean }> {
   const form = new FormData();
   form.append("file", file, file.name || "image.jpg");
 
@@ -105,10 +200,21 @@ export async function uploadJewelry(file: File, onProgress?: (p: number) => void
   if (typeof window !== "undefined" && onProgress) onProgress(10);
 
   try {
-    const res = await fetch(uploadUrl, {
+    let res = await fetch(uploadUrl, {
       method: "POST",
+      headers: { "X-Upload-Priority": priority },
       body: form,
     });
+    for (let attempt = 1; (res.status === 429 || res.status === 503) && attempt <= UPLOAD_MAX_RETRIES; attempt++) {
+      const retryAfter = Number(res.headers.get("Retry-After")) || 2 * attempt;
+      // Jitter so a batch doesn't come back all at once.
+      await sleep(Math.min(retryAfter, 60) * 1000 * (1 + Math.random() * 0.25));
+      res = await fetch(uploadUrl, {
+        method: "POST",
+        headers: { "X-Upload-Priority": priority },
+        body: form,
+      });
+    }
     if (onProgress) onProgress(90);
 
     if (res.status === 409) {